@@ -67,6 +67,18 @@ def run_migrations_online() -> None:
     and associate a connection with the context.
 
     """
+    # Callers that migrate a specific database (e.g. benchmarks/explain_hot_paths.py)
+    # pass their own connection in config.attributes instead of DATABASE_URL
+    connection = config.attributes.get("connection")
+    if connection is not None:
+        context.configure(
+            connection=connection, target_metadata=target_metadata
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     connectable = engine_from_config(
         config.get_section(config.config_ini_section, {}),
         prefix="sqlalchemy.",
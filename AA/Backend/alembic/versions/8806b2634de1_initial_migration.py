@@ -19,12 +19,238 @@ depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
-    # ### commands auto generated by Alembic - please adjust! ###
-    pass
-    # ### end Alembic commands ###
+    # Baseline schema, frozen as it stood before the next revisions (books.file_url,
+    # author_notifications, user_book_follow come from their own migrations).
+    # Tables used to be created by create_all() when the app was imported, so
+    # databases made that way already have them - only create what is missing.
+    # Later changes belong in their own revisions, never here.
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    tables = inspector.get_table_names()
+
+    if 'authors' not in tables:
+        op.create_table(
+            'authors',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=255), nullable=False),
+            sa.Column('bio', sa.Text(), nullable=True),
+            sa.Column('avatar_url', sa.String(length=500), nullable=True),
+            sa.Column('followers_count', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_authors_id'), 'authors', ['id'], unique=False)
+        op.create_index(op.f('ix_authors_name'), 'authors', ['name'], unique=False)
+    if 'books' not in tables:
+        op.create_table(
+            'books',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('title', sa.String(length=255), nullable=False),
+            sa.Column('isbn', sa.String(length=20), nullable=True),
+            sa.Column('cover_url', sa.String(length=500), nullable=True),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('published_date', sa.String(length=50), nullable=True),
+            sa.Column('page_count', sa.Integer(), nullable=True),
+            sa.Column('google_books_id', sa.String(length=100), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_books_google_books_id'), 'books', ['google_books_id'], unique=False)
+        op.create_index(op.f('ix_books_id'), 'books', ['id'], unique=False)
+        op.create_index(op.f('ix_books_isbn'), 'books', ['isbn'], unique=True)
+        op.create_index(op.f('ix_books_title'), 'books', ['title'], unique=False)
+    if 'challenges' not in tables:
+        op.create_table(
+            'challenges',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('title', sa.String(length=255), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('cover_url', sa.String(length=500), nullable=True),
+            sa.Column('target_books', sa.Integer(), nullable=False),
+            sa.Column('start_date', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('end_date', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('xp_reward', sa.Integer(), nullable=True),
+            sa.Column('badge', sa.String(length=100), nullable=True),
+            sa.Column('tags', sa.String(length=500), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_challenges_id'), 'challenges', ['id'], unique=False)
+    if 'users' not in tables:
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=100), nullable=False),
+            sa.Column('email', sa.String(length=255), nullable=False),
+            sa.Column('hashed_password', sa.String(length=255), nullable=False),
+            sa.Column('avatar_url', sa.String(length=500), nullable=True),
+            sa.Column('role', sa.String(length=20), nullable=False),
+            sa.Column('is_active', sa.Boolean(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+        op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    if 'book_author' not in tables:
+        op.create_table(
+            'book_author',
+            sa.Column('book_id', sa.Integer(), nullable=True),
+            sa.Column('author_id', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['author_id'], ['authors.id'], ),
+            sa.ForeignKeyConstraint(['book_id'], ['books.id'], )
+        )
+    if 'groups' not in tables:
+        op.create_table(
+            'groups',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('name', sa.String(length=255), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('topic', sa.String(length=100), nullable=True),
+            sa.Column('cover_url', sa.String(length=500), nullable=True),
+            sa.Column('current_book_id', sa.Integer(), nullable=True),
+            sa.Column('members_count', sa.Integer(), nullable=True),
+            sa.Column('created_by', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+            sa.ForeignKeyConstraint(['current_book_id'], ['books.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_groups_id'), 'groups', ['id'], unique=False)
+    if 'reviews' not in tables:
+        op.create_table(
+            'reviews',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('book_id', sa.Integer(), nullable=False),
+            sa.Column('rating', sa.Float(), nullable=False),
+            sa.Column('review_text', sa.Text(), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(['book_id'], ['books.id'], ),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_reviews_id'), 'reviews', ['id'], unique=False)
+    if 'user_author_follow' not in tables:
+        op.create_table(
+            'user_author_follow',
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('author_id', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['author_id'], ['authors.id'], ),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], )
+        )
+    if 'user_books' not in tables:
+        op.create_table(
+            'user_books',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('book_id', sa.Integer(), nullable=False),
+            sa.Column('status', sa.String(length=50), nullable=True),
+            sa.Column('progress', sa.Integer(), nullable=True),
+            sa.Column('rating', sa.Float(), nullable=True),
+            sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('completed_at', sa.DateTime(timezone=True), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(['book_id'], ['books.id'], ),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_user_books_id'), 'user_books', ['id'], unique=False)
+    if 'user_challenge' not in tables:
+        op.create_table(
+            'user_challenge',
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('challenge_id', sa.Integer(), nullable=True),
+            sa.Column('progress', sa.Integer(), nullable=True),
+            sa.Column('completed', sa.Boolean(), nullable=True),
+            sa.ForeignKeyConstraint(['challenge_id'], ['challenges.id'], ),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], )
+        )
+    if 'group_discussions' not in tables:
+        op.create_table(
+            'group_discussions',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('group_id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(['group_id'], ['groups.id'], ),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_group_discussions_id'), 'group_discussions', ['id'], unique=False)
+    if 'group_events' not in tables:
+        op.create_table(
+            'group_events',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('group_id', sa.Integer(), nullable=False),
+            sa.Column('title', sa.String(length=255), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('event_date', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('location', sa.String(length=255), nullable=True),
+            sa.Column('created_by', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+            sa.ForeignKeyConstraint(['group_id'], ['groups.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_group_events_id'), 'group_events', ['id'], unique=False)
+    if 'group_schedules' not in tables:
+        op.create_table(
+            'group_schedules',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('group_id', sa.Integer(), nullable=False),
+            sa.Column('title', sa.String(length=255), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('scheduled_date', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('created_by', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
+            sa.ForeignKeyConstraint(['group_id'], ['groups.id'], ),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index(op.f('ix_group_schedules_id'), 'group_schedules', ['id'], unique=False)
+    if 'user_group' not in tables:
+        op.create_table(
+            'user_group',
+            sa.Column('user_id', sa.Integer(), nullable=True),
+            sa.Column('group_id', sa.Integer(), nullable=True),
+            sa.ForeignKeyConstraint(['group_id'], ['groups.id'], ),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], )
+        )
 
 
 def downgrade() -> None:
-    # ### commands auto generated by Alembic - please adjust! ###
-    pass
-    # ### end Alembic commands ###
+    op.drop_table('user_group')
+    op.drop_index(op.f('ix_group_schedules_id'), table_name='group_schedules')
+    op.drop_table('group_schedules')
+    op.drop_index(op.f('ix_group_events_id'), table_name='group_events')
+    op.drop_table('group_events')
+    op.drop_index(op.f('ix_group_discussions_id'), table_name='group_discussions')
+    op.drop_table('group_discussions')
+    op.drop_table('user_challenge')
+    op.drop_index(op.f('ix_user_books_id'), table_name='user_books')
+    op.drop_table('user_books')
+    op.drop_table('user_author_follow')
+    op.drop_index(op.f('ix_reviews_id'), table_name='reviews')
+    op.drop_table('reviews')
+    op.drop_index(op.f('ix_groups_id'), table_name='groups')
+    op.drop_table('groups')
+    op.drop_table('book_author')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
+    op.drop_index(op.f('ix_challenges_id'), table_name='challenges')
+    op.drop_table('challenges')
+    op.drop_index(op.f('ix_books_title'), table_name='books')
+    op.drop_index(op.f('ix_books_isbn'), table_name='books')
+    op.drop_index(op.f('ix_books_id'), table_name='books')
+    op.drop_index(op.f('ix_books_google_books_id'), table_name='books')
+    op.drop_table('books')
+    op.drop_index(op.f('ix_authors_name'), table_name='authors')
+    op.drop_index(op.f('ix_authors_id'), table_name='authors')
+    op.drop_table('authors')
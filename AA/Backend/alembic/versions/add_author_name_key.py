@@ -0,0 +1,85 @@
+"""Add normalized unique name_key to authors
+
+Revision ID: add_author_name_key
+Revises: add_book_rankings
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_author_name_key'
+down_revision: Union[str, None] = 'add_book_rankings'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def author_name_key(name: str) -> str:
+    # Bản sao của app.models.author_name_key tại thời điểm migration này
+    folded = unicodedata.normalize("NFKD", name.replace("đ", "d").replace("Đ", "D"))
+    folded = "".join(char for char in folded if not unicodedata.combining(char))
+    return " ".join(folded.casefold().split())[:255]
+
+
+def _merge_duplicate_authors(conn) -> None:
+    """Backfill name_key and fold authors sharing a key into the oldest one"""
+    keepers = {}
+    duplicates = []
+    rows = conn.execute(sa.text("SELECT id, name FROM authors ORDER BY id")).fetchall()
+    for author_id, name in rows:
+        key = author_name_key(name or "")
+        if key in keepers:
+            duplicates.append({"duplicate": author_id, "keeper": keepers[key]})
+        else:
+            keepers[key] = author_id
+
+    if rows:
+        conn.execute(
+            sa.text("UPDATE authors SET name_key = :key WHERE id = :id"),
+            [{"id": author_id, "key": author_name_key(name or "")} for author_id, name in rows]
+        )
+    if not duplicates:
+        return
+
+    # Chuyển sách / người theo dõi / thông báo sang tác giả giữ lại, bỏ các liên kết đã có sẵn
+    for table, owner in (("book_author", "book_id"), ("user_author_follow", "user_id")):
+        conn.execute(sa.text(
+            f"DELETE FROM {table} WHERE author_id = :duplicate AND {owner} IN "
+            f"(SELECT {owner} FROM {table} WHERE author_id = :keeper)"
+        ), duplicates)
+        conn.execute(sa.text(f"UPDATE {table} SET author_id = :keeper WHERE author_id = :duplicate"), duplicates)
+    conn.execute(sa.text("UPDATE author_notifications SET author_id = :keeper WHERE author_id = :duplicate"), duplicates)
+    conn.execute(sa.text("DELETE FROM authors WHERE id = :duplicate"), duplicates)
+    conn.execute(sa.text("""
+        UPDATE authors SET followers_count =
+            (SELECT count(*) FROM user_author_follow WHERE user_author_follow.author_id = authors.id)
+    """))
+
+
+def upgrade() -> None:
+    # Add name_key column + unique index (only if they don't exist)
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    columns = [col['name'] for col in inspector.get_columns('authors')]
+    indexes = [index['name'] for index in inspector.get_indexes('authors')]
+
+    if 'name_key' not in columns:
+        op.add_column('authors', sa.Column('name_key', sa.String(length=255), nullable=True))
+    if 'ix_authors_name_key' not in indexes:
+        _merge_duplicate_authors(conn)
+        with op.batch_alter_table('authors') as batch_op:
+            batch_op.alter_column('name_key', existing_type=sa.String(length=255), nullable=False)
+        op.create_index('ix_authors_name_key', 'authors', ['name_key'], unique=True)
+
+
+def downgrade() -> None:
+    # Merged duplicate authors are not restored
+    op.drop_index('ix_authors_name_key', table_name='authors')
+    with op.batch_alter_table('authors') as batch_op:
+        batch_op.drop_column('name_key')
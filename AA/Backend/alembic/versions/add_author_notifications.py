@@ -36,8 +36,8 @@ def upgrade() -> None:
             sa.Column('book_id', sa.Integer(), nullable=True),
             sa.Column('cover_url', sa.String(length=500), nullable=True),
             sa.Column('created_by', sa.Integer(), nullable=False),
-            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
-            sa.Column('is_active', sa.Boolean(), nullable=True, server_default='true'),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.Column('is_active', sa.Boolean(), nullable=True, server_default=sa.true()),
             sa.ForeignKeyConstraint(['author_id'], ['authors.id'], ),
             sa.ForeignKeyConstraint(['book_id'], ['books.id'], ),
             sa.ForeignKeyConstraint(['created_by'], ['users.id'], ),
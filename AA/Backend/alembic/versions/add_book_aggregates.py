@@ -0,0 +1,53 @@
+"""Add denormalized rating and reader aggregates to books
+
+Revision ID: add_book_aggregates
+Revises: add_book_search
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_book_aggregates'
+down_revision: Union[str, None] = 'add_book_search'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Add aggregate columns to books table (only if they don't exist)
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    columns = [col['name'] for col in inspector.get_columns('books')]
+
+    if 'average_rating' not in columns:
+        op.add_column('books', sa.Column('average_rating', sa.Float(), nullable=True))
+    if 'review_count' not in columns:
+        op.add_column('books', sa.Column('review_count', sa.Integer(), nullable=False, server_default='0'))
+    if 'rating_sum' not in columns:
+        op.add_column('books', sa.Column('rating_sum', sa.Float(), nullable=False, server_default='0'))
+    if 'reader_count' not in columns:
+        op.add_column('books', sa.Column('reader_count', sa.Integer(), nullable=False, server_default='0'))
+
+    # Backfill from existing reviews / user_books (later drift: python -m app.book_stats)
+    op.execute("""
+        UPDATE books SET
+            review_count = (SELECT count(*) FROM reviews WHERE reviews.book_id = books.id),
+            rating_sum = (SELECT coalesce(sum(rating), 0) FROM reviews WHERE reviews.book_id = books.id),
+            average_rating = (SELECT avg(rating) FROM reviews WHERE reviews.book_id = books.id),
+            reader_count = (SELECT count(*) FROM user_books WHERE user_books.book_id = books.id)
+    """)
+
+
+def downgrade() -> None:
+    # Remove aggregate columns from books table
+    with op.batch_alter_table('books') as batch_op:
+        batch_op.drop_column('reader_count')
+        batch_op.drop_column('rating_sum')
+        batch_op.drop_column('review_count')
+        batch_op.drop_column('average_rating')
@@ -0,0 +1,46 @@
+"""Add book_rankings table
+
+Revision ID: add_book_rankings
+Revises: add_book_aggregates
+Create Date: 2026-10-18 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_book_rankings'
+down_revision: Union[str, None] = 'add_book_aggregates'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Create book_rankings table (only if it doesn't exist); filled by python -m app.rankings
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    tables = inspector.get_table_names()
+
+    if 'book_rankings' not in tables:
+        op.create_table(
+            'book_rankings',
+            sa.Column('book_id', sa.Integer(), nullable=False),
+            sa.Column('reader_count', sa.Integer(), nullable=False),
+            sa.Column('review_count', sa.Integer(), nullable=False),
+            sa.Column('trending_score', sa.Float(), nullable=False),
+            sa.Column('refreshed_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+            sa.ForeignKeyConstraint(['book_id'], ['books.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('book_id')
+        )
+        op.create_index('ix_book_rankings_popularity', 'book_rankings', ['reader_count', 'review_count', 'book_id'], unique=False)
+        op.create_index('ix_book_rankings_trending', 'book_rankings', ['trending_score', 'book_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_book_rankings_trending', table_name='book_rankings')
+    op.drop_index('ix_book_rankings_popularity', table_name='book_rankings')
+    op.drop_table('book_rankings')
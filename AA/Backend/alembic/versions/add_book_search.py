@@ -0,0 +1,55 @@
+"""Add full-text and trigram search indexes for books
+
+Revision ID: add_book_search
+Revises: add_hot_path_indexes
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_book_search'
+down_revision: Union[str, None] = 'add_hot_path_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Title weighs more than description; must stay in sync with app/search.py (config "simple")
+SEARCH_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(description, '')), 'C')"
+)
+
+
+def upgrade() -> None:
+    # tsvector / pg_trgm are PostgreSQL features; SQLite keeps the ILIKE search
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql':
+        return
+
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+
+    inspector = inspect(conn)
+    columns = [col['name'] for col in inspector.get_columns('books')]
+    if 'search_vector' not in columns:
+        op.execute(f'ALTER TABLE books ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED')
+
+    op.execute('CREATE INDEX IF NOT EXISTS ix_books_search_vector ON books USING gin (search_vector)')
+    op.execute('CREATE INDEX IF NOT EXISTS ix_books_title_trgm ON books USING gin (title gin_trgm_ops)')
+    op.execute('CREATE INDEX IF NOT EXISTS ix_authors_name_trgm ON authors USING gin (name gin_trgm_ops)')
+
+
+def downgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name != 'postgresql':
+        return
+
+    op.execute('DROP INDEX IF EXISTS ix_authors_name_trgm')
+    op.execute('DROP INDEX IF EXISTS ix_books_title_trgm')
+    op.execute('DROP INDEX IF EXISTS ix_books_search_vector')
+    op.execute('ALTER TABLE books DROP COLUMN IF EXISTS search_vector')
@@ -0,0 +1,53 @@
+"""Add joined_at to user_group
+
+Revision ID: add_group_member_joined_at
+Revises: add_author_name_key
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_group_member_joined_at'
+down_revision: Union[str, None] = 'add_author_name_key'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Add joined_at column + (group_id, joined_at, user_id) index (only if they don't exist)
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    columns = [col['name'] for col in inspector.get_columns('user_group')]
+    indexes = [index['name'] for index in inspector.get_indexes('user_group')]
+
+    if 'joined_at' not in columns:
+        # SQLite không cho ADD COLUMN với default CURRENT_TIMESTAMP: thêm nullable, backfill rồi mới đặt NOT NULL.
+        # Ngày tham gia cũ không được lưu - lấy ngày tạo câu lạc bộ làm mốc.
+        op.add_column('user_group', sa.Column('joined_at', sa.DateTime(timezone=True), nullable=True))
+        op.execute("""
+            UPDATE user_group SET joined_at = COALESCE(
+                (SELECT groups.created_at FROM groups WHERE groups.id = user_group.group_id),
+                CURRENT_TIMESTAMP
+            )
+        """)
+        with op.batch_alter_table('user_group') as batch_op:
+            batch_op.alter_column(
+                'joined_at',
+                existing_type=sa.DateTime(timezone=True),
+                server_default=sa.func.now(),
+                nullable=False
+            )
+    if 'ix_user_group_group_id_joined_at' not in indexes:
+        op.create_index('ix_user_group_group_id_joined_at', 'user_group', ['group_id', 'joined_at', 'user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_group_group_id_joined_at', table_name='user_group')
+    with op.batch_alter_table('user_group') as batch_op:
+        batch_op.drop_column('joined_at')
@@ -0,0 +1,98 @@
+"""Add indexes and primary keys for hot lookup paths
+
+Revision ID: add_hot_path_indexes
+Revises: add_user_token_version
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_hot_path_indexes'
+down_revision: Union[str, None] = 'add_user_token_version'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (table, columns) - association tables get a composite primary key
+ASSOCIATION_PRIMARY_KEYS = [
+    ('book_author', ['book_id', 'author_id']),
+    ('user_group', ['user_id', 'group_id']),
+    ('user_challenge', ['user_id', 'challenge_id']),
+    ('user_author_follow', ['user_id', 'author_id']),
+    ('user_book_follow', ['user_id', 'book_id']),
+]
+
+# (index name, table, columns) - matches the filter/order clauses of the routers
+INDEXES = [
+    ('ix_book_author_author_id', 'book_author', ['author_id']),
+    ('ix_user_group_group_id', 'user_group', ['group_id']),
+    ('ix_user_challenge_challenge_id', 'user_challenge', ['challenge_id']),
+    ('ix_user_author_follow_author_id', 'user_author_follow', ['author_id']),
+    ('ix_user_books_user_id_book_id', 'user_books', ['user_id', 'book_id']),
+    ('ix_user_books_book_id', 'user_books', ['book_id']),
+    ('ix_reviews_book_id', 'reviews', ['book_id']),
+    ('ix_reviews_user_id', 'reviews', ['user_id']),
+    ('ix_group_discussions_group_id_created_at', 'group_discussions', ['group_id', 'created_at']),
+    ('ix_group_schedules_group_id_scheduled_date', 'group_schedules', ['group_id', 'scheduled_date']),
+    ('ix_group_events_group_id_event_date', 'group_events', ['group_id', 'event_date']),
+    ('ix_author_notifications_author_active_created', 'author_notifications', ['author_id', 'is_active', 'created_at']),
+]
+
+
+def _delete_duplicates(conn, table: str, columns: list) -> None:
+    """Drop rows with NULL keys and keep one row per key so the primary key can be added"""
+    key = ', '.join(columns)
+    not_null = ' OR '.join(f'{column} IS NULL' for column in columns)
+    op.execute(f'DELETE FROM {table} WHERE {not_null}')
+
+    if conn.dialect.name == 'postgresql':
+        same_key = ' AND '.join(f'a.{column} = b.{column}' for column in columns)
+        op.execute(f'DELETE FROM {table} a USING {table} b WHERE a.ctid > b.ctid AND {same_key}')
+    else:
+        op.execute(f'DELETE FROM {table} WHERE rowid NOT IN (SELECT MIN(rowid) FROM {table} GROUP BY {key})')
+
+
+def upgrade() -> None:
+    # Only add what is missing - library_schema.sql databases already have some of these
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    tables = inspector.get_table_names()
+
+    for table, columns in ASSOCIATION_PRIMARY_KEYS:
+        if table not in tables or inspector.get_pk_constraint(table).get('constrained_columns'):
+            continue
+        _delete_duplicates(conn, table, columns)
+        # batch mode recreates the table on SQLite, which cannot ALTER a primary key
+        with op.batch_alter_table(table) as batch_op:
+            for column in columns:
+                batch_op.alter_column(column, existing_type=sa.Integer(), nullable=False)
+            batch_op.create_primary_key(f'pk_{table}', columns)
+
+    for name, table, columns in INDEXES:
+        if table not in tables:
+            continue
+        existing = {index['name'] for index in inspect(conn).get_indexes(table)}
+        if name not in existing:
+            op.create_index(name, table, columns, unique=False)
+
+
+def downgrade() -> None:
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+
+    for name, table, columns in reversed(INDEXES):
+        existing = {index['name'] for index in inspect(conn).get_indexes(table)}
+        if name in existing:
+            op.drop_index(name, table_name=table)
+
+    for table, columns in reversed(ASSOCIATION_PRIMARY_KEYS):
+        pk = inspect(conn).get_pk_constraint(table)
+        if pk.get('name') == f'pk_{table}':
+            with op.batch_alter_table(table) as batch_op:
+                batch_op.drop_constraint(f'pk_{table}', type_='primary')
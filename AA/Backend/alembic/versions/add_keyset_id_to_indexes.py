@@ -0,0 +1,48 @@
+"""Add id to the indexes behind (created_at, id) keyset pagination
+
+Revision ID: add_keyset_id_to_indexes
+Revises: add_scheduled_jobs
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_keyset_id_to_indexes'
+down_revision: Union[str, None] = 'add_scheduled_jobs'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# (index name, table, old columns, new columns) - id breaks created_at ties, so
+# "ORDER BY created_at DESC, id DESC" and the cursor comparison are one index range
+INDEXES = [
+    ('ix_group_discussions_group_id_created_at', 'group_discussions',
+     ['group_id', 'created_at'], ['group_id', 'created_at', 'id']),
+    ('ix_author_notifications_author_active_created', 'author_notifications',
+     ['author_id', 'is_active', 'created_at'], ['author_id', 'is_active', 'created_at', 'id']),
+]
+
+
+def _replace_index(name: str, table: str, columns: list) -> None:
+    """(Re)create the index with these columns unless it already has them"""
+    from sqlalchemy import inspect
+    existing = {index['name']: index['column_names'] for index in inspect(op.get_bind()).get_indexes(table)}
+    if existing.get(name) == columns:
+        return
+    if name in existing:
+        op.drop_index(name, table_name=table)
+    op.create_index(name, table, columns, unique=False)
+
+
+def upgrade() -> None:
+    for name, table, _, columns in INDEXES:
+        _replace_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, columns, _ in INDEXES:
+        _replace_index(name, table, columns)
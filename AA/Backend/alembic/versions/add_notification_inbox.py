@@ -0,0 +1,76 @@
+"""Add notification_inbox and unread notification counters
+
+Revision ID: add_notification_inbox
+Revises: add_group_member_joined_at
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_notification_inbox'
+down_revision: Union[str, None] = 'add_group_member_joined_at'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Add inbox table + counter / delivery columns (only if they don't exist)
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    tables = inspector.get_table_names()
+    user_columns = [col['name'] for col in inspector.get_columns('users')]
+    author_columns = [col['name'] for col in inspector.get_columns('authors')]
+    notification_columns = [col['name'] for col in inspector.get_columns('author_notifications')]
+
+    if 'unread_notifications' not in user_columns:
+        op.add_column('users', sa.Column('unread_notifications', sa.Integer(), server_default='0', nullable=False))
+    if 'notifications_read_at' not in user_columns:
+        op.add_column('users', sa.Column('notifications_read_at', sa.DateTime(timezone=True), nullable=True))
+    if 'pull_notifications' not in author_columns:
+        op.add_column('authors', sa.Column('pull_notifications', sa.Boolean(), server_default=sa.false(), nullable=False))
+    if 'delivery' not in notification_columns:
+        op.add_column('author_notifications', sa.Column('delivery', sa.String(length=10), server_default='inbox', nullable=False))
+
+    if 'notification_inbox' not in tables:
+        op.create_table(
+            'notification_inbox',
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('notification_id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+            sa.Column('read_at', sa.DateTime(timezone=True), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+            sa.ForeignKeyConstraint(['notification_id'], ['author_notifications.id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('user_id', 'notification_id')
+        )
+        op.create_index('ix_notification_inbox_user_created', 'notification_inbox', ['user_id', 'created_at', 'notification_id'], unique=False)
+        op.create_index('ix_notification_inbox_notification_id', 'notification_inbox', ['notification_id'], unique=False)
+
+        # Thông báo đã có: đưa vào inbox của người đang theo dõi, coi như đã đọc (bộ đếm chưa đọc bắt đầu từ 0)
+        op.execute("""
+            INSERT INTO notification_inbox (user_id, notification_id, created_at, read_at)
+            SELECT user_author_follow.user_id, author_notifications.id,
+                   COALESCE(author_notifications.created_at, CURRENT_TIMESTAMP),
+                   COALESCE(author_notifications.created_at, CURRENT_TIMESTAMP)
+            FROM user_author_follow
+            JOIN author_notifications ON author_notifications.author_id = user_author_follow.author_id
+            WHERE author_notifications.is_active
+        """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notification_inbox_notification_id', table_name='notification_inbox')
+    op.drop_index('ix_notification_inbox_user_created', table_name='notification_inbox')
+    op.drop_table('notification_inbox')
+    with op.batch_alter_table('author_notifications') as batch_op:
+        batch_op.drop_column('delivery')
+    with op.batch_alter_table('authors') as batch_op:
+        batch_op.drop_column('pull_notifications')
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('notifications_read_at')
+        batch_op.drop_column('unread_notifications')
@@ -0,0 +1,47 @@
+"""Add scheduled_jobs table and created_at indexes for the trending window
+
+Revision ID: add_scheduled_jobs
+Revises: add_notification_inbox
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_scheduled_jobs'
+down_revision: Union[str, None] = 'add_notification_inbox'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Create scheduled_jobs table + (created_at, book_id) indexes (only if they don't exist)
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    tables = inspector.get_table_names()
+    user_book_indexes = [index['name'] for index in inspector.get_indexes('user_books')]
+    review_indexes = [index['name'] for index in inspector.get_indexes('reviews')]
+
+    if 'scheduled_jobs' not in tables:
+        op.create_table(
+            'scheduled_jobs',
+            sa.Column('name', sa.String(length=100), nullable=False),
+            sa.Column('last_run_at', sa.DateTime(timezone=True), nullable=True),
+            sa.PrimaryKeyConstraint('name')
+        )
+    # Cửa sổ trending của app/rankings.py lọc theo created_at
+    if 'ix_user_books_created_at' not in user_book_indexes:
+        op.create_index('ix_user_books_created_at', 'user_books', ['created_at', 'book_id'], unique=False)
+    if 'ix_reviews_created_at' not in review_indexes:
+        op.create_index('ix_reviews_created_at', 'reviews', ['created_at', 'book_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_reviews_created_at', table_name='reviews')
+    op.drop_index('ix_user_books_created_at', table_name='user_books')
+    op.drop_table('scheduled_jobs')
@@ -30,7 +30,7 @@ def upgrade() -> None:
             'user_book_follow',
             sa.Column('user_id', sa.Integer(), nullable=False),
             sa.Column('book_id', sa.Integer(), nullable=False),
-            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+            sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
             sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
             sa.ForeignKeyConstraint(['book_id'], ['books.id'], ),
             sa.PrimaryKeyConstraint('user_id', 'book_id')
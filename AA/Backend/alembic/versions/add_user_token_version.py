@@ -0,0 +1,34 @@
+"""Add token_version to users
+
+Revision ID: add_user_token_version
+Revises: add_user_book_follow
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_user_token_version'
+down_revision: Union[str, None] = 'add_user_book_follow'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Add token_version column to users table (only if it doesn't exist)
+    from sqlalchemy import inspect
+    conn = op.get_bind()
+    inspector = inspect(conn)
+    columns = [col['name'] for col in inspector.get_columns('users')]
+
+    if 'token_version' not in columns:
+        op.add_column('users', sa.Column('token_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade() -> None:
+    # Remove token_version column from users table
+    op.drop_column('users', 'token_version')
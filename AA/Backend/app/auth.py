@@ -1,76 +1,23 @@
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app.cache import TTLCache
 from app.config import settings
 from app.database import get_db
+from app.hashing import verify_password, get_password_hash
 from app.models import User
 from app.schemas import TokenData
 
-# Configure password context with bcrypt
-# Using bcrypt with rounds=12 for better security
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=12)
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
 
-
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """Verify a password against its hash"""
-    if not plain_password or not hashed_password:
-        return False
-    
-    try:
-        # Try with passlib first (most common case)
-        return pwd_context.verify(plain_password, hashed_password)
-    except Exception as e:
-        # Fallback: try with direct bcrypt if passlib fails
-        try:
-            import bcrypt
-            password_bytes = plain_password.encode('utf-8')
-            if len(password_bytes) > 72:
-                password_bytes = password_bytes[:72]
-            
-            # hashed_password might already be a string, check if it needs encoding
-            if isinstance(hashed_password, str):
-                hash_bytes = hashed_password.encode('utf-8')
-            else:
-                hash_bytes = hashed_password
-            
-            return bcrypt.checkpw(password_bytes, hash_bytes)
-        except Exception:
-            return False
-
-
-def get_password_hash(password: str) -> str:
-    """Hash a password using bcrypt"""
-    if not password:
-        raise ValueError("Password cannot be empty")
-    
-    try:
-        # Ensure password is a string and handle encoding
-        if not isinstance(password, str):
-            password = str(password)
-        
-        # Bcrypt has a 72 byte limit, truncate if necessary
-        password_bytes = password.encode('utf-8')
-        if len(password_bytes) > 72:
-            password = password_bytes[:72].decode('utf-8', errors='ignore')
-        
-        return pwd_context.hash(password)
-    except Exception as e:
-        # Fallback: try with direct bcrypt if passlib fails
-        import bcrypt
-        password_bytes = password.encode('utf-8')
-        if len(password_bytes) > 72:
-            password_bytes = password_bytes[:72]
-        salt = bcrypt.gensalt(rounds=12)
-        hashed = bcrypt.hashpw(password_bytes, salt)
-        # Ensure we return a string
-        if isinstance(hashed, bytes):
-            return hashed.decode('utf-8')
-        return hashed
+# Cache principal theo token subject (email) -> chỉ lưu các field tối thiểu
+principal_cache = TTLCache(
+    maxsize=settings.PRINCIPAL_CACHE_SIZE,
+    ttl=settings.PRINCIPAL_CACHE_TTL_SECONDS
+)
 
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
@@ -85,6 +32,24 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     return encoded_jwt
 
 
+def create_user_tokens(user: User) -> dict:
+    """Issue an access/refresh token pair carrying the user's id, role and token version.
+    
+    The access token is self-contained so authorization needs no users lookup;
+    the refresh token is re-checked against the database on every refresh.
+    """
+    version = user.token_version or 0
+    access_token = create_access_token(
+        data={"sub": user.email, "uid": user.id, "role": user.role, "ver": version, "type": "access"},
+        expires_delta=timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    )
+    refresh_token = create_access_token(
+        data={"sub": user.email, "uid": user.id, "ver": version, "type": "refresh"},
+        expires_delta=timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS)
+    )
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+
 def verify_token(token: str, credentials_exception: HTTPException) -> TokenData:
     """Verify JWT token and return token data"""
     try:
@@ -92,12 +57,54 @@ def verify_token(token: str, credentials_exception: HTTPException) -> TokenData:
         email: str = payload.get("sub")
         if email is None:
             raise credentials_exception
-        token_data = TokenData(email=email)
+        token_data = TokenData(
+            email=email,
+            user_id=payload.get("uid"),
+            role=payload.get("role"),
+            token_version=payload.get("ver"),
+            token_type=payload.get("type", "access")
+        )
     except JWTError:
         raise credentials_exception
     return token_data
 
 
+class TokenRevocations:
+    """In-memory revocation floor: user id -> lowest token version still valid.
+    
+    One small int per recently revoked user instead of a list of tokens. Entries
+    only need to outlive an access token, so they expire with the same TTL;
+    after that every older token has expired on its own.
+    """
+    
+    def __init__(self):
+        self._floors = TTLCache(
+            maxsize=settings.TOKEN_REVOCATION_CACHE_SIZE,
+            ttl=settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60
+        )
+    
+    def revoke(self, user_id: int, min_version: int) -> None:
+        self._floors.set(user_id, min_version)
+    
+    def is_revoked(self, user_id: int, version: int) -> bool:
+        floor = self._floors.get(user_id)
+        return floor is not None and version < floor
+
+
+token_revocations = TokenRevocations()
+
+
+def revoke_user_tokens(user: User) -> None:
+    """Bump the user's token version so every token issued so far stops working.
+    
+    The caller commits. This worker rejects old access tokens immediately;
+    other workers stop accepting them when they expire, since refresh checks
+    the stored version.
+    """
+    user.token_version = (user.token_version or 0) + 1
+    token_revocations.revoke(user.id, user.token_version)
+
+
 def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: Session = Depends(get_db)
@@ -109,12 +116,55 @@ def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     token_data = verify_token(token, credentials_exception)
+    if token_data.token_type != "access":
+        raise credentials_exception
+    
+    # Token mới mang sẵn id/role/version -> không cần query DB
+    if token_data.user_id is not None and token_data.role is not None and token_data.token_version is not None:
+        if token_revocations.is_revoked(token_data.user_id, token_data.token_version):
+            raise credentials_exception
+        return _attach_principal(db, {
+            "id": token_data.user_id,
+            "email": token_data.email,
+            "role": token_data.role,
+            "is_active": True,
+        })
+    
+    # Token cũ chỉ có sub=email -> dùng principal cache
+    principal = principal_cache.get(token_data.email)
+    if principal is not None:
+        return _attach_principal(db, principal)
+    
     user = db.query(User).filter(User.email == token_data.email).first()
     if user is None:
         raise credentials_exception
+    
+    principal_cache.set(token_data.email, {
+        "id": user.id,
+        "email": user.email,
+        "role": user.role,
+        "is_active": user.is_active,
+    })
     return user
 
 
+def _attach_principal(db: Session, principal: dict) -> User:
+    """Attach a cached principal to the session without querying the users table.
+    
+    Only id/email/role/is_active are populated; any other column is loaded
+    lazily (one primary-key SELECT) if an endpoint actually touches it.
+    """
+    user = User(**principal)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
+
+
+def invalidate_principal(email: Optional[str]) -> None:
+    """Drop a cached principal after the user's row changes"""
+    if email:
+        principal_cache.delete(email)
+
+
 def get_current_active_user(current_user: User = Depends(get_current_user)) -> User:
     """Get current active user (can be extended for user status checks)"""
     if not current_user.is_active:
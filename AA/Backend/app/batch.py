@@ -0,0 +1,14 @@
+from typing import Iterable, List, Tuple
+
+
+def unique_ids(ids: Iterable[int]) -> List[int]:
+    """Requested ids without repeats, in request order"""
+    return list(dict.fromkeys(ids))
+
+
+def in_request_order(ids: List[int], rows: Iterable) -> Tuple[list, List[int]]:
+    """(rows ordered like `ids`, ids with no row) - unknown ids are reported, not an error"""
+    by_id = {row.id: row for row in rows}
+    found = [by_id[row_id] for row_id in ids if row_id in by_id]
+    missing = [row_id for row_id in ids if row_id not in by_id]
+    return found, missing
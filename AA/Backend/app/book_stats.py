@@ -0,0 +1,98 @@
+from typing import Iterable, Optional
+from sqlalchemy import update, select, func, case, or_
+from sqlalchemy.orm import Session
+from app.models import Book, Review, UserBook
+
+# Aggregates kept on books: review_count, rating_sum, average_rating, reader_count.
+# Writes adjust them with a single relative UPDATE in the caller's transaction,
+# so concurrent requests never overwrite each other's increments.
+
+
+def apply_review_delta(db: Session, book_id: int, count_delta: int, rating_delta: float) -> None:
+    """Add/remove reviews from a book's rating aggregates (caller commits)"""
+    new_count = Book.review_count + count_delta
+    new_sum = Book.rating_sum + rating_delta
+    db.execute(
+        update(Book)
+        .where(Book.id == book_id)
+        .values(
+            review_count=new_count,
+            rating_sum=case((new_count > 0, new_sum), else_=0),
+            # SET expressions see the row before the update on both PostgreSQL and SQLite
+            average_rating=case((new_count > 0, new_sum / new_count), else_=None)
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+def review_added(db: Session, book_id: int, rating: float) -> None:
+    apply_review_delta(db, book_id, 1, rating)
+
+
+def review_removed(db: Session, book_id: int, rating: float) -> None:
+    apply_review_delta(db, book_id, -1, -rating)
+
+
+def review_rating_changed(db: Session, book_id: int, old_rating: float, new_rating: float) -> None:
+    if old_rating != new_rating:
+        apply_review_delta(db, book_id, 0, new_rating - old_rating)
+
+
+def apply_reader_delta(db: Session, book_id: int, delta: int) -> None:
+    """Count a user_books row being added (+1) or removed (-1)"""
+    db.execute(
+        update(Book)
+        .where(Book.id == book_id)
+        .values(reader_count=Book.reader_count + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def reconcile_book_stats(db: Session, book_ids: Optional[Iterable[int]] = None) -> int:
+    """Recompute the aggregates from reviews/user_books; returns how many books had drifted.
+
+    One set-based UPDATE; only rows whose stored values differ are written.
+    Pass book_ids to repair specific books (e.g. after a cascading delete).
+    """
+    review_count = select(func.count(Review.id)).where(Review.book_id == Book.id).scalar_subquery()
+    rating_sum = select(func.coalesce(func.sum(Review.rating), 0)).where(Review.book_id == Book.id).scalar_subquery()
+    average_rating = select(func.avg(Review.rating)).where(Review.book_id == Book.id).scalar_subquery()
+    reader_count = select(func.count(UserBook.id)).where(UserBook.book_id == Book.id).scalar_subquery()
+
+    statement = update(Book).where(
+        or_(
+            Book.review_count != review_count,
+            Book.reader_count != reader_count,
+            func.abs(Book.rating_sum - rating_sum) > 1e-6,
+            Book.average_rating.is_(None) != (review_count == 0)
+        )
+    )
+    if book_ids is not None:
+        book_ids = list(book_ids)
+        if not book_ids:
+            return 0
+        statement = statement.where(Book.id.in_(book_ids))
+
+    result = db.execute(
+        statement.values(
+            review_count=review_count,
+            rating_sum=rating_sum,
+            average_rating=average_rating,
+            reader_count=reader_count
+        ).execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    # Sửa lệch số liệu (chạy định kỳ hoặc sau khi sửa dữ liệu bằng tay):
+    #   python -m app.book_stats
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        repaired = reconcile_book_stats(db)
+        db.commit()
+        print(f"Reconciled book aggregates: {repaired} book(s) repaired")
+    finally:
+        db.close()
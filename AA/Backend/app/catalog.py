@@ -0,0 +1,73 @@
+from typing import Dict, Iterable, List
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from app.database import dialect_insert
+from app.models import Author, author_name_key
+
+
+def clean_author_names(names: Iterable[str]) -> List[str]:
+    """Strip names, drop blanks and names that fold to the same key, keep the given order"""
+    cleaned = []
+    seen = set()
+    for name in names or []:
+        name = (name or "").strip()
+        key = author_name_key(name)
+        if key and key not in seen:
+            seen.add(key)
+            cleaned.append(name)
+    return cleaned
+
+
+def resolve_authors(db: Session, names: Iterable[str]) -> Dict[str, Author]:
+    """name_key -> Author for every name, creating missing authors (caller commits).
+
+    One SELECT ... WHERE name_key IN (...) for the existing authors and one
+    INSERT ... ON CONFLICT (name_key) DO NOTHING RETURNING for the rest. A
+    name created concurrently by another request loses the conflict and is
+    picked up by a final SELECT, so no duplicates and no IntegrityError.
+    """
+    names = clean_author_names(names)
+    if not names:
+        return {}
+    keys = [author_name_key(name) for name in names]
+
+    authors = {author.name_key: author for author in db.scalars(select(Author).where(Author.name_key.in_(keys)))}
+
+    missing = [(key, name) for key, name in zip(keys, names) if key not in authors]
+    if missing:
+        inserted = db.scalars(
+            dialect_insert(db, Author)
+            .values([{"name": name, "name_key": key, "followers_count": 0} for key, name in missing])
+            .on_conflict_do_nothing(index_elements=[Author.name_key])
+            .returning(Author)
+        )
+        authors.update((author.name_key, author) for author in inserted)
+
+        lost_race = [key for key, _ in missing if key not in authors]
+        if lost_race:
+            authors.update(
+                (author.name_key, author) for author in db.scalars(select(Author).where(Author.name_key.in_(lost_race)))
+            )
+    return authors
+
+
+def authors_for(db: Session, names: Iterable[str]) -> List[Author]:
+    """Authors for `names` in the given order (duplicates folded), creating missing ones"""
+    names = list(names or [])
+    authors = resolve_authors(db, names)
+    return [authors[author_name_key(name)] for name in clean_author_names(names)]
+
+
+def get_or_create_author(db: Session, name: str, **fields) -> Author:
+    """The author whose name folds to the same key as `name`, else a new one with `fields`"""
+    name = name.strip()
+    key = author_name_key(name)
+    author = db.scalars(
+        dialect_insert(db, Author)
+        .values(name=name, name_key=key, followers_count=0, **fields)
+        .on_conflict_do_nothing(index_elements=[Author.name_key])
+        .returning(Author)
+    ).first()
+    if author is None:
+        author = db.scalars(select(Author).where(Author.name_key == key)).one()
+    return author
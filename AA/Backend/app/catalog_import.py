@@ -0,0 +1,240 @@
+import csv
+import json
+import time
+from typing import IO, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+from app.catalog import clean_author_names, resolve_authors
+from app.models import Book, author_name_key, book_author_association
+from app.schemas import BookCreate
+
+IMPORT_FORMATS = ("csv", "jsonl")
+DEFAULT_CHUNK_SIZE = 1000
+# CSV: tác giả trong một cột, phân tách bằng ";" (hoặc "|")
+AUTHOR_SEPARATORS = (";", "|")
+# Số lỗi tối đa giữ lại trong báo cáo (vẫn đếm hết)
+MAX_REPORTED_ERRORS = 1000
+
+BOOK_FIELDS = ("title", "isbn", "cover_url", "file_url", "description", "published_date", "page_count", "google_books_id")
+
+
+class ImportReport:
+    """Counters and per-row errors for one import run"""
+
+    def __init__(self):
+        self.rows_read = 0
+        self.inserted = 0
+        self.duplicates = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+        self.started_at = time.perf_counter()
+        self.elapsed = 0.0
+
+    def error(self, line: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "error": message})
+
+    def finish(self) -> "ImportReport":
+        self.elapsed = time.perf_counter() - self.started_at
+        return self
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_read / self.elapsed if self.elapsed else 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "rows_read": self.rows_read,
+            "inserted": self.inserted,
+            "duplicates": self.duplicates,
+            "failed": self.failed,
+            "elapsed_seconds": round(self.elapsed, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+            "errors": self.errors,
+        }
+
+
+def detect_format(filename: Optional[str]) -> Optional[str]:
+    if filename:
+        suffix = filename.rsplit(".", 1)[-1].lower()
+        if suffix in ("jsonl", "ndjson"):
+            return "jsonl"
+        if suffix == "csv":
+            return "csv"
+    return None
+
+
+def _split_authors(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(name) for name in value]
+    value = str(value)
+    for separator in AUTHOR_SEPARATORS:
+        if separator in value:
+            return value.split(separator)
+    return [value]
+
+
+def read_rows(stream: IO[str], fmt: str) -> Iterator[Tuple[int, object]]:
+    """(line number, raw row) pairs; rows are read lazily so large files stream"""
+    if fmt == "csv":
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+    elif fmt == "jsonl":
+        for line_number, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except ValueError as e:
+                yield line_number, e
+    else:
+        raise ValueError(f"Unsupported import format: {fmt}")
+
+
+def parse_row(raw) -> BookCreate:
+    """Validate one raw row with the same schema as POST /api/books"""
+    if isinstance(raw, Exception):
+        raise ValueError(f"Invalid JSON: {raw}")
+    if not isinstance(raw, dict):
+        raise ValueError("Row must be an object")
+    data = {field: raw.get(field) for field in BOOK_FIELDS if raw.get(field) not in (None, "")}
+    data["author_names"] = clean_author_names(_split_authors(raw.get("author_names", raw.get("authors"))))
+    return BookCreate.model_validate(data)
+
+
+def _existing_keys(db: Session, column, values) -> set:
+    values = {value for value in values if value}
+    if not values:
+        return set()
+    return set(db.execute(select(column).where(column.in_(values))).scalars())
+
+
+def _insert_books(db: Session, books: List[Tuple[int, BookCreate]]) -> None:
+    """Insert a batch of new books and their author links (caller commits)"""
+    authors = resolve_authors(db, [name for _, book in books for name in book.author_names])
+    book_ids = db.execute(
+        insert(Book).returning(Book.id, sort_by_parameter_order=True),
+        [book.model_dump(exclude={"author_names"}) for _, book in books]
+    ).scalars().all()
+    links = [
+        {"book_id": book_id, "author_id": authors[author_name_key(name)].id}
+        for book_id, (_, book) in zip(book_ids, books)
+        for name in book.author_names
+    ]
+    if links:
+        db.execute(insert(book_author_association), links)
+
+
+def _import_chunk(db: Session, chunk: List[Tuple[int, BookCreate]], seen_isbns: set, seen_google_ids: set, report: ImportReport) -> None:
+    # Dedupe theo ISBN / google_books_id: một câu IN cho cả chunk thay vì một query mỗi dòng
+    existing_isbns = _existing_keys(db, Book.isbn, [book.isbn for _, book in chunk])
+    existing_google_ids = _existing_keys(db, Book.google_books_id, [book.google_books_id for _, book in chunk])
+
+    new_books = []
+    for line, book in chunk:
+        if (book.isbn and (book.isbn in existing_isbns or book.isbn in seen_isbns)) or (
+            book.google_books_id and (book.google_books_id in existing_google_ids or book.google_books_id in seen_google_ids)
+        ):
+            report.duplicates += 1
+            continue
+        if book.isbn:
+            seen_isbns.add(book.isbn)
+        if book.google_books_id:
+            seen_google_ids.add(book.google_books_id)
+        new_books.append((line, book))
+    if not new_books:
+        return
+
+    try:
+        _insert_books(db, new_books)
+        db.commit()
+        report.inserted += len(new_books)
+        return
+    except SQLAlchemyError:
+        db.rollback()
+
+    # Chunk lỗi (vd. sách trùng được thêm song song): thử lại từng dòng để chỉ ra dòng hỏng
+    for line, book in new_books:
+        try:
+            _insert_books(db, [(line, book)])
+            db.commit()
+            report.inserted += 1
+        except SQLAlchemyError as e:
+            db.rollback()
+            report.error(line, str(e.orig if hasattr(e, "orig") and e.orig else e).splitlines()[0])
+
+
+def import_books(db: Session, stream: IO[str], fmt: str, chunk_size: int = DEFAULT_CHUNK_SIZE, progress=None) -> ImportReport:
+    """Stream books from CSV/JSONL into the catalog, committing every `chunk_size` rows.
+
+    Columns/keys: title, isbn, google_books_id, description, cover_url,
+    file_url, published_date, page_count and authors (list, or one string
+    separated by ";"). Rows whose ISBN or google_books_id already exists are
+    counted as duplicates; invalid rows are reported by line and skipped.
+    """
+    report = ImportReport()
+    seen_isbns: set = set()
+    seen_google_ids: set = set()
+    chunk: List[Tuple[int, BookCreate]] = []
+
+    for line, raw in read_rows(stream, fmt):
+        report.rows_read += 1
+        try:
+            chunk.append((line, parse_row(raw)))
+        except ValidationError as e:
+            report.error(line, "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors()))
+        except ValueError as e:
+            report.error(line, str(e))
+        if len(chunk) >= chunk_size:
+            _import_chunk(db, chunk, seen_isbns, seen_google_ids, report)
+            chunk = []
+            if progress:
+                progress(report)
+    if chunk:
+        _import_chunk(db, chunk, seen_isbns, seen_google_ids, report)
+    return report.finish()
+
+
+if __name__ == "__main__":
+    # Nhập catalog sách từ file (seed / đồng bộ định kỳ):
+    #   python -m app.catalog_import books.csv
+    #   python -m app.catalog_import books.jsonl --chunk-size 5000
+    import argparse
+    import asyncio
+    from app.database import SessionLocal
+    from app.response_cache import invalidate
+
+    parser = argparse.ArgumentParser(description="Bulk import books from CSV or JSONL")
+    parser.add_argument("path")
+    parser.add_argument("--format", choices=IMPORT_FORMATS)
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or detect_format(args.path)
+    if fmt is None:
+        parser.error("Cannot tell the format from the file name, pass --format")
+
+    def print_progress(report: ImportReport) -> None:
+        elapsed = time.perf_counter() - report.started_at
+        print(f"  {report.rows_read} rows, {report.inserted} inserted ({report.rows_read / elapsed:.0f} rows/s)")
+
+    db = SessionLocal()
+    try:
+        with open(args.path, encoding="utf-8-sig", newline="") as stream:
+            report = import_books(db, stream, fmt, args.chunk_size, progress=print_progress)
+    finally:
+        db.close()
+    asyncio.run(invalidate("books", "authors"))
+
+    print(
+        f"Imported {report.inserted} book(s) from {report.rows_read} row(s) in {report.elapsed:.1f}s "
+        f"({report.rows_per_second:.0f} rows/s): {report.duplicates} duplicate(s), {report.failed} error(s)"
+    )
+    for error in report.errors[:20]:
+        print(f"  line {error['line']}: {error['error']}")
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import List
+from typing import List, Optional
 from pathlib import Path
 import os
 
@@ -17,11 +17,87 @@ if ENV_FILE.exists():
 class Settings(BaseSettings):
     # Database
     DATABASE_URL: str
+    # Read replica (comma-separated), để trống nếu không dùng
+    DATABASE_REPLICA_URLS: str = ""
+    # Sau khi ghi, client đọc từ primary trong khoảng thời gian này (read-your-writes)
+    READ_YOUR_WRITES_SECONDS: int = 5
+    # Chỉ dùng cho dev/test: tạo bảng bằng create_all() thay vì kiểm tra alembic revision
+    DB_AUTO_CREATE: bool = False
+    
+    # Connection pool (áp dụng cho mỗi engine, mỗi worker process)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # Giây chờ connection trước khi báo lỗi
+    DB_POOL_PRE_PING: bool = True  # Tắt để bỏ round-trip kiểm tra ở mỗi checkout
+    DB_POOL_RECYCLE: int = 3600
+    
+    # SQL instrumentation - header X-DB-Query-Count / Server-Timing, cảnh báo N+1
+    SQL_INSTRUMENTATION_ENABLED: bool = True
+    SQL_N_PLUS_ONE_THRESHOLD: int = 5  # Số lần lặp lại cùng một câu SQL để bị coi là N+1
     
     # JWT
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 14
+    TOKEN_REVOCATION_CACHE_SIZE: int = 100000
+    
+    # Principal cache - tránh query bảng users ở mỗi request đã xác thực
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL_SECONDS: int = 60
+    
+    # Password hashing pool - bcrypt chạy trong process pool riêng
+    PASSWORD_HASH_WORKERS: Optional[int] = None  # None = số CPU
+    PASSWORD_HASH_MAX_QUEUE: int = 64
+    
+    # Bcrypt cost - để trống BCRYPT_ROUNDS thì tự calibrate lúc khởi động theo BCRYPT_TARGET_MS
+    # (nhiều replica: nên đặt cùng một BCRYPT_ROUNDS cho cả cụm; hash chỉ được nâng cost, không hạ)
+    BCRYPT_ROUNDS: Optional[int] = None
+    BCRYPT_TARGET_MS: int = 250
+    BCRYPT_MIN_ROUNDS: int = 10
+    BCRYPT_MAX_ROUNDS: int = 14
+    
+    # Membership cache - chỉ lưu kết quả "là thành viên" (group / challenge / follow), TTL ngắn
+    MEMBERSHIP_CACHE_SIZE: int = 100000
+    MEMBERSHIP_CACHE_TTL_SECONDS: int = 30
+    
+    # Rate limiting - policy dạng "<số lần>/<second|minute|hour|day>" cho từng route
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"  # memory | redis (cần cài package redis)
+    RATE_LIMIT_REDIS_URL: Optional[str] = None
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    RATE_LIMIT_TRUST_FORWARDED_FOR: bool = False  # Bật khi chạy sau reverse proxy
+    RATE_LIMIT_LOGIN: str = "10/minute"
+    RATE_LIMIT_REGISTER: str = "5/minute"
+    RATE_LIMIT_DISCUSSION: str = "20/minute"
+    RATE_LIMIT_PROFILE_BATCH: str = "20/minute"  # POST /api/auth/users/batch, tối đa BATCH_MAX_IDS id mỗi lần
+    
+    # Response cache (ETag / 304) cho các route đọc public: sách, tác giả, thử thách, câu lạc bộ
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_BACKEND: str = "memory"  # memory | redis (dùng chung giữa các worker, cần package redis)
+    RESPONSE_CACHE_REDIS_URL: Optional[str] = None
+    RESPONSE_CACHE_MAX_BYTES: int = 32 * 1024 * 1024  # Giới hạn theo dung lượng body, mỗi worker
+    RESPONSE_CACHE_TTL_SECONDS: int = 60  # Với backend memory, worker khác có thể trả dữ liệu cũ tối đa chừng này
+    RESPONSE_CACHE_MAX_AGE: int = 0  # Cache-Control max-age; 0 = client luôn revalidate bằng If-None-Match
+    
+    # Bảng xếp hạng sách (book_rankings) - làm mới định kỳ bởi python -m app.scheduler (một process duy nhất),
+    # 0 = chỉ chạy tay: python -m app.rankings
+    RANKING_REFRESH_SECONDS: int = 300
+    TRENDING_HALF_LIFE_DAYS: float = 7.0  # Điểm trending giảm một nửa sau mỗi N ngày
+    
+    # Đẩy bình luận câu lạc bộ qua WebSocket / SSE (hub trong process - mỗi worker chỉ đẩy bình luận tạo trên worker đó)
+    DISCUSSION_PUSH_QUEUE_SIZE: int = 100  # Sự kiện chờ tối đa mỗi kết nối; đầy -> client nhận "resync" và bị ngắt
+    DISCUSSION_PUSH_HEARTBEAT_SECONDS: int = 15
+    DISCUSSION_PUSH_CATCH_UP_LIMIT: int = 200  # Số bình luận tối đa gửi lại từ since_id khi kết nối lại
+    
+    # Hộp thư thông báo tác giả: fan-out khi tạo thông báo, theo lô người theo dõi
+    NOTIFICATION_FANOUT_BATCH_SIZE: int = 1000
+    NOTIFICATION_FANOUT_MAX_FOLLOWERS: int = 10000  # Tác giả nhiều người theo dõi hơn -> người đọc kéo (pull) thay vì fan-out
+    NOTIFICATION_PULL_WINDOW_DAYS: int = 30  # Thông báo kéo chỉ xét trong N ngày gần nhất
+    
+    # Đối soát members_count / followers_count với bảng liên kết - định kỳ bởi python -m app.scheduler,
+    # 0 = chỉ chạy tay: python -m app.membership
+    MEMBERSHIP_RECONCILE_SECONDS: int = 3600
     
     # CORS - Parse từ string (comma-separated) thành List[str]
     CORS_ORIGINS: str = "http://localhost:5173,http://localhost:3000"
@@ -31,6 +107,11 @@ class Settings(BaseSettings):
         """Parse CORS_ORIGINS string thành list"""
         return [origin.strip() for origin in self.CORS_ORIGINS.split(",") if origin.strip()]
     
+    @property
+    def database_replica_urls_list(self) -> List[str]:
+        """Parse DATABASE_REPLICA_URLS string thành list"""
+        return [url.strip() for url in self.DATABASE_REPLICA_URLS.split(",") if url.strip()]
+    
     # Cấu hình Pydantic v2
     model_config = SettingsConfigDict(
         env_file=str(ENV_FILE) if ENV_FILE.exists() else ".env",
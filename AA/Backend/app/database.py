@@ -1,26 +1,167 @@
+import itertools
+import time
+from fastapi import Request, Response
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.pool import NullPool
 from app.config import settings
+from app.pool_metrics import InstrumentedQueuePool, InstrumentedAsyncQueuePool, instrument_engine
+
+
+def engine_options(url: str, async_driver: bool = False) -> dict:
+    """Pool settings from DB_POOL_* (SQLite keeps SQLAlchemy's own pool choice)"""
+    options = {
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,  # Verify connections before using
+        "pool_recycle": settings.DB_POOL_RECYCLE,  # Recycle connections after N seconds
+        "echo": False,  # Set to True for SQL query logging
+    }
+    if make_url(url).get_backend_name() != "sqlite":
+        options.update(
+            poolclass=InstrumentedAsyncQueuePool if async_driver else InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+        )
+    return options
+
 
 # Create engine with connection pool settings
-engine = create_engine(
-    settings.DATABASE_URL,
-    pool_pre_ping=True,  # Verify connections before using
-    pool_recycle=3600,  # Recycle connections after 1 hour
-    echo=False  # Set to True for SQL query logging
-)
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+instrument_engine("primary", engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+def to_async_url(url: str) -> str:
+    """Map a sync DATABASE_URL to its async driver (asyncpg / aiosqlite)"""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend in ("postgresql", "postgres"):
+        parsed = parsed.set(drivername="postgresql+asyncpg")
+        # asyncpg dùng ?ssl=... thay cho ?sslmode=... của psycopg2
+        sslmode = parsed.query.get("sslmode")
+        if sslmode:
+            parsed = parsed.difference_update_query(["sslmode"]).update_query_dict({"ssl": sslmode})
+    elif backend == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+    return parsed.render_as_string(hide_password=False)
+
+
+# Async engine song song cho các route đọc nhiều (không chiếm thread của threadpool khi chờ DB)
+async_engine = create_async_engine(
+    to_async_url(settings.DATABASE_URL),
+    **engine_options(settings.DATABASE_URL, async_driver=True)
+)
+instrument_engine("primary-async", async_engine)
+
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+# Read replicas (tùy chọn) - chỉ nhận request GET/HEAD
+replica_engines = [
+    create_engine(url, **engine_options(url))
+    for url in settings.database_replica_urls_list
+]
+ReplicaSessionLocals = [
+    sessionmaker(autocommit=False, autoflush=False, bind=replica_engine)
+    for replica_engine in replica_engines
+]
+
+async_replica_engines = [
+    create_async_engine(to_async_url(url), **engine_options(url, async_driver=True))
+    for url in settings.database_replica_urls_list
+]
+AsyncReplicaSessionLocals = [
+    async_sessionmaker(replica_engine, autoflush=False, expire_on_commit=False)
+    for replica_engine in async_replica_engines
+]
+
+for index, replica_engine in enumerate(replica_engines):
+    instrument_engine(f"replica-{index}", replica_engine)
+for index, replica_engine in enumerate(async_replica_engines):
+    instrument_engine(f"replica-{index}-async", replica_engine)
+
+_replica_counter = itertools.count()
+
+READ_METHODS = ("GET", "HEAD")
+# POST .../batch chỉ đọc (danh sách id nằm trong body) - cũng được đi replica
+BATCH_READ_SUFFIX = "/batch"
+# Client vừa ghi được "dính" vào primary tới thời điểm này (unix timestamp).
+# Trình duyệt dùng cookie; client khác gửi lại header nhận được trong response.
+PRIMARY_STICKY_COOKIE = "bc_primary_until"
+PRIMARY_STICKY_HEADER = "X-Primary-Until"
+
 Base = declarative_base()
 
 
-def get_db():
+def _primary_sticky(request: Request) -> bool:
+    value = request.cookies.get(PRIMARY_STICKY_COOKIE) or request.headers.get(PRIMARY_STICKY_HEADER)
+    if not value:
+        return False
+    try:
+        return float(value) > time.time()
+    except ValueError:
+        return False
+
+
+def is_read_request(request: Request) -> bool:
+    return request.method in READ_METHODS or (
+        request.method == "POST" and request.url.path.endswith(BATCH_READ_SUFFIX)
+    )
+
+
+def use_replica(request: Request) -> bool:
+    """Route to a replica only for reads from clients that haven't written recently"""
+    return is_read_request(request) and not _primary_sticky(request)
+
+
+def mark_primary_sticky(response: Response) -> None:
+    """Pin the client to the primary for READ_YOUR_WRITES_SECONDS after a write"""
+    until = str(int(time.time() + settings.READ_YOUR_WRITES_SECONDS))
+    response.set_cookie(
+        PRIMARY_STICKY_COOKIE,
+        until,
+        max_age=settings.READ_YOUR_WRITES_SECONDS,
+        httponly=True,
+        samesite="lax"
+    )
+    response.headers[PRIMARY_STICKY_HEADER] = until
+
+
+def _pick(session_factories):
+    return session_factories[next(_replica_counter) % len(session_factories)]
+
+
+def session_factory_for(request: Request):
+    """Replica sessionmaker for reads (when configured), else the primary one"""
+    if ReplicaSessionLocals and use_replica(request):
+        return _pick(ReplicaSessionLocals)
+    return SessionLocal
+
+
+def get_db(request: Request):
     """Dependency for getting database session"""
-    db = SessionLocal()
+    db = session_factory_for(request)()
     try:
         yield db
     finally:
         db.close()
 
+
+async def get_async_db(request: Request):
+    """Dependency for getting an async database session"""
+    session_factory = AsyncSessionLocal
+    if AsyncReplicaSessionLocals and use_replica(request):
+        session_factory = _pick(AsyncReplicaSessionLocals)
+    async with session_factory() as db:
+        yield db
+
+
+def dialect_insert(db, table):
+    """INSERT supporting ON CONFLICT for the session's database (PostgreSQL / SQLite)"""
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(table)
@@ -0,0 +1,211 @@
+import asyncio
+from typing import AsyncIterator, Dict, Optional, Set
+from fastapi import HTTPException
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.orm import selectinload
+from starlette.requests import HTTPConnection
+from app.auth import get_current_user
+from app.config import settings
+from app.database import SessionLocal, AsyncSessionLocal
+from app.models import Group, GroupDiscussion
+from app.schemas import DiscussionEvent, GroupDiscussionResponse
+
+CREATED = "discussion.created"
+DELETED = "discussion.deleted"
+PING = "ping"
+RESYNC = "resync"
+
+
+class Event:
+    """One pushed message, serialized once and shared by every subscriber"""
+
+    def __init__(self, event: DiscussionEvent):
+        self.type = event.type
+        self.discussion_id = event.discussion_id
+        self.data = event.model_dump_json(exclude_none=True)
+
+    def sse(self) -> str:
+        # Chỉ sự kiện created mang id -> EventSource gửi lại Last-Event-ID = bình luận mới nhất đã nhận
+        event_id = f"id: {self.discussion_id}\n" if self.type == CREATED else ""
+        return f"{event_id}event: {self.type}\ndata: {self.data}\n\n"
+
+
+def discussion_event(event_type: str, group_id: int, discussion_id: int, discussion=None) -> Event:
+    return Event(DiscussionEvent(
+        type=event_type,
+        group_id=group_id,
+        discussion_id=discussion_id,
+        discussion=GroupDiscussionResponse.model_validate(discussion) if discussion is not None else None
+    ))
+
+
+class Subscriber:
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+
+class DiscussionHub:
+    """In-process pub/sub: group id -> connected subscribers.
+
+    Routes publish from the threadpool; delivery is handed to the event loop
+    with call_soon_threadsafe. Each subscriber has a bounded queue - a client
+    that falls behind is not buffered without limit but dropped with a
+    "resync" message, and resumes from its last discussion id on reconnect.
+    """
+
+    def __init__(self, queue_size: int):
+        self.queue_size = queue_size
+        self._groups: Dict[int, Set[Subscriber]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, group_id: int) -> Subscriber:
+        self._loop = asyncio.get_running_loop()
+        subscriber = Subscriber(self.queue_size)
+        self._groups.setdefault(group_id, set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, group_id: int, subscriber: Subscriber) -> None:
+        subscribers = self._groups.get(group_id)
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._groups[group_id]
+
+    def has_subscribers(self, group_id: int) -> bool:
+        return bool(self._groups.get(group_id))
+
+    def publish(self, group_id: int, event: Event) -> None:
+        """Queue an event for every subscriber of the group; safe to call from any thread"""
+        if self._loop is None or not self.has_subscribers(group_id):
+            return
+        self.published += 1
+        self._loop.call_soon_threadsafe(self._deliver, group_id, event)
+
+    def _deliver(self, group_id: int, event: Event) -> None:
+        for subscriber in list(self._groups.get(group_id, ())):
+            try:
+                subscriber.queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Bỏ các sự kiện đang chờ, chỉ để lại tín hiệu resync rồi ngừng gửi cho kết nối này
+                self.dropped += 1
+                self.unsubscribe(group_id, subscriber)
+                while not subscriber.queue.empty():
+                    subscriber.queue.get_nowait()
+                subscriber.queue.put_nowait(None)
+
+    def stats(self) -> dict:
+        return {
+            "groups": len(self._groups),
+            "connections": sum(len(subscribers) for subscribers in self._groups.values()),
+            "published": self.published,
+            "dropped_slow_consumers": self.dropped,
+        }
+
+
+discussion_hub = DiscussionHub(settings.DISCUSSION_PUSH_QUEUE_SIZE)
+
+
+def discussion_created(discussion: GroupDiscussion) -> None:
+    """Push a committed discussion (serialized only when someone is listening)"""
+    if discussion_hub.has_subscribers(discussion.group_id):
+        discussion_hub.publish(
+            discussion.group_id,
+            discussion_event(CREATED, discussion.group_id, discussion.id, discussion)
+        )
+
+
+def discussion_deleted(group_id: int, discussion_id: int) -> None:
+    discussion_hub.publish(group_id, discussion_event(DELETED, group_id, discussion_id))
+
+
+def connection_token(connection: HTTPConnection) -> Optional[str]:
+    """Bearer token from the Authorization header, else ?token= (browsers cannot set headers on WebSocket / EventSource)"""
+    authorization = connection.headers.get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        return token
+    return connection.query_params.get("token")
+
+
+def _authenticate(token: str) -> Optional[int]:
+    db = SessionLocal()
+    try:
+        user = get_current_user(token=token, db=db)
+        return user.id if user.is_active else None
+    except HTTPException:
+        return None
+    finally:
+        db.close()
+
+
+async def authenticate_connection(connection: HTTPConnection) -> Optional[int]:
+    """User id for the connection's access token, None if missing/invalid (same checks as the REST routes)"""
+    token = connection_token(connection)
+    if not token:
+        return None
+    return await run_in_threadpool(_authenticate, token)
+
+
+async def group_exists(group_id: int) -> bool:
+    # Session ngắn riêng: kết nối stream sống lâu, không giữ connection của pool
+    async with AsyncSessionLocal() as db:
+        return await db.scalar(select(Group.id).where(Group.id == group_id)) is not None
+
+
+async def _catch_up(group_id: int, since_id: int, limit: int):
+    """Discussions created after `since_id`, oldest first; None if there are more than `limit`"""
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(GroupDiscussion)
+            .options(selectinload(GroupDiscussion.user))
+            .where(GroupDiscussion.group_id == group_id, GroupDiscussion.id > since_id)
+            .order_by(GroupDiscussion.id)
+            .limit(limit + 1)
+        )
+        discussions = result.scalars().all()
+    if len(discussions) > limit:
+        return None
+    return [discussion_event(CREATED, group_id, discussion.id, discussion) for discussion in discussions]
+
+
+async def group_events(group_id: int, since_id: Optional[int] = None) -> AsyncIterator[Event]:
+    """Events for one connection: missed discussions after `since_id`, then live ones.
+
+    Subscribes before reading the backlog so nothing committed in between is
+    lost; live events for discussions already sent from the backlog are
+    skipped. Yields a ping every DISCUSSION_PUSH_HEARTBEAT_SECONDS of silence
+    and ends after a "resync" (backlog too long, or the connection fell behind).
+    """
+    subscriber = discussion_hub.subscribe(group_id)
+    last_id = since_id or 0
+    replayed = set()
+    try:
+        if since_id is not None:
+            backlog = await _catch_up(group_id, since_id, settings.DISCUSSION_PUSH_CATCH_UP_LIMIT)
+            if backlog is None:
+                yield Event(DiscussionEvent(type=RESYNC, group_id=group_id, since_id=since_id))
+                return
+            for event in backlog:
+                replayed.add(event.discussion_id)
+                last_id = event.discussion_id
+                yield event
+
+        while True:
+            try:
+                event = await asyncio.wait_for(subscriber.queue.get(), timeout=settings.DISCUSSION_PUSH_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield Event(DiscussionEvent(type=PING, group_id=group_id))
+                continue
+            if event is None:
+                yield Event(DiscussionEvent(type=RESYNC, group_id=group_id, since_id=last_id))
+                return
+            if event.type == CREATED:
+                if event.discussion_id in replayed:
+                    continue
+                last_id = max(last_id, event.discussion_id)
+            yield event
+    finally:
+        discussion_hub.unsubscribe(group_id, subscriber)
@@ -0,0 +1,180 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+import bcrypt
+from fastapi import HTTPException, status
+from app.config import settings
+
+# Cost factor đang dùng (BCRYPT_ROUNDS hoặc kết quả calibrate), tính một lần mỗi process
+_bcrypt_rounds: Optional[int] = None
+
+
+def _password_bytes(password: str) -> bytes:
+    # Bcrypt has a 72 byte limit, truncate if necessary
+    return password.encode("utf-8")[:72]
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """Verify a password against its hash"""
+    if not plain_password or not hashed_password:
+        return False
+    
+    try:
+        return bcrypt.checkpw(_password_bytes(plain_password), hashed_password.encode("utf-8"))
+    except ValueError:
+        # Malformed hash stored in DB
+        return False
+
+
+def get_password_hash(password: str, rounds: Optional[int] = None) -> str:
+    """Hash a password using bcrypt at the configured/calibrated cost"""
+    if not password:
+        raise ValueError("Password cannot be empty")
+    
+    salt = bcrypt.gensalt(rounds=rounds or get_bcrypt_rounds())
+    return bcrypt.hashpw(_password_bytes(password), salt).decode("utf-8")
+
+
+def hash_rounds(hashed_password: str) -> Optional[int]:
+    """Read the cost factor from a modular-crypt bcrypt hash ($2b$12$...)"""
+    try:
+        return int(hashed_password.split("$")[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def password_needs_rehash(hashed_password: str) -> bool:
+    """True when a stored hash is weaker than the cost this node uses.
+    
+    Only upgrades: nodes calibrated on different hardware may pick different
+    costs, and rehashing down as well would flip a user's hash back and
+    forth (an extra bcrypt + UPDATE) on every login that lands elsewhere.
+    """
+    rounds = hash_rounds(hashed_password)
+    return rounds is None or rounds < get_bcrypt_rounds()
+
+
+def measure_bcrypt_ms(rounds: int, samples: int = 3) -> float:
+    """Best-of-N wall time for one bcrypt hash at the given cost"""
+    password = b"calibration-password"
+    best = float("inf")
+    for _ in range(samples):
+        start = time.perf_counter()
+        bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+        best = min(best, (time.perf_counter() - start) * 1000)
+    return best
+
+
+def calibrate_bcrypt_rounds(
+    target_ms: float,
+    min_rounds: int = 10,
+    max_rounds: int = 14
+) -> int:
+    """Pick the highest cost factor whose hash time stays within target_ms.
+    
+    Each extra round doubles the work, so a single measurement at min_rounds
+    is enough to extrapolate the rest.
+    """
+    base_ms = measure_bcrypt_ms(min_rounds)
+    rounds = min_rounds
+    while rounds < max_rounds and base_ms * 2 ** (rounds + 1 - min_rounds) <= target_ms:
+        rounds += 1
+    return rounds
+
+
+def get_bcrypt_rounds() -> int:
+    """Cost factor for new hashes: BCRYPT_ROUNDS if set, otherwise calibrated once"""
+    global _bcrypt_rounds
+    if _bcrypt_rounds is None:
+        if settings.BCRYPT_ROUNDS:
+            _bcrypt_rounds = settings.BCRYPT_ROUNDS
+        else:
+            _bcrypt_rounds = calibrate_bcrypt_rounds(
+                settings.BCRYPT_TARGET_MS,
+                settings.BCRYPT_MIN_ROUNDS,
+                settings.BCRYPT_MAX_ROUNDS
+            )
+    return _bcrypt_rounds
+
+
+class PasswordHasher:
+    """Async bcrypt service backed by a bounded process pool.
+    
+    bcrypt is CPU bound, so running it inline ties up a threadpool slot (and
+    part of the GIL) for the whole hash. Jobs are shipped to worker processes
+    instead; once ``max_queue`` jobs are in flight new requests are rejected
+    immediately with 503 rather than piling up behind the pool.
+    """
+    
+    def __init__(self, max_workers: Optional[int] = None, max_queue: int = 64):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.max_queue = max_queue
+        self._executor: Optional[ProcessPoolExecutor] = None
+        # Only touched from the event loop thread, so no lock is needed
+        self._in_flight = 0
+        self.rejected = 0
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        return self._executor
+    
+    async def _submit(self, fn, *args):
+        if self._in_flight >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again shortly",
+                headers={"Retry-After": "1"},
+            )
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), fn, *args)
+        finally:
+            self._in_flight -= 1
+    
+    async def hash(self, password: str) -> str:
+        # Pass the cost explicitly so workers never calibrate on their own
+        return await self._submit(get_password_hash, password, get_bcrypt_rounds())
+    
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._submit(verify_password, plain_password, hashed_password)
+    
+    def stats(self) -> dict:
+        return {
+            "max_workers": self.max_workers,
+            "max_queue": self.max_queue,
+            "in_flight": self._in_flight,
+            "rejected": self.rejected,
+        }
+    
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_queue=settings.PASSWORD_HASH_MAX_QUEUE
+)
+
+
+if __name__ == "__main__":
+    # Calibrate on the deployed hardware:
+    #   python -m app.hashing --target-ms 250
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Pick a bcrypt cost factor for this machine")
+    parser.add_argument("--target-ms", type=float, default=settings.BCRYPT_TARGET_MS)
+    parser.add_argument("--min-rounds", type=int, default=settings.BCRYPT_MIN_ROUNDS)
+    parser.add_argument("--max-rounds", type=int, default=settings.BCRYPT_MAX_ROUNDS)
+    args = parser.parse_args()
+    
+    for cost in range(args.min_rounds, args.max_rounds + 1):
+        print(f"rounds={cost:2d}  {measure_bcrypt_ms(cost, samples=1):8.1f} ms")
+    chosen = calibrate_bcrypt_rounds(args.target_ms, args.min_rounds, args.max_rounds)
+    print(f"\nBCRYPT_ROUNDS={chosen}  (target {args.target_ms:.0f} ms)")
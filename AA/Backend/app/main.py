@@ -1,18 +1,47 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from app.config import settings
-from app.database import engine, Base
+from app.database import engine, Base, ReplicaSessionLocals, PRIMARY_STICKY_HEADER, is_read_request, mark_primary_sticky
+from app.hashing import password_hasher, get_bcrypt_rounds
+from app.pagination import NEXT_CURSOR_HEADER
+from app.response_cache import CACHE_STATUS_HEADER
+from app.schema_check import check_schema_revision
+from app.serialization import DefaultJSONResponse
+from app.sql_metrics import start_request_stats, apply_headers
 from app.routers import auth, books, reviews, groups, challenges, authors, upload, admin
 from pathlib import Path
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+static_dir = Path(__file__).parent.parent / "static"
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Không tạo bảng lúc import nữa: chỉ kiểm tra revision alembic (DB_AUTO_CREATE cho môi trường dev)
+    if settings.DB_AUTO_CREATE:
+        await run_in_threadpool(Base.metadata.create_all, bind=engine)
+    else:
+        await run_in_threadpool(check_schema_revision, engine)
+    static_dir.mkdir(exist_ok=True)
+    
+    # Chọn bcrypt cost theo phần cứng thực tế (bỏ qua nếu đã set BCRYPT_ROUNDS)
+    print(f"bcrypt cost factor: {get_bcrypt_rounds()}")
+    
+    # Bảng xếp hạng sách và đối soát bộ đếm thành viên chạy ở process riêng: python -m app.scheduler
+    yield
+    # Dừng process pool bcrypt khi worker tắt
+    password_hasher.shutdown()
+
 
 app = FastAPI(
     title="Book Club API",
     description="API for Book Club / Reading Tracker application",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # orjson khi đã cài; các list lớn đi qua app.serialization.render
+    default_response_class=DefaultJSONResponse
 )
 
 # CORS middleware
@@ -22,8 +51,30 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[PRIMARY_STICKY_HEADER, NEXT_CURSOR_HEADER, "ETag", CACHE_STATUS_HEADER, "X-DB-Query-Count", "Server-Timing", "X-DB-N-Plus-One"],
 )
 
+
+if settings.SQL_INSTRUMENTATION_ENABLED:
+    @app.middleware("http")
+    async def sql_instrumentation(request: Request, call_next):
+        """Count/time SQL statements per request and flag N+1 patterns"""
+        stats = start_request_stats()
+        response = await call_next(request)
+        apply_headers(response, stats, settings.SQL_N_PLUS_ONE_THRESHOLD)
+        return response
+
+
+if ReplicaSessionLocals:
+    @app.middleware("http")
+    async def read_your_writes(request: Request, call_next):
+        """After a successful write, keep this client's reads on the primary"""
+        response = await call_next(request)
+        if not is_read_request(request) and response.status_code < 400:
+            mark_primary_sticky(response)
+        return response
+
+
 # Include routers
 app.include_router(auth.router)
 app.include_router(books.router)
@@ -34,10 +85,8 @@ app.include_router(authors.router)
 app.include_router(upload.router)
 app.include_router(admin.router)
 
-# Serve static files (ảnh sách)
-static_dir = Path(__file__).parent.parent / "static"
-static_dir.mkdir(exist_ok=True)
-app.mount("/static", StaticFiles(directory=str(static_dir)), name="static")
+# Serve static files (ảnh sách) - thư mục được tạo trong lifespan
+app.mount("/static", StaticFiles(directory=str(static_dir), check_dir=False), name="static")
 
 
 @app.get("/")
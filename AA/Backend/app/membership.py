@@ -0,0 +1,202 @@
+from typing import Dict, Iterable, Iterator, List, Optional
+from sqlalchemy import Table, select, exists, delete, update, func, case
+from sqlalchemy.orm import Session
+from app.cache import TTLCache
+from app.config import settings
+from app.database import dialect_insert
+from app.models import (
+    Author, Group, User,
+    user_group_association, user_challenge_association,
+    user_author_follow_association, user_book_follow_association
+)
+from app.scheduler import claim_job
+
+# Only positive answers are cached: a user who just joined is never refused
+# from a stale entry, and leaving drops the entry in this worker (other workers
+# may still answer "member" for up to MEMBERSHIP_CACHE_TTL_SECONDS).
+membership_cache = TTLCache(
+    maxsize=settings.MEMBERSHIP_CACHE_SIZE,
+    ttl=settings.MEMBERSHIP_CACHE_TTL_SECONDS
+)
+
+
+class Membership:
+    """User <-> target rows of an association table.
+
+    Checks are an EXISTS on the (user_id, target) primary key and mutations
+    are direct INSERT / DELETE statements - the relationship collection
+    (group.members, author.followers, ...) is never loaded.
+
+    With a `counter` (e.g. Author.followers_count) the target's count is
+    adjusted by one relative UPDATE, only when the INSERT / DELETE actually
+    changed a row, so concurrent joins never lose or double an increment.
+    """
+
+    def __init__(self, name: str, table: Table, target_column: str, counter=None):
+        self.name = name
+        self.table = table
+        self.target_column_name = target_column
+        self.target_column = table.c[target_column]
+        self.counter = counter
+
+    def _match(self, user_id: int, target_id: int):
+        return (self.table.c.user_id == user_id) & (self.target_column == target_id)
+
+    def exists(self, db: Session, user_id: int, target_id: int) -> bool:
+        key = (self.name, user_id, target_id)
+        if membership_cache.get(key):
+            return True
+        found = db.execute(select(exists().where(self._match(user_id, target_id)))).scalar()
+        if found:
+            membership_cache.set(key, True)
+        return found
+
+    def add(self, db: Session, user_id: int, target_id: int, **values) -> bool:
+        """Insert the association row; False if it already existed (caller commits)"""
+        result = db.execute(
+            dialect_insert(db, self.table)
+            .values(user_id=user_id, **{self.target_column_name: target_id}, **values)
+            .on_conflict_do_nothing()
+        )
+        if result.rowcount != 1:
+            return False
+        self._adjust_counter(db, target_id, 1)
+        return True
+
+    def remove(self, db: Session, user_id: int, target_id: int) -> bool:
+        """Delete the association row; False if there was none (caller commits)"""
+        result = db.execute(delete(self.table).where(self._match(user_id, target_id)))
+        membership_cache.delete((self.name, user_id, target_id))
+        if result.rowcount == 0:
+            return False
+        self._adjust_counter(db, target_id, -1)
+        return True
+
+    def _adjust_counter(self, db: Session, target_id: int, delta: int) -> None:
+        if self.counter is None:
+            return
+        model = self.counter.class_
+        new_count = func.coalesce(self.counter, 0) + delta
+        db.execute(
+            update(model)
+            .where(model.id == target_id)
+            .values({self.counter: case((new_count > 0, new_count), else_=0)})
+            .execution_options(synchronize_session=False)
+        )
+
+    def target_ids_of(self, db: Session, user_id: int) -> set:
+        """Targets the user belongs to / follows (e.g. to reconcile them after deleting the user)"""
+        return set(db.execute(select(self.target_column).where(self.table.c.user_id == user_id)).scalars())
+
+    def reconcile_counts(self, db: Session, target_ids: Optional[Iterable[int]] = None) -> int:
+        """Recompute the counter from the association table; returns how many rows had drifted.
+
+        The target rows are locked first (SELECT ... FOR UPDATE) and counted
+        by the following statement: under READ COMMITTED its snapshot sees
+        every +1 / -1 already applied to those rows, and later ones wait for
+        our commit - a correlated count in a single UPDATE would keep its
+        older snapshot and overwrite them. Locks are held until the caller
+        commits, so pass a bounded set of ids (see target_id_batches).
+        """
+        if self.counter is None:
+            return 0
+        model = self.counter.class_
+        lock = select(model.id).order_by(model.id).with_for_update()
+        if target_ids is not None:
+            target_ids = list(target_ids)
+            if not target_ids:
+                return 0
+            lock = lock.where(model.id.in_(target_ids))
+        target_ids = list(db.execute(lock).scalars())
+        if not target_ids:
+            return 0
+        actual = select(func.count()).select_from(self.table).where(self.target_column == model.id).scalar_subquery()
+        result = db.execute(
+            update(model)
+            .where(model.id.in_(target_ids), func.coalesce(self.counter, -1) != actual)
+            .values({self.counter: actual})
+            .execution_options(synchronize_session=False)
+        )
+        return result.rowcount
+
+    def target_id_batches(self, db: Session, batch_size: int) -> Iterator[List[int]]:
+        """Ids of every counted target in ascending batches (keyset on id)"""
+        model = self.counter.class_
+        last_id = 0
+        while True:
+            ids = list(db.execute(
+                select(model.id).where(model.id > last_id).order_by(model.id).limit(batch_size)
+            ).scalars())
+            if not ids:
+                return
+            yield ids
+            last_id = ids[-1]
+
+
+group_members = Membership("group", user_group_association, "group_id", counter=Group.members_count)
+challenge_participants = Membership("challenge", user_challenge_association, "challenge_id")
+author_followers = Membership("author", user_author_follow_association, "author_id", counter=Author.followers_count)
+book_followers = Membership("book", user_book_follow_association, "book_id")
+
+COUNTED_MEMBERSHIPS = (group_members, author_followers)
+# Targets locked and recounted per transaction by the periodic reconcile
+RECONCILE_BATCH_SIZE = 1000
+# scheduled_jobs row guarding against overlapping reconciles
+MEMBERSHIP_RECONCILE_JOB = "membership_reconcile"
+
+# Cột trả về cho danh sách thành viên (MemberResponse) - không nạp cả đối tượng User
+MEMBER_COLUMNS = (
+    User.id, User.name, User.email, User.avatar_url, User.role, User.is_active, User.created_at,
+    user_group_association.c.joined_at
+)
+# sort -> keyset columns; user id breaks ties
+MEMBER_SORTS = {
+    "joined_at": (user_group_association.c.joined_at, User.id),
+    "name": (User.name, User.id),
+}
+
+
+def group_members_statement(group_id: int, name_prefix: Optional[str] = None):
+    """SELECT of a group's members as MEMBER_COLUMNS rows, optionally filtered by name prefix"""
+    statement = (
+        select(*MEMBER_COLUMNS)
+        .join(user_group_association, user_group_association.c.user_id == User.id)
+        .where(user_group_association.c.group_id == group_id)
+    )
+    if name_prefix:
+        statement = statement.where(User.name.istartswith(name_prefix, autoescape=True))
+    return statement
+
+
+def reconcile_membership_counts(db: Session, batch_size: int = RECONCILE_BATCH_SIZE) -> Dict[str, int]:
+    """Repair members_count / followers_count everywhere, committing after each batch of targets"""
+    repaired = {}
+    for membership in COUNTED_MEMBERSHIPS:
+        repaired[membership.name] = 0
+        for target_ids in membership.target_id_batches(db, batch_size):
+            repaired[membership.name] += membership.reconcile_counts(db, target_ids)
+            # Nhả khóa của lô này trước khi sang lô tiếp theo
+            db.commit()
+    return repaired
+
+
+def run_reconcile(min_interval_seconds: float = 0) -> Optional[Dict[str, int]]:
+    """Reconcile in its own session; None if another run started less than min_interval_seconds ago"""
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        claimed = claim_job(db, MEMBERSHIP_RECONCILE_JOB, min_interval_seconds)
+        db.commit()
+        if not claimed:
+            return None
+        return reconcile_membership_counts(db)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    # Sửa lệch members_count / followers_count ngay (chạy tay); định kỳ thì qua python -m app.scheduler:
+    #   python -m app.membership
+    repaired = run_reconcile()
+    print(", ".join(f"{name}: {count} repaired" for name, count in repaired.items()))
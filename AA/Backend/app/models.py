@@ -1,44 +1,52 @@
-from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, Boolean, Table
-from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+import unicodedata
+from sqlalchemy import Column, Integer, String, Float, Text, DateTime, ForeignKey, Boolean, Table, Index
+from sqlalchemy.orm import relationship, validates
+from sqlalchemy.sql import func, false
 from app.database import Base
 
 # Association tables for many-to-many relationships
 book_author_association = Table(
     'book_author',
     Base.metadata,
-    Column('book_id', Integer, ForeignKey('books.id')),
-    Column('author_id', Integer, ForeignKey('authors.id'))
+    Column('book_id', Integer, ForeignKey('books.id'), primary_key=True),
+    Column('author_id', Integer, ForeignKey('authors.id'), primary_key=True),
+    Index('ix_book_author_author_id', 'author_id')
 )
 
 user_group_association = Table(
     'user_group',
     Base.metadata,
-    Column('user_id', Integer, ForeignKey('users.id')),
-    Column('group_id', Integer, ForeignKey('groups.id'))
+    Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
+    Column('group_id', Integer, ForeignKey('groups.id'), primary_key=True),
+    Column('joined_at', DateTime(timezone=True), server_default=func.now(), nullable=False),
+    Index('ix_user_group_group_id', 'group_id'),
+    # Danh sách thành viên theo ngày tham gia (keyset joined_at, user_id)
+    Index('ix_user_group_group_id_joined_at', 'group_id', 'joined_at', 'user_id')
 )
 
 user_challenge_association = Table(
     'user_challenge',
     Base.metadata,
-    Column('user_id', Integer, ForeignKey('users.id')),
-    Column('challenge_id', Integer, ForeignKey('challenges.id')),
+    Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
+    Column('challenge_id', Integer, ForeignKey('challenges.id'), primary_key=True),
     Column('progress', Integer, default=0),
-    Column('completed', Boolean, default=False)
+    Column('completed', Boolean, default=False),
+    Index('ix_user_challenge_challenge_id', 'challenge_id')
 )
 
 user_author_follow_association = Table(
     'user_author_follow',
     Base.metadata,
-    Column('user_id', Integer, ForeignKey('users.id')),
-    Column('author_id', Integer, ForeignKey('authors.id'))
+    Column('user_id', Integer, ForeignKey('users.id'), primary_key=True),
+    Column('author_id', Integer, ForeignKey('authors.id'), primary_key=True),
+    Index('ix_user_author_follow_author_id', 'author_id')
 )
 
 user_book_follow_association = Table(
     'user_book_follow',
     Base.metadata,
-    Column('user_id', Integer, ForeignKey('users.id')),
-    Column('book_id', Integer, ForeignKey('books.id')),
+    Column('user_id', Integer, ForeignKey('users.id'), primary_key=True, index=True),
+    Column('book_id', Integer, ForeignKey('books.id'), primary_key=True, index=True),
     Column('created_at', DateTime(timezone=True), server_default=func.now())
 )
 
@@ -53,6 +61,9 @@ class User(Base):
     avatar_url = Column(String(500), nullable=True)
     role = Column(String(20), default="user", nullable=False)  # 'user' or 'admin'
     is_active = Column(Boolean, default=True, nullable=False)
+    token_version = Column(Integer, default=0, server_default="0", nullable=False)  # Tăng lên để thu hồi mọi token đã cấp
+    unread_notifications = Column(Integer, default=0, server_default="0", nullable=False)  # Số dòng chưa đọc trong notification_inbox
+    notifications_read_at = Column(DateTime(timezone=True), nullable=True)  # "Đánh dấu đã đọc tất cả" lần cuối (cho thông báo kéo)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
     
@@ -78,6 +89,11 @@ class Book(Base):
     page_count = Column(Integer, nullable=True)
     google_books_id = Column(String(100), nullable=True, index=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Số liệu tổng hợp, cập nhật cùng transaction với review / user_books (xem app/book_stats.py)
+    average_rating = Column(Float, nullable=True)
+    review_count = Column(Integer, default=0, server_default="0", nullable=False)
+    rating_sum = Column(Float, default=0, server_default="0", nullable=False)
+    reader_count = Column(Integer, default=0, server_default="0", nullable=False)
     
     # Relationships
     authors = relationship("Author", secondary=book_author_association, back_populates="books")
@@ -86,19 +102,68 @@ class Book(Base):
     followers = relationship("User", secondary=user_book_follow_association, back_populates="followed_books")
 
 
+class BookRanking(Base):
+    """Bảng xếp hạng sách, tính lại định kỳ bởi app/rankings.py"""
+    __tablename__ = "book_rankings"
+    
+    book_id = Column(Integer, ForeignKey("books.id", ondelete="CASCADE"), primary_key=True)
+    reader_count = Column(Integer, default=0, nullable=False)
+    review_count = Column(Integer, default=0, nullable=False)
+    trending_score = Column(Float, default=0, nullable=False)  # Đọc / review gần đây, giảm dần theo thời gian
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now())
+    
+    # Relationships
+    book = relationship("Book")
+    
+    # Đọc trang "phổ biến" / "thịnh hành" = quét một đoạn index
+    __table_args__ = (
+        Index("ix_book_rankings_popularity", "reader_count", "review_count", "book_id"),
+        Index("ix_book_rankings_trending", "trending_score", "book_id"),
+    )
+
+
+class ScheduledJob(Base):
+    """Lần chạy gần nhất của job định kỳ (app/scheduler.py) - chặn chạy trùng giữa các process"""
+    __tablename__ = "scheduled_jobs"
+    
+    name = Column(String(100), primary_key=True)
+    last_run_at = Column(DateTime(timezone=True), nullable=True)
+
+
 class Author(Base):
     __tablename__ = "authors"
     
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String(255), nullable=False, index=True)
+    # Khóa chuẩn hóa của name (author_name_key) - "Nguyễn Du" và "nguyen  du" là một tác giả
+    name_key = Column(String(255), nullable=False)
     bio = Column(Text, nullable=True)
     avatar_url = Column(String(500), nullable=True)
     followers_count = Column(Integer, default=0)
+    # Đã từng đăng thông báo khi quá nhiều người theo dõi -> người đọc kéo thông báo thay vì nhận vào inbox
+    pull_notifications = Column(Boolean, default=False, server_default=false(), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
     books = relationship("Book", secondary=book_author_association, back_populates="authors")
     followers = relationship("User", secondary=user_author_follow_association, back_populates="followed_authors")
+    
+    __table_args__ = (
+        Index("ix_authors_name_key", "name_key", unique=True),
+    )
+    
+    @validates("name")
+    def _set_name_key(self, key, name):
+        self.name_key = author_name_key(name)
+        return name
+
+
+def author_name_key(name: str) -> str:
+    """Case-, diacritic- and whitespace-folded author name used for dedupe ("Nguyễn  Du" -> "nguyen du")"""
+    # "đ" không tách dấu được bằng NFKD
+    folded = unicodedata.normalize("NFKD", name.replace("đ", "d").replace("Đ", "D"))
+    folded = "".join(char for char in folded if not unicodedata.combining(char))
+    return " ".join(folded.casefold().split())[:255]
 
 
 class UserBook(Base):
@@ -106,7 +171,7 @@ class UserBook(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
+    book_id = Column(Integer, ForeignKey("books.id"), nullable=False, index=True)
     status = Column(String(50), default="want_to_read")  # want_to_read, reading, completed, paused
     progress = Column(Integer, default=0)  # 0-100
     rating = Column(Float, nullable=True)  # 0-5
@@ -118,14 +183,21 @@ class UserBook(Base):
     # Relationships
     user = relationship("User", back_populates="books")
     book = relationship("Book", back_populates="user_books")
+    
+    # "Sách của tôi" và kiểm tra trùng khi thêm sách / viết review;
+    # lượt đọc gần đây cho điểm trending (app/rankings.py)
+    __table_args__ = (
+        Index("ix_user_books_user_id_book_id", "user_id", "book_id"),
+        Index("ix_user_books_created_at", "created_at", "book_id"),
+    )
 
 
 class Review(Base):
     __tablename__ = "reviews"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    book_id = Column(Integer, ForeignKey("books.id"), nullable=False)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    book_id = Column(Integer, ForeignKey("books.id"), nullable=False, index=True)
     rating = Column(Float, nullable=False)  # 0-5
     review_text = Column(Text, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -134,6 +206,11 @@ class Review(Base):
     # Relationships
     user = relationship("User", back_populates="reviews")
     book = relationship("Book", back_populates="reviews")
+    
+    # Review gần đây cho điểm trending (app/rankings.py)
+    __table_args__ = (
+        Index("ix_reviews_created_at", "created_at", "book_id"),
+    )
 
 
 class Group(Base):
@@ -191,6 +268,11 @@ class GroupDiscussion(Base):
     # Relationships
     group = relationship("Group", back_populates="discussions")
     user = relationship("User")
+    
+    # Thảo luận mới nhất của một group
+    __table_args__ = (
+        Index("ix_group_discussions_group_id_created_at", "group_id", "created_at", "id"),
+    )
 
 
 class GroupSchedule(Base):
@@ -208,6 +290,10 @@ class GroupSchedule(Base):
     # Relationships
     group = relationship("Group", back_populates="schedules")
     creator = relationship("User")
+    
+    __table_args__ = (
+        Index("ix_group_schedules_group_id_scheduled_date", "group_id", "scheduled_date"),
+    )
 
 
 class GroupEvent(Base):
@@ -226,6 +312,10 @@ class GroupEvent(Base):
     # Relationships
     group = relationship("Group", back_populates="events")
     creator = relationship("User")
+    
+    __table_args__ = (
+        Index("ix_group_events_group_id_event_date", "group_id", "event_date"),
+    )
 
 
 class AuthorNotification(Base):
@@ -242,8 +332,34 @@ class AuthorNotification(Base):
     created_by = Column(Integer, ForeignKey("users.id"), nullable=False)  # Admin tạo
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     is_active = Column(Boolean, default=True)  # Có hiển thị không
+    delivery = Column(String(10), default="inbox", server_default="inbox", nullable=False)  # inbox (fan-out) | pull
     
     # Relationships
     author = relationship("Author")
     book = relationship("Book", foreign_keys=[book_id])
-    creator = relationship("User", foreign_keys=[created_by])
\ No newline at end of file
+    creator = relationship("User", foreign_keys=[created_by])
+    
+    # Thông báo đang hiển thị của (các) tác giả, mới nhất trước
+    __table_args__ = (
+        Index("ix_author_notifications_author_active_created", "author_id", "is_active", "created_at", "id"),
+    )
+
+
+class NotificationInbox(Base):
+    """Hộp thư thông báo của từng người dùng - một dòng cho mỗi thông báo được fan-out tới họ"""
+    __tablename__ = "notification_inbox"
+    
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    notification_id = Column(Integer, ForeignKey("author_notifications.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(DateTime(timezone=True), nullable=False)  # Bản sao author_notifications.created_at (khóa sắp xếp)
+    read_at = Column(DateTime(timezone=True), nullable=True)
+    
+    # Relationships
+    notification = relationship("AuthorNotification")
+    
+    # Inbox của một người, mới nhất trước (keyset created_at, notification_id);
+    # người nhận của một thông báo (thu hồi, ON DELETE CASCADE)
+    __table_args__ = (
+        Index("ix_notification_inbox_user_created", "user_id", "created_at", "notification_id"),
+        Index("ix_notification_inbox_notification_id", "notification_id"),
+    )
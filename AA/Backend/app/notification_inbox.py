@@ -0,0 +1,283 @@
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional
+from sqlalchemy import select, update, delete, func, case, exists, literal, or_, union_all
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import SessionLocal, dialect_insert
+from app.models import Author, AuthorNotification, NotificationInbox, User, user_author_follow_association
+
+# Author notifications reach followers in one of two ways, fixed when the
+# notification is created:
+#   inbox - fan-out on write: one notification_inbox row per follower, written
+#           in batches after the commit; reads are a single index range scan
+#   pull  - authors with more than NOTIFICATION_FANOUT_MAX_FOLLOWERS followers
+#           are not fanned out; readers merge them in at read time (a user
+#           follows few such authors, so that query stays small)
+INBOX = "inbox"
+PULL = "pull"
+
+follows = user_author_follow_association
+
+
+def choose_delivery(author: Author) -> str:
+    """Delivery for a new notification of `author` (caller commits)"""
+    if (author.followers_count or 0) > settings.NOTIFICATION_FANOUT_MAX_FOLLOWERS:
+        # Giữ nguyên về sau: thông báo kéo cũ vẫn được đọc kể cả khi số người theo dõi giảm
+        author.pull_notifications = True
+        return PULL
+    return INBOX
+
+
+def _adjust_unread(db: Session, user_ids, delta: int) -> None:
+    new_count = User.unread_notifications + delta
+    db.execute(
+        update(User)
+        .where(User.id.in_(user_ids))
+        .values(unread_notifications=case((new_count > 0, new_count), else_=0))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def fan_out(db: Session, notification_id: int, batch_size: Optional[int] = None) -> int:
+    """Copy an inbox notification into every follower's inbox; returns rows added.
+
+    Walks user_author_follow by user_id, NOTIFICATION_FANOUT_BATCH_SIZE
+    followers at a time: one INSERT ... SELECT ... ON CONFLICT DO NOTHING
+    RETURNING and one unread counter UPDATE per batch, committed per batch.
+    Re-running it (after a crash, or after re-activating) only adds what is
+    missing.
+    """
+    batch_size = batch_size or settings.NOTIFICATION_FANOUT_BATCH_SIZE
+    notification = db.get(AuthorNotification, notification_id)
+    if notification is None or not notification.is_active or notification.delivery != INBOX:
+        return 0
+    author_id = notification.author_id
+
+    added = 0
+    last_user_id = 0
+    while True:
+        user_ids = db.execute(
+            select(follows.c.user_id)
+            .where(follows.c.author_id == author_id, follows.c.user_id > last_user_id)
+            .order_by(follows.c.user_id)
+            .limit(batch_size)
+        ).scalars().all()
+        if not user_ids:
+            break
+        # created_at được chép bằng SQL (không qua Python) -> cùng định dạng với author_notifications.
+        # is_active / delivery xét lại ở mỗi lô: thông báo bị ẩn giữa chừng thì dừng ghi thêm
+        source = (
+            select(follows.c.user_id, AuthorNotification.id, AuthorNotification.created_at)
+            .join(AuthorNotification, AuthorNotification.author_id == follows.c.author_id)
+            .where(
+                AuthorNotification.id == notification_id,
+                AuthorNotification.is_active.is_(True),
+                AuthorNotification.delivery == INBOX,
+                follows.c.user_id.in_(user_ids)
+            )
+        )
+        inserted = db.execute(
+            dialect_insert(db, NotificationInbox.__table__)
+            .from_select(["user_id", "notification_id", "created_at"], source)
+            .on_conflict_do_nothing()
+            .returning(NotificationInbox.__table__.c.user_id)
+        ).scalars().all()
+        if inserted:
+            _adjust_unread(db, inserted, 1)
+        db.commit()
+        added += len(inserted)
+        last_user_id = user_ids[-1]
+    return added
+
+
+def run_fan_out(notification_id: int) -> None:
+    """Background task queued by the admin routes after the notification is committed"""
+    db = SessionLocal()
+    try:
+        fan_out(db, notification_id)
+    except Exception as e:
+        db.rollback()
+        print(f"Notification fan-out failed for {notification_id}: {str(e)} (retry: python -m app.notification_inbox fan-out {notification_id})")
+    finally:
+        db.close()
+
+
+def retract(db: Session, notification_id: int) -> None:
+    """Remove a notification from every inbox, un-counting unread copies (caller commits)"""
+    unread_by = select(NotificationInbox.user_id).where(
+        NotificationInbox.notification_id == notification_id,
+        NotificationInbox.read_at.is_(None)
+    )
+    _adjust_unread(db, unread_by, -1)
+    db.execute(delete(NotificationInbox).where(NotificationInbox.notification_id == notification_id))
+
+
+def forget_author(db: Session, user_id: int, author_id: int) -> None:
+    """Drop the user's inbox rows for an author they unfollowed, un-counting unread ones (caller commits)"""
+    of_author = select(AuthorNotification.id).where(AuthorNotification.author_id == author_id)
+    rows = (NotificationInbox.user_id == user_id) & NotificationInbox.notification_id.in_(of_author)
+    unread = db.execute(delete(NotificationInbox).where(rows, NotificationInbox.read_at.is_(None)))
+    if unread.rowcount:
+        _adjust_unread(db, [user_id], -unread.rowcount)
+    db.execute(delete(NotificationInbox).where(rows))
+
+
+def _read_watermark(user_id: int):
+    return select(User.notifications_read_at).where(User.id == user_id).scalar_subquery()
+
+
+def _pulled(user_id: int, now: datetime) -> list:
+    """Conditions for pull notifications the user sees that are not materialized in their inbox"""
+    window_start = now - timedelta(days=settings.NOTIFICATION_PULL_WINDOW_DAYS)
+    pull_authors = (
+        select(Author.id)
+        .join(follows, follows.c.author_id == Author.id)
+        .where(follows.c.user_id == user_id, Author.pull_notifications.is_(True))
+    )
+    return [
+        AuthorNotification.author_id.in_(pull_authors),
+        AuthorNotification.delivery == PULL,
+        AuthorNotification.is_active.is_(True),
+        AuthorNotification.created_at >= window_start,
+        ~exists().where(
+            NotificationInbox.user_id == user_id,
+            NotificationInbox.notification_id == AuthorNotification.id
+        ),
+    ]
+
+
+def inbox_entries(user_id: int, now: Optional[datetime] = None):
+    """(id, created_at, is_read) of every notification for the user - inbox rows plus pulled ones.
+
+    Page it with Keyset(entries.c.created_at, entries.c.id, descending=True).
+    """
+    now = now or datetime.now(timezone.utc)
+    # Dòng inbox của thông báo đã ẩn có thể còn sót (fan-out chạy song song với retract)
+    inbox = (
+        select(
+            NotificationInbox.notification_id.label("id"),
+            NotificationInbox.created_at.label("created_at"),
+            NotificationInbox.read_at.isnot(None).label("is_read")
+        )
+        .join(AuthorNotification, AuthorNotification.id == NotificationInbox.notification_id)
+        .where(NotificationInbox.user_id == user_id, AuthorNotification.is_active.is_(True))
+    )
+    pulled = select(
+        AuthorNotification.id.label("id"),
+        AuthorNotification.created_at.label("created_at"),
+        func.coalesce(AuthorNotification.created_at <= _read_watermark(user_id), False).label("is_read")
+    ).where(*_pulled(user_id, now))
+    return union_all(inbox, pulled).subquery("entries")
+
+
+def unread_count(db: Session, user_id: int, now: Optional[datetime] = None) -> int:
+    """Stored counter for inbox rows + a count over the (few) pull notifications"""
+    now = now or datetime.now(timezone.utc)
+    stored = db.execute(select(User.unread_notifications).where(User.id == user_id)).scalar() or 0
+    watermark = _read_watermark(user_id)
+    pulled = db.execute(
+        select(func.count())
+        .select_from(AuthorNotification)
+        .where(*_pulled(user_id, now), or_(watermark.is_(None), AuthorNotification.created_at > watermark))
+    ).scalar() or 0
+    return stored + pulled
+
+
+def mark_read(db: Session, user_id: int, notification_ids: Iterable[int]) -> None:
+    """Mark specific notifications read (caller commits)"""
+    notification_ids = list(notification_ids)
+    now = datetime.now(timezone.utc)
+    result = db.execute(
+        update(NotificationInbox)
+        .where(
+            NotificationInbox.user_id == user_id,
+            NotificationInbox.notification_id.in_(notification_ids),
+            NotificationInbox.read_at.is_(None)
+        )
+        .values(read_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    if result.rowcount:
+        _adjust_unread(db, [user_id], -result.rowcount)
+
+    # Thông báo kéo chưa có dòng inbox: ghi một dòng đã đọc - chỉ của tác giả người dùng đang theo dõi
+    followed = select(follows.c.author_id).where(follows.c.user_id == user_id)
+    source = select(
+        literal(user_id), AuthorNotification.id, AuthorNotification.created_at,
+        literal(now, NotificationInbox.read_at.type)
+    ).where(
+        AuthorNotification.id.in_(notification_ids),
+        AuthorNotification.delivery == PULL,
+        AuthorNotification.is_active.is_(True),
+        AuthorNotification.author_id.in_(followed)
+    )
+    db.execute(
+        dialect_insert(db, NotificationInbox.__table__)
+        .from_select(["user_id", "notification_id", "created_at", "read_at"], source)
+        .on_conflict_do_nothing()
+    )
+
+
+def mark_all_read(db: Session, user_id: int) -> None:
+    """Mark every notification read, inbox and pulled (caller commits)"""
+    now = datetime.now(timezone.utc)
+    db.execute(
+        update(NotificationInbox)
+        .where(NotificationInbox.user_id == user_id, NotificationInbox.read_at.is_(None))
+        .values(read_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    db.execute(
+        update(User)
+        .where(User.id == user_id)
+        .values(unread_notifications=0, notifications_read_at=now)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def reconcile_unread_counts(db: Session, user_ids: Optional[List[int]] = None) -> int:
+    """Recompute users.unread_notifications from the inbox; returns how many users had drifted"""
+    actual = (
+        select(func.count())
+        .select_from(NotificationInbox)
+        .join(AuthorNotification, AuthorNotification.id == NotificationInbox.notification_id)
+        .where(
+            NotificationInbox.user_id == User.id,
+            NotificationInbox.read_at.is_(None),
+            AuthorNotification.is_active.is_(True)
+        )
+        .scalar_subquery()
+    )
+    statement = update(User).where(User.unread_notifications != actual)
+    if user_ids is not None:
+        if not user_ids:
+            return 0
+        statement = statement.where(User.id.in_(user_ids))
+    result = db.execute(statement.values(unread_notifications=actual).execution_options(synchronize_session=False))
+    return result.rowcount
+
+
+if __name__ == "__main__":
+    # Fan-out lại một thông báo (vd. sau khi worker chết giữa chừng) / sửa lệch bộ đếm chưa đọc:
+    #   python -m app.notification_inbox fan-out 42
+    #   python -m app.notification_inbox reconcile
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Author notification inbox maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+    fan_out_parser = commands.add_parser("fan-out")
+    fan_out_parser.add_argument("notification_id", type=int)
+    commands.add_parser("reconcile")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        if args.command == "fan-out":
+            added = fan_out(db, args.notification_id)
+            print(f"Fanned out notification {args.notification_id}: {added} inbox row(s) added")
+        else:
+            repaired = reconcile_unread_counts(db)
+            db.commit()
+            print(f"Reconciled unread counters: {repaired} user(s) repaired")
+    finally:
+        db.close()
@@ -0,0 +1,112 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, List, Optional
+from fastapi import HTTPException, Response, status
+from sqlalchemy import String, literal, tuple_
+
+# Lists keep returning plain arrays; the cursor for the next page travels in this header
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+def encode_cursor(position: dict) -> str:
+    def default(value):
+        if isinstance(value, datetime):
+            return {"dt": value.isoformat()}
+        raise TypeError(f"Cannot encode {type(value).__name__} in a cursor")
+    raw = json.dumps(position, default=default, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> dict:
+    def object_hook(value):
+        if set(value) == {"dt"}:
+            return datetime.fromisoformat(value["dt"])
+        return value
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        position = json.loads(raw, object_hook=object_hook)
+    except (ValueError, TypeError):
+        position = None
+    valid = isinstance(position, dict) and (
+        isinstance(position.get("k"), list)
+        or (isinstance(position.get("o"), int) and position["o"] >= 0)
+    )
+    if not valid:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    return position
+
+
+class Keyset:
+    """Columns a list is ordered and paged by; the last one must be unique (usually id)"""
+
+    def __init__(self, *columns, descending: bool = False):
+        self.columns = columns
+        self.descending = descending
+
+    def order_by(self) -> list:
+        return [column.desc() if self.descending else column.asc() for column in self.columns]
+
+    def after(self, values: List[Any], dialect_name: str):
+        """Rows strictly after `values` in this ordering - a row-value comparison the index can seek to"""
+        if len(values) != len(self.columns):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+        bound = tuple_(*[
+            self._bind(column, value, dialect_name) for column, value in zip(self.columns, values)
+        ])
+        row = tuple_(*self.columns)
+        return row < bound if self.descending else row > bound
+
+    @staticmethod
+    def _bind(column, value, dialect_name: str):
+        if isinstance(value, datetime) and dialect_name == "sqlite":
+            # SQLite compares timestamps as text; server_default CURRENT_TIMESTAMP has no fraction
+            text = value.strftime("%Y-%m-%d %H:%M:%S.%f" if value.microsecond else "%Y-%m-%d %H:%M:%S")
+            return literal(text, String)
+        return literal(value, column.type)
+
+    def cursor_for(self, item) -> str:
+        return encode_cursor({"k": [getattr(item, column.key) for column in self.columns]})
+
+
+class Pager:
+    """Cursor pagination for one list request.
+
+    With a keyset, pages continue from the last row returned (stable under
+    concurrent inserts, constant cost however deep). Lists ordered by a
+    computed score (relevance, popularity) pass keyset=None and get an
+    opaque offset cursor instead. The deprecated `skip` is honoured when no
+    cursor is given.
+
+        pager = Pager(db, Keyset(Book.id), cursor, skip, limit)
+        books = pager.finish(pager.apply(query).all(), response)
+    """
+
+    def __init__(self, db, keyset: Optional[Keyset], cursor: Optional[str], skip: int, limit: int):
+        self.keyset = keyset
+        self.limit = limit
+        self.dialect_name = db.bind.dialect.name
+        self.position = decode_cursor(cursor) if cursor else None
+        self.offset = skip if self.position is None else self.position.get("o", 0)
+
+    def apply(self, statement):
+        """Add ordering, the cursor condition and limit + 1 (to detect a next page)"""
+        if self.keyset is not None:
+            statement = statement.order_by(*self.keyset.order_by())
+            if self.position is not None and "k" in self.position:
+                statement = statement.where(self.keyset.after(self.position["k"], self.dialect_name))
+        if self.offset:
+            statement = statement.offset(self.offset)
+        return statement.limit(self.limit + 1)
+
+    def finish(self, items, response: Response) -> list:
+        """Drop the look-ahead row and set X-Next-Cursor when there is another page"""
+        items = list(items)
+        if len(items) > self.limit:
+            items = items[:self.limit]
+            if self.keyset is not None:
+                next_cursor = self.keyset.cursor_for(items[-1])
+            else:
+                next_cursor = encode_cursor({"o": self.offset + self.limit})
+            response.headers[NEXT_CURSOR_HEADER] = next_cursor
+        return items
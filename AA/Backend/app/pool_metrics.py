@@ -0,0 +1,122 @@
+import threading
+import time
+from collections import deque
+from typing import Dict, Optional
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool, AsyncAdaptedQueuePool
+
+
+class PoolMetrics:
+    """Checkout wait / utilisation counters for one engine's connection pool"""
+
+    def __init__(self, name: str, engine):
+        self.name = name
+        self.engine = engine
+        self._lock = threading.Lock()
+        self._recent_waits = deque(maxlen=1000)
+        self.checkouts = 0
+        self.timeouts = 0
+        self.invalidations = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.peak_checked_out = 0
+        self.peak_overflow = 0
+
+    @property
+    def pool(self):
+        return self.engine.pool
+
+    def record_wait(self, seconds: float) -> None:
+        checked_out = self.pool.checkedout()
+        overflow = max(0, self.pool.overflow())
+        with self._lock:
+            self.checkouts += 1
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+            self._recent_waits.append(seconds)
+            self.peak_checked_out = max(self.peak_checked_out, checked_out)
+            self.peak_overflow = max(self.peak_overflow, overflow)
+
+    def record_timeout(self) -> None:
+        with self._lock:
+            self.timeouts += 1
+
+    def record_invalidation(self) -> None:
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self) -> dict:
+        pool = self.pool
+        with self._lock:
+            waits = sorted(self._recent_waits)
+            p99 = waits[int(0.99 * (len(waits) - 1))] if waits else 0.0
+            return {
+                "name": self.name,
+                "pool_class": type(pool).__name__,
+                "size": pool.size() if hasattr(pool, "size") else None,
+                "checked_out": pool.checkedout() if hasattr(pool, "checkedout") else None,
+                "overflow_in_use": max(0, pool.overflow()) if hasattr(pool, "overflow") else None,
+                "peak_checked_out": self.peak_checked_out,
+                "peak_overflow": self.peak_overflow,
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                "p99_wait_ms": round(p99 * 1000, 3),
+                "max_wait_ms": round(self.max_wait * 1000, 3),
+                "invalidations": self.invalidations,
+            }
+
+
+class _CheckoutTimingMixin:
+    """Times how long a caller waits in QueuePool._do_get for a connection"""
+
+    metrics: Optional[PoolMetrics] = None
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            if self.metrics is not None:
+                self.metrics.record_timeout()
+            raise
+        if self.metrics is not None:
+            self.metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        # engine.dispose() swaps in a fresh pool; keep reporting into the same metrics
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(_CheckoutTimingMixin, QueuePool):
+    pass
+
+
+class InstrumentedAsyncQueuePool(_CheckoutTimingMixin, AsyncAdaptedQueuePool):
+    pass
+
+
+pool_metrics: Dict[str, PoolMetrics] = {}
+
+
+def instrument_engine(name: str, engine) -> PoolMetrics:
+    """Register pool metrics for a (sync or async) engine under `name`"""
+    sync_engine = getattr(engine, "sync_engine", engine)
+    metrics = PoolMetrics(name, sync_engine)
+    if isinstance(sync_engine.pool, _CheckoutTimingMixin):
+        sync_engine.pool.metrics = metrics
+
+    @event.listens_for(sync_engine, "invalidate")
+    def _on_invalidate(dbapi_connection, connection_record, exception):
+        metrics.record_invalidation()
+
+    pool_metrics[name] = metrics
+    return metrics
+
+
+def pool_stats() -> list:
+    return [metrics.snapshot() for metrics in pool_metrics.values()]
@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+from sqlalchemy import select, delete, exists, func, case, literal, or_
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import dialect_insert
+from app.models import Book, BookRanking, Review, UserBook
+from app.scheduler import claim_job
+
+# Trending = recent reads + reviews, each weighted by its age. The decay is a
+# step approximation of 0.5 ** (age / half-life) evaluated at these bucket
+# edges (days) - plain CASE expressions, so it runs the same on SQLite.
+TRENDING_BUCKET_DAYS = (1, 3, 7, 14, 30, 90)
+# A review is a stronger signal than adding a book to a list
+REVIEW_WEIGHT = 2.0
+# scheduled_jobs row guarding against overlapping refreshes
+RANKING_JOB = "rankings"
+RANKED_COLUMNS = ("reader_count", "review_count", "trending_score")
+
+
+def decayed_weight(created_at, now: datetime, half_life_days: float):
+    whens = []
+    previous = 0
+    for days in TRENDING_BUCKET_DAYS:
+        whens.append((created_at >= now - timedelta(days=days), 0.5 ** (previous / half_life_days)))
+        previous = days
+    return case(*whens, else_=0.0)
+
+
+def _recent_scores(model, now: datetime, half_life_days: float):
+    window_start = now - timedelta(days=TRENDING_BUCKET_DAYS[-1])
+    return (
+        select(model.book_id.label("book_id"), func.sum(decayed_weight(model.created_at, now, half_life_days)).label("score"))
+        .where(model.created_at >= window_start)
+        .group_by(model.book_id)
+        .subquery()
+    )
+
+
+def refresh_rankings(db: Session, now: Optional[datetime] = None, half_life_days: Optional[float] = None) -> int:
+    """Bring book_rankings up to date (caller commits); returns rows inserted or changed.
+
+    Popularity comes from books.reader_count / review_count, which are kept
+    as independent counts - no readers x reviews join fan-out. Rows are
+    upserted and only written when a value differs, so books with no new
+    activity cost no dead tuples / WAL on each run.
+    """
+    now = now or datetime.now(timezone.utc)
+    half_life_days = half_life_days or settings.TRENDING_HALF_LIFE_DAYS
+
+    reads = _recent_scores(UserBook, now, half_life_days)
+    reviews = _recent_scores(Review, now, half_life_days)
+    trending = func.coalesce(reads.c.score, 0) + REVIEW_WEIGHT * func.coalesce(reviews.c.score, 0)
+
+    source = (
+        select(Book.id, Book.reader_count, Book.review_count, trending, literal(now, BookRanking.refreshed_at.type))
+        .outerjoin(reads, reads.c.book_id == Book.id)
+        .outerjoin(reviews, reviews.c.book_id == Book.id)
+    )
+    upsert = dialect_insert(db, BookRanking.__table__).from_select(
+        ["book_id", *RANKED_COLUMNS, "refreshed_at"], source
+    )
+    table = BookRanking.__table__
+    upsert = upsert.on_conflict_do_update(
+        index_elements=["book_id"],
+        set_={name: upsert.excluded[name] for name in (*RANKED_COLUMNS, "refreshed_at")},
+        where=or_(*(table.c[name].is_distinct_from(upsert.excluded[name]) for name in RANKED_COLUMNS))
+    )
+    # Sách đã xóa (SQLite không bật ON DELETE CASCADE)
+    db.execute(delete(BookRanking).where(~exists().where(Book.id == BookRanking.book_id)))
+    return db.execute(upsert).rowcount
+
+
+def run_refresh(min_interval_seconds: float = 0) -> Optional[int]:
+    """Refresh in its own transaction; None if another run started less than min_interval_seconds ago"""
+    from app.database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        if not claim_job(db, RANKING_JOB, min_interval_seconds):
+            db.rollback()
+            return None
+        written = refresh_rankings(db)
+        db.commit()
+        return written
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    # Làm mới bảng xếp hạng ngay (chạy tay); định kỳ thì qua python -m app.scheduler:
+    #   python -m app.rankings
+    written = run_refresh()
+    print(f"Refreshed book rankings: {written} book(s) changed")
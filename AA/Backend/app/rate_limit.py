@@ -0,0 +1,164 @@
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Tuple
+from fastapi import Depends, HTTPException, Request, status
+from app.auth import get_current_active_user
+from app.config import settings
+from app.models import User
+
+_PERIODS = {
+    "second": 1,
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+}
+
+
+class RateLimitPolicy:
+    """A limit such as "10/minute": at most `limit` hits per `window` seconds"""
+
+    def __init__(self, limit: int, window: float):
+        self.limit = limit
+        self.window = window
+
+    @classmethod
+    def parse(cls, value: str) -> "RateLimitPolicy":
+        count, _, period = value.strip().partition("/")
+        period = period.strip().rstrip("s")
+        if period not in _PERIODS:
+            raise ValueError(f"Invalid rate limit period in {value!r}")
+        return cls(int(count), _PERIODS[period])
+
+
+class InMemoryBackend:
+    """Per-process token bucket; bucket count is capped with LRU eviction"""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, list]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, policy: RateLimitPolicy) -> Tuple[bool, float]:
+        """Consume one token; returns (allowed, retry_after_seconds)"""
+        now = time.monotonic()
+        rate = policy.limit / policy.window
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = [float(policy.limit), now]
+                self._buckets[key] = bucket
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(key)
+                bucket[0] = min(policy.limit, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+
+            if bucket[0] >= 1:
+                bucket[0] -= 1
+                return True, 0.0
+            return False, (1 - bucket[0]) / rate
+
+
+# Sliding-window check + increment in one script, so concurrent workers cannot
+# all pass the check before any of them counts (KEYS: current, previous window;
+# ARGV: weight of the previous window, limit, ttl). Returns 1 if allowed.
+_SLIDING_WINDOW_HIT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+if current + previous * tonumber(ARGV[1]) >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+
+class RedisBackend:
+    """Shared sliding-window counter so limits hold across workers/instances.
+
+    Requires the optional `redis` package.
+    """
+
+    def __init__(self, url: str):
+        import redis
+
+        self._client = redis.Redis.from_url(url)
+        self._hit = self._client.register_script(_SLIDING_WINDOW_HIT)
+
+    def hit(self, key: str, policy: RateLimitPolicy) -> Tuple[bool, float]:
+        now = time.time()
+        window_index = int(now // policy.window)
+        elapsed = now - window_index * policy.window
+        current_key = f"rl:{key}:{window_index}"
+        previous_key = f"rl:{key}:{window_index - 1}"
+
+        # Weight the previous window by how much of it still overlaps the sliding window
+        weight = 1 - elapsed / policy.window
+        allowed = self._hit(
+            keys=[current_key, previous_key],
+            args=[repr(weight), policy.limit, int(policy.window * 2)]
+        )
+        if not allowed:
+            return False, policy.window - elapsed
+        return True, 0.0
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if settings.RATE_LIMIT_BACKEND == "redis":
+            if not settings.RATE_LIMIT_REDIS_URL:
+                raise RuntimeError("RATE_LIMIT_REDIS_URL is required when RATE_LIMIT_BACKEND=redis")
+            _backend = RedisBackend(settings.RATE_LIMIT_REDIS_URL)
+        else:
+            _backend = InMemoryBackend(settings.RATE_LIMIT_MAX_KEYS)
+    return _backend
+
+
+def get_client_ip(request: Request) -> str:
+    if settings.RATE_LIMIT_TRUST_FORWARDED_FOR:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",")[0].strip()
+    return request.client.host if request.client else "unknown"
+
+
+def check_rate_limit(name: str, identity: str, policy: Optional[RateLimitPolicy] = None) -> None:
+    """Raise 429 with Retry-After when `identity` has exhausted the `name` policy"""
+    if not settings.RATE_LIMIT_ENABLED:
+        return
+    policy = policy or RateLimitPolicy.parse(getattr(settings, f"RATE_LIMIT_{name.upper()}"))
+    allowed, retry_after = get_backend().hit(f"{name}:{identity}", policy)
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests, please slow down",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+        )
+
+
+def rate_limit_by_ip(name: str):
+    """Dependency limiting a route per client IP using the RATE_LIMIT_<NAME> setting"""
+    policy = RateLimitPolicy.parse(getattr(settings, f"RATE_LIMIT_{name.upper()}"))
+
+    def dependency(request: Request) -> None:
+        check_rate_limit(name, f"ip:{get_client_ip(request)}", policy)
+
+    return dependency
+
+
+def rate_limit_by_user(name: str):
+    """Dependency limiting a route per authenticated user using the RATE_LIMIT_<NAME> setting"""
+    policy = RateLimitPolicy.parse(getattr(settings, f"RATE_LIMIT_{name.upper()}"))
+
+    def dependency(current_user: User = Depends(get_current_active_user)) -> None:
+        check_rate_limit(name, f"user:{current_user.id}", policy)
+
+    return dependency
@@ -0,0 +1,222 @@
+import hashlib
+import json
+from typing import Callable, Dict, Iterable, Optional, Tuple
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+from app.cache import SizedLRUCache
+from app.config import settings
+from app.pagination import NEXT_CURSOR_HEADER
+
+# Entities a cached response can depend on. Every write route that changes one
+# of them bumps its version; cache keys include the versions they were built
+# from, so stale entries are never looked up again and simply age out.
+# "author_followers" is split from "authors" so follow / unfollow - the most
+# frequent write - only drops get_author; followers_count nested in book and
+# group responses may lag by up to RESPONSE_CACHE_TTL_SECONDS.
+ENTITIES = ("books", "authors", "author_followers", "challenges", "groups")
+
+CACHE_STATUS_HEADER = "X-Cache"
+
+# (body, etag, next cursor)
+CachedEntry = Tuple[bytes, str, Optional[str]]
+
+
+class InMemoryBackend:
+    """Per-process cache: versions bumped in one worker do not reach the others
+    (entries there expire after RESPONSE_CACHE_TTL_SECONDS)"""
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self._entries = SizedLRUCache(max_bytes, ttl)
+        self._versions: Dict[str, int] = {entity: 0 for entity in ENTITIES}
+
+    async def versions(self, entities: Iterable[str]) -> Tuple[int, ...]:
+        return tuple(self._versions[entity] for entity in entities)
+
+    async def bump(self, entities: Iterable[str]) -> None:
+        for entity in entities:
+            self._versions[entity] += 1
+
+    async def get(self, key: str) -> Optional[CachedEntry]:
+        return self._entries.get(key)
+
+    async def set(self, key: str, entry: CachedEntry) -> None:
+        self._entries.set(key, entry, len(entry[0]))
+
+    def stats(self) -> dict:
+        return {"backend": "memory", "versions": dict(self._versions), **self._entries.stats()}
+
+
+class RedisBackend:
+    """Cache and versions shared by all workers/instances; Redis evicts by its own maxmemory policy.
+
+    Requires the optional `redis` package.
+    """
+
+    def __init__(self, url: str, ttl: float):
+        import redis.asyncio
+
+        self._client = redis.asyncio.Redis.from_url(url)
+        self.ttl = int(ttl)
+
+    async def versions(self, entities: Iterable[str]) -> Tuple[int, ...]:
+        values = await self._client.mget([f"rc:v:{entity}" for entity in entities])
+        return tuple(int(value or 0) for value in values)
+
+    async def bump(self, entities: Iterable[str]) -> None:
+        pipe = self._client.pipeline()
+        for entity in entities:
+            pipe.incr(f"rc:v:{entity}")
+        await pipe.execute()
+
+    async def get(self, key: str) -> Optional[CachedEntry]:
+        body, meta = await self._client.mget(f"{key}:body", f"{key}:meta")
+        if body is None or meta is None:
+            return None
+        etag, next_cursor = json.loads(meta)
+        return body, etag, next_cursor
+
+    async def set(self, key: str, entry: CachedEntry) -> None:
+        body, etag, next_cursor = entry
+        pipe = self._client.pipeline()
+        pipe.set(f"{key}:body", body, ex=self.ttl)
+        pipe.set(f"{key}:meta", json.dumps([etag, next_cursor]), ex=self.ttl)
+        await pipe.execute()
+
+    def stats(self) -> dict:
+        return {"backend": "redis", "ttl_seconds": self.ttl}
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if settings.RESPONSE_CACHE_BACKEND == "redis":
+            if not settings.RESPONSE_CACHE_REDIS_URL:
+                raise RuntimeError("RESPONSE_CACHE_REDIS_URL is required when RESPONSE_CACHE_BACKEND=redis")
+            _backend = RedisBackend(settings.RESPONSE_CACHE_REDIS_URL, settings.RESPONSE_CACHE_TTL_SECONDS)
+        else:
+            _backend = InMemoryBackend(settings.RESPONSE_CACHE_MAX_BYTES, settings.RESPONSE_CACHE_TTL_SECONDS)
+    return _backend
+
+
+async def invalidate(*entities: str) -> None:
+    """Bump entity versions outside a write route (jobs, CLIs)"""
+    if settings.RESPONSE_CACHE_ENABLED:
+        await get_backend().bump(entities)
+
+
+def cached(*entities: str):
+    """Mark a public GET endpoint as cacheable; `entities` are what its response is built from"""
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.__cache_entities__ = _check(entities)
+        return endpoint
+    return decorator
+
+
+def invalidates(*entities: str):
+    """Mark a write endpoint; a successful response bumps the versions of `entities`"""
+    def decorator(endpoint: Callable) -> Callable:
+        endpoint.__invalidates__ = _check(entities)
+        return endpoint
+    return decorator
+
+
+def _check(entities: Tuple[str, ...]) -> Tuple[str, ...]:
+    unknown = set(entities) - set(ENTITIES)
+    if unknown:
+        raise ValueError(f"Unknown cache entities: {', '.join(sorted(unknown))}")
+    return entities
+
+
+def compute_etag(body: bytes) -> str:
+    # Strong validator: derived from the exact bytes sent
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # If-None-Match uses the weak comparison: W/"x" matches "x"
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    candidates = [tag[2:] if tag.startswith("W/") else tag for tag in candidates]
+    return etag in candidates
+
+
+def cache_key(request: Request, versions: Tuple[int, ...]) -> str:
+    query = "&".join(sorted(request.url.query.split("&"))) if request.url.query else ""
+    raw = f"{request.url.path}?{query}|{versions}"
+    return "rc:" + hashlib.blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def _cache_headers(etag: str) -> dict:
+    return {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={settings.RESPONSE_CACHE_MAX_AGE}, must-revalidate",
+    }
+
+
+def _not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers=_cache_headers(etag))
+
+
+def _from_entry(entry: CachedEntry, status: str) -> Response:
+    body, etag, next_cursor = entry
+    headers = _cache_headers(etag)
+    headers[CACHE_STATUS_HEADER] = status
+    if next_cursor:
+        headers[NEXT_CURSOR_HEADER] = next_cursor
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+class CachedRoute(APIRoute):
+    """Route class adding the response cache to endpoints marked with @cached / @invalidates.
+
+        router = APIRouter(prefix="/api/books", route_class=CachedRoute)
+
+        @router.get("/{book_id}", response_model=BookResponse)
+        @cached("books", "authors")
+        def get_book(...): ...
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        cache_entities = getattr(self.endpoint, "__cache_entities__", None)
+        invalidate_entities = getattr(self.endpoint, "__invalidates__", None)
+
+        if cache_entities:
+            async def cached_handler(request: Request) -> Response:
+                if not settings.RESPONSE_CACHE_ENABLED or request.method != "GET":
+                    return await handler(request)
+                backend = get_backend()
+                key = cache_key(request, await backend.versions(cache_entities))
+                if_none_match = request.headers.get("if-none-match")
+
+                entry = await backend.get(key)
+                if entry is not None:
+                    if etag_matches(if_none_match, entry[1]):
+                        return _not_modified(entry[1])
+                    return _from_entry(entry, "HIT")
+
+                response = await handler(request)
+                if response.status_code != 200:
+                    return response
+                entry = (bytes(response.body), compute_etag(response.body), response.headers.get(NEXT_CURSOR_HEADER))
+                await backend.set(key, entry)
+                if etag_matches(if_none_match, entry[1]):
+                    return _not_modified(entry[1])
+                return _from_entry(entry, "MISS")
+            return cached_handler
+
+        if invalidate_entities:
+            async def invalidating_handler(request: Request) -> Response:
+                response = await handler(request)
+                if settings.RESPONSE_CACHE_ENABLED and response.status_code < 400:
+                    await get_backend().bump(invalidate_entities)
+                return response
+            return invalidating_handler
+
+        return handler
@@ -1,23 +1,36 @@
+import io
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query, Request, Response, UploadFile, File
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import func, desc
-from app.database import get_db
-from app.models import User, Book, Review, Group, Challenge, Author, UserBook, AuthorNotification
+from sqlalchemy import func
+from app.database import get_db, session_factory_for
+from app.pool_metrics import pool_stats
+from app.models import User, Book, Review, Group, Challenge, Author, UserBook, AuthorNotification, user_group_association
 from app.schemas import (
-    UserResponse, BookResponse, ReviewResponse, GroupResponse, ChallengeResponse, AuthorResponse,
+    UserResponse, BookResponse, ReviewResponse, GroupResponse, ChallengeResponse, AuthorResponse, MemberResponse,
     AuthorNotificationCreate, AuthorNotificationResponse, AuthorNotificationUpdate
 )
-from app.auth import get_current_admin_user
+from app.auth import get_current_admin_user, invalidate_principal, principal_cache, revoke_user_tokens
+from app.book_stats import review_removed, reconcile_book_stats
+from app.membership import group_members, author_followers, group_members_statement
+from app.discussion_hub import discussion_hub
+from app.notification_inbox import INBOX, choose_delivery, retract, run_fan_out
+from app.catalog_import import DEFAULT_CHUNK_SIZE, detect_format, import_books
+from app.pagination import Keyset, Pager
+from app.response_cache import CachedRoute, invalidates, get_backend as response_cache_backend
+from app.serialization import ndjson_lines
 
-router = APIRouter(prefix="/api/admin", tags=["admin"])
+router = APIRouter(prefix="/api/admin", tags=["admin"], route_class=CachedRoute)
 
 
 
 @router.get("/users", response_model=List[UserResponse])
 def get_all_users(
-    skip: int = Query(0, ge=0),
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
     search: Optional[str] = None,
     role: Optional[str] = None,
     current_admin: User = Depends(get_current_admin_user),
@@ -35,8 +48,8 @@ def get_all_users(
     if role:
         query = query.filter(User.role == role)
     
-    users = query.offset(skip).limit(limit).all()
-    return users
+    pager = Pager(db, Keyset(User.id), cursor, skip, limit)
+    return pager.finish(pager.apply(query).all(), response)
 
 
 @router.get("/users/{user_id}", response_model=UserResponse)
@@ -80,6 +93,8 @@ def update_user(
                 detail="Cannot deactivate your own account"
             )
     
+    old_email = user.email
+    old_role = user.role
     if name is not None:
         user.name = name
     if email is not None:
@@ -94,12 +109,19 @@ def update_user(
     if is_active is not None:
         user.is_active = is_active
     
+    # Token mang sẵn email/role -> thu hồi token cũ khi các field này thay đổi
+    if user.email != old_email or user.role != old_role or is_active is False:
+        revoke_user_tokens(user)
+    
     db.commit()
+    invalidate_principal(old_email)
+    invalidate_principal(user.email)
     db.refresh(user)
     return user
 
 
 @router.delete("/users/{user_id}", status_code=status.HTTP_204_NO_CONTENT)
+@invalidates("books", "authors", "groups")
 def delete_user(
     user_id: int,
     current_admin: User = Depends(get_current_admin_user),
@@ -117,8 +139,20 @@ def delete_user(
             detail="Cannot delete your own account"
         )
     
+    email = user.email
+    # Reviews / user_books của user bị xóa theo cascade -> tính lại số liệu các sách liên quan
+    affected_book_ids = {review.book_id for review in user.reviews} | {user_book.book_id for user_book in user.books}
+    # Dòng user_group / user_author_follow cũng bị xóa -> đối soát members_count / followers_count
+    affected_group_ids = group_members.target_ids_of(db, user_id)
+    affected_author_ids = author_followers.target_ids_of(db, user_id)
+    revoke_user_tokens(user)
     db.delete(user)
+    db.flush()
+    reconcile_book_stats(db, affected_book_ids)
+    group_members.reconcile_counts(db, affected_group_ids)
+    author_followers.reconcile_counts(db, affected_author_ids)
     db.commit()
+    invalidate_principal(email)
     return None
 
 
@@ -126,8 +160,10 @@ def delete_user(
 
 @router.get("/books", response_model=List[BookResponse])
 def get_all_books_admin(
-    skip: int = Query(0, ge=0),
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
     search: Optional[str] = None,
     current_admin: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
@@ -138,11 +174,41 @@ def get_all_books_admin(
     if search:
         query = query.filter(Book.title.ilike(f"%{search}%"))
     
-    books = query.offset(skip).limit(limit).all()
-    return books
+    pager = Pager(db, Keyset(Book.id), cursor, skip, limit)
+    return pager.finish(pager.apply(query).all(), response)
+
+
+@router.post("/books/import")
+@invalidates("books", "authors")
+def import_catalog(
+    file: UploadFile = File(...),
+    format: Optional[str] = Query(None, pattern="^(csv|jsonl)$"),
+    chunk_size: int = Query(DEFAULT_CHUNK_SIZE, ge=1, le=10000),
+    current_admin: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Bulk import books from a CSV or JSONL upload (admin only).
+    
+    Rows are streamed and committed in chunks; books whose ISBN or
+    google_books_id already exist are skipped. Returns counts, throughput
+    and per-row errors. For very large catalogs use `python -m app.catalog_import`.
+    """
+    fmt = format or detect_format(file.filename)
+    if fmt is None:
+        raise HTTPException(status_code=400, detail="Cannot tell the file format, pass ?format=csv or ?format=jsonl")
+    
+    stream = io.TextIOWrapper(file.file, encoding="utf-8-sig", newline="")
+    try:
+        report = import_books(db, stream, fmt, chunk_size)
+    except UnicodeDecodeError:
+        raise HTTPException(status_code=400, detail="File must be UTF-8 encoded")
+    finally:
+        stream.detach()
+    return report.as_dict()
 
 
 @router.delete("/books/{book_id}", status_code=status.HTTP_204_NO_CONTENT)
+@invalidates("books", "groups")
 def delete_book(
     book_id: int,
     current_admin: User = Depends(get_current_admin_user),
@@ -161,8 +227,10 @@ def delete_book(
 
 @router.get("/reviews", response_model=List[ReviewResponse])
 def get_all_reviews(
-    skip: int = Query(0, ge=0),
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
     book_id: Optional[int] = None,
     user_id: Optional[int] = None,
     current_admin: User = Depends(get_current_admin_user),
@@ -176,11 +244,12 @@ def get_all_reviews(
     if user_id:
         query = query.filter(Review.user_id == user_id)
     
-    reviews = query.offset(skip).limit(limit).all()
-    return reviews
+    pager = Pager(db, Keyset(Review.id), cursor, skip, limit)
+    return pager.finish(pager.apply(query).all(), response)
 
 
 @router.delete("/reviews/{review_id}", status_code=status.HTTP_204_NO_CONTENT)
+@invalidates("books")
 def delete_review(
     review_id: int,
     current_admin: User = Depends(get_current_admin_user),
@@ -191,6 +260,7 @@ def delete_review(
     if not review:
         raise HTTPException(status_code=404, detail="Review not found")
     
+    review_removed(db, review.book_id, review.rating)
     db.delete(review)
     db.commit()
     return None
@@ -199,17 +269,59 @@ def delete_review(
 
 @router.get("/groups", response_model=List[GroupResponse])
 def get_all_groups_admin(
-    skip: int = Query(0, ge=0),
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
     current_admin: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Get all groups (admin only)"""
-    groups = db.query(Group).offset(skip).limit(limit).all()
-    return groups
+    pager = Pager(db, Keyset(Group.id), cursor, skip, limit)
+    return pager.finish(pager.apply(db.query(Group)).all(), response)
+
+
+# Số dòng mỗi lần lấy từ server-side cursor khi export
+EXPORT_BATCH_SIZE = 1000
+
+
+@router.get("/groups/{group_id}/members/export", response_class=StreamingResponse)
+def export_group_members(
+    group_id: int,
+    request: Request,
+    current_admin: User = Depends(get_current_admin_user),
+    db: Session = Depends(get_db)
+):
+    """Stream every member of a group as NDJSON (admin only).
+
+    Rows come from a server-side cursor EXPORT_BATCH_SIZE at a time, so memory
+    stays flat however large the group is.
+    """
+    group = db.query(Group.id).filter(Group.id == group_id).first()
+    if not group:
+        raise HTTPException(status_code=404, detail="Group not found")
+    
+    # Session riêng cho generator: session của get_db đã đóng trước khi body được stream
+    session_factory = session_factory_for(request)
+    statement = group_members_statement(group_id).order_by(
+        user_group_association.c.joined_at, user_group_association.c.user_id
+    )
+    
+    def lines():
+        with session_factory() as export_db:
+            result = export_db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+            for rows in result.partitions():
+                yield ndjson_lines(MemberResponse, rows)
+    
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="group-{group_id}-members.ndjson"'}
+    )
 
 
 @router.delete("/groups/{group_id}", status_code=status.HTTP_204_NO_CONTENT)
+@invalidates("groups")
 def delete_group(
     group_id: int,
     current_admin: User = Depends(get_current_admin_user),
@@ -229,17 +341,20 @@ def delete_group(
 
 @router.get("/challenges", response_model=List[ChallengeResponse])
 def get_all_challenges_admin(
-    skip: int = Query(0, ge=0),
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
     current_admin: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """Get all challenges (admin only)"""
-    challenges = db.query(Challenge).offset(skip).limit(limit).all()
-    return challenges
+    pager = Pager(db, Keyset(Challenge.id), cursor, skip, limit)
+    return pager.finish(pager.apply(db.query(Challenge)).all(), response)
 
 
 @router.delete("/challenges/{challenge_id}", status_code=status.HTTP_204_NO_CONTENT)
+@invalidates("challenges")
 def delete_challenge(
     challenge_id: int,
     current_admin: User = Depends(get_current_admin_user),
@@ -287,11 +402,36 @@ def get_admin_stats(
     return stats
 
 
+@router.get("/stats/db-pool")
+def get_db_pool_stats(current_admin: User = Depends(get_current_admin_user)):
+    """Get connection pool usage and checkout wait times (per worker process)"""
+    return pool_stats()
+
+
+@router.get("/stats/principal-cache")
+def get_principal_cache_stats(current_admin: User = Depends(get_current_admin_user)):
+    """Get principal cache hit/miss counters (per worker process)"""
+    return principal_cache.stats()
+
+
+@router.get("/stats/response-cache")
+def get_response_cache_stats(current_admin: User = Depends(get_current_admin_user)):
+    """Get response cache size, entity versions and hit ratio (per worker with the memory backend)"""
+    return response_cache_backend().stats()
+
+
+@router.get("/stats/discussion-push")
+def get_discussion_push_stats(current_admin: User = Depends(get_current_admin_user)):
+    """Get open discussion WebSocket/SSE connections and dropped slow consumers (this worker)"""
+    return discussion_hub.stats()
+
+
 
 
 @router.post("/author-notifications", response_model=AuthorNotificationResponse, status_code=status.HTTP_201_CREATED)
 def create_author_notification(
     notification_data: AuthorNotificationCreate,
+    background_tasks: BackgroundTasks,
     current_admin: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
@@ -311,18 +451,25 @@ def create_author_notification(
     notification_dict = notification_data.model_dump()
     db_notification = AuthorNotification(
         created_by=current_admin.id,
+        delivery=choose_delivery(author),
         **notification_dict
     )
     db.add(db_notification)
     db.commit()
     db.refresh(db_notification)
+    
+    # Fan-out vào inbox người theo dõi sau khi trả response (theo lô, không giữ request)
+    if db_notification.delivery == INBOX:
+        background_tasks.add_task(run_fan_out, db_notification.id)
     return db_notification
 
 
 @router.get("/author-notifications", response_model=List[AuthorNotificationResponse])
 def get_author_notifications(
-    skip: int = Query(0, ge=0),
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
     author_id: Optional[int] = None,
     is_active: Optional[bool] = None,
     current_admin: User = Depends(get_current_admin_user),
@@ -337,8 +484,8 @@ def get_author_notifications(
     if is_active is not None:
         query = query.filter(AuthorNotification.is_active == is_active)
     
-    notifications = query.order_by(desc(AuthorNotification.created_at)).offset(skip).limit(limit).all()
-    return notifications
+    pager = Pager(db, Keyset(AuthorNotification.created_at, AuthorNotification.id, descending=True), cursor, skip, limit)
+    return pager.finish(pager.apply(query).all(), response)
 
 
 @router.get("/author-notifications/{notification_id}", response_model=AuthorNotificationResponse)
@@ -358,6 +505,7 @@ def get_author_notification(
 def update_author_notification(
     notification_id: int,
     notification_update: AuthorNotificationUpdate,
+    background_tasks: BackgroundTasks,
     current_admin: User = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
@@ -374,11 +522,17 @@ def update_author_notification(
     
     # Update fields
     update_data = notification_update.model_dump(exclude_unset=True)
+    was_active = notification.is_active
     for field, value in update_data.items():
         setattr(notification, field, value)
     
+    # Ẩn -> rút khỏi inbox; hiện lại -> fan-out lại
+    if was_active and not notification.is_active:
+        retract(db, notification_id)
     db.commit()
     db.refresh(notification)
+    if not was_active and notification.is_active and notification.delivery == INBOX:
+        background_tasks.add_task(run_fan_out, notification_id)
     return notification
 
 
@@ -393,6 +547,7 @@ def delete_author_notification(
     if not notification:
         raise HTTPException(status_code=404, detail="Notification not found")
     
+    retract(db, notification_id)
     db.delete(notification)
     db.commit()
     return None
@@ -1,21 +1,46 @@
-from datetime import timedelta
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
 from app.database import get_db
 from app.models import User
-from app.schemas import UserCreate, UserResponse, Token, UserUpdate, PasswordChange
-from app.auth import verify_password, get_password_hash, create_access_token, get_current_active_user
-from app.config import settings
+from app.schemas import (
+    UserCreate, UserResponse, Token, UserUpdate, PasswordChange, PasswordChangeResponse, RefreshTokenRequest,
+    BatchRequest, PublicUserBatchResponse
+)
+from app.batch import unique_ids, in_request_order
+from app.auth import create_user_tokens, verify_token, get_current_active_user, invalidate_principal, revoke_user_tokens
+from app.hashing import password_hasher, password_needs_rehash
+from app.rate_limit import rate_limit_by_ip, rate_limit_by_user
+from app.serialization import render
 
 router = APIRouter(prefix="/api/auth", tags=["auth"])
 
 
-@router.post("/register", response_model=Token, status_code=status.HTTP_201_CREATED)
-def register(user_data: UserCreate, db: Session = Depends(get_db)):
+# Các handler đăng nhập/đăng ký là async để bcrypt chạy trong process pool
+# mà không giữ thread của AnyIO; truy vấn DB (sync) được đẩy sang threadpool.
+def _get_user_by_email(db: Session, email: str):
+    return db.query(User).filter(User.email == email).first()
+
+
+def _commit(db: Session, instance=None):
+    if instance is not None:
+        db.add(instance)
+    db.commit()
+    if instance is not None:
+        db.refresh(instance)
+
+
+@router.post(
+    "/register",
+    response_model=Token,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit_by_ip("register"))]
+)
+async def register(user_data: UserCreate, db: Session = Depends(get_db)):
     """Register a new user and return access token"""
     # Check if user already exists
-    existing_user = db.query(User).filter(User.email == user_data.email).first()
+    existing_user = await run_in_threadpool(_get_user_by_email, db, user_data.email)
     if existing_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -23,7 +48,7 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
     db_user = User(
         name=user_data.name,
         email=user_data.email,
@@ -31,25 +56,18 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
         role="user",  # Default role
         is_active=True  # Default active
     )
-    db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
-    
-    # Create access token for the new user
-    access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-    access_token = create_access_token(
-        data={"sub": db_user.email}, expires_delta=access_token_expires
-    )
+    await run_in_threadpool(_commit, db, db_user)
     
-    return {"access_token": access_token, "token_type": "bearer"}
+    # Create access/refresh tokens for the new user
+    return create_user_tokens(db_user)
 
 
-@router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+@router.post("/login", response_model=Token, dependencies=[Depends(rate_limit_by_ip("login"))])
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
     """Login and get access token"""
     try:
         # Find user by email (OAuth2PasswordRequestForm uses 'username' field for email)
-        user = db.query(User).filter(User.email == form_data.username).first()
+        user = await run_in_threadpool(_get_user_by_email, db, form_data.username)
         
         # Check if user exists
         if not user:
@@ -69,7 +87,10 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
         
         # Verify password
         try:
-            password_valid = verify_password(form_data.password, user.hashed_password)
+            password_valid = await password_hasher.verify(form_data.password, user.hashed_password)
+        except HTTPException:
+            # Hashing pool saturated (503) - pass through unchanged
+            raise
         except Exception as e:
             # Log password verification error for debugging
             print(f"Password verification error: {str(e)}")
@@ -85,12 +106,18 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
                 headers={"WWW-Authenticate": "Bearer"},
             )
         
-        # Create access token
+        # Rehash transparently when the stored cost is below this node's target
+        if password_needs_rehash(user.hashed_password):
+            try:
+                user.hashed_password = await password_hasher.hash(form_data.password)
+                await run_in_threadpool(_commit, db)
+            except HTTPException:
+                # Pool is busy - keep the old hash and retry on a later login
+                pass
+        
+        # Create access/refresh tokens
         try:
-            access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
-            access_token = create_access_token(
-                data={"sub": user.email}, expires_delta=access_token_expires
-            )
+            tokens = create_user_tokens(user)
         except Exception as e:
             # Log token creation error for debugging
             print(f"Token creation error: {str(e)}")
@@ -99,7 +126,7 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
                 detail="Error creating access token",
             )
         
-        return {"access_token": access_token, "token_type": "bearer"}
+        return tokens
     except HTTPException:
         # Re-raise HTTP exceptions
         raise
@@ -114,12 +141,55 @@ def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depend
         )
 
 
+@router.post("/refresh", response_model=Token)
+def refresh_access_token(refresh_data: RefreshTokenRequest, db: Session = Depends(get_db)):
+    """Exchange a refresh token for a new access/refresh token pair"""
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Invalid refresh token",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    token_data = verify_token(refresh_data.refresh_token, credentials_exception)
+    if token_data.token_type != "refresh" or token_data.user_id is None:
+        raise credentials_exception
+    
+    # Refresh luôn kiểm tra lại DB: user bị khóa/đổi quyền sẽ không lấy được token mới
+    user = db.query(User).filter(User.id == token_data.user_id).first()
+    if not user or (user.token_version or 0) != token_data.token_version:
+        raise credentials_exception
+    if not user.is_active:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="User account is inactive. Please contact administrator.",
+        )
+    
+    return create_user_tokens(user)
+
+
 @router.get("/me", response_model=UserResponse)
 def get_current_user_info(current_user: User = Depends(get_current_active_user)):
     """Get current user information"""
     return current_user
 
 
+# Chỉ cho người dùng đã đăng nhập, giới hạn theo user: chặn dò danh sách người dùng theo id
+@router.post(
+    "/users/batch",
+    response_model=PublicUserBatchResponse,
+    dependencies=[Depends(rate_limit_by_user("profile_batch"))]
+)
+def get_public_profiles_batch(
+    batch: BatchRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get up to BATCH_MAX_IDS public user profiles (name, avatar) by id; unknown or inactive ids are listed in `missing`"""
+    ids = unique_ids(batch.ids)
+    users = db.query(User).filter(User.id.in_(ids), User.is_active.is_(True)).all()
+    users, missing = in_request_order(ids, users)
+    return render(PublicUserBatchResponse, {"items": users, "missing": missing})
+
+
 @router.patch("/me", response_model=UserResponse)
 def update_profile(
     user_update: UserUpdate,
@@ -132,27 +202,33 @@ def update_profile(
         setattr(current_user, field, value)
     
     db.commit()
+    invalidate_principal(current_user.email)
     db.refresh(current_user)
     return current_user
 
 
-@router.post("/change-password", status_code=status.HTTP_200_OK)
-def change_password(
+@router.post("/change-password", response_model=PasswordChangeResponse, status_code=status.HTTP_200_OK)
+async def change_password(
     password_data: PasswordChange,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Change user password"""
+    """Change user password; every token issued before stops working and this session gets a new pair"""
+    # hashed_password may not be loaded yet (cached principal) - load it off the event loop
+    current_hash = await run_in_threadpool(getattr, current_user, "hashed_password")
+    
     # Verify current password
-    if not verify_password(password_data.current_password, current_user.hashed_password):
+    if not await password_hasher.verify(password_data.current_password, current_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect"
         )
     
-    # Update password
-    current_user.hashed_password = get_password_hash(password_data.new_password)
-    db.commit()
+    # Update password; token cũ (kể cả refresh token bị lộ) hết hiệu lực
+    current_user.hashed_password = await password_hasher.hash(password_data.new_password)
+    await run_in_threadpool(revoke_user_tokens, current_user)
+    await run_in_threadpool(_commit, db, current_user)
+    invalidate_principal(current_user.email)
     
-    return {"message": "Password changed successfully"}
+    return {"message": "Password changed successfully", **create_user_tokens(current_user)}
 
@@ -1,19 +1,31 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, func, desc
+from sqlalchemy import or_, func, select
 from app.database import get_db
-from app.models import Author, User, Book, book_author_association, AuthorNotification, user_author_follow_association
-from app.schemas import AuthorCreate, AuthorResponse, AuthorStatistics, BookResponse, AuthorNotificationResponse
+from app.models import Author, User, Book, book_author_association, AuthorNotification
+from app.schemas import (
+    AuthorCreate, AuthorResponse, AuthorStatistics, BookResponse, AuthorNotificationResponse, BatchRequest, AuthorBatchResponse,
+    InboxNotificationResponse, MarkReadRequest, UnreadCountResponse
+)
 from app.auth import get_current_active_user
+from app.batch import unique_ids, in_request_order
+from app.catalog import get_or_create_author
+from app.membership import author_followers
+from app.notification_inbox import forget_author, inbox_entries, mark_all_read, mark_read, unread_count
+from app.pagination import Keyset, Pager
+from app.serialization import render
+from app.response_cache import CachedRoute, cached, invalidates
 
-router = APIRouter(prefix="/api/authors", tags=["authors"])
+router = APIRouter(prefix="/api/authors", tags=["authors"], route_class=CachedRoute)
 
 
 @router.get("", response_model=List[AuthorResponse])
 def get_authors(
-    skip: int = Query(0, ge=0),
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
     search: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
@@ -23,11 +35,20 @@ def get_authors(
     if search:
         query = query.filter(Author.name.ilike(f"%{search}%"))
     
-    authors = query.offset(skip).limit(limit).all()
-    return authors
+    pager = Pager(db, Keyset(Author.id), cursor, skip, limit)
+    return pager.finish(pager.apply(query).all(), response)
+
+
+@router.post("/batch", response_model=AuthorBatchResponse)
+def get_authors_batch(batch: BatchRequest, db: Session = Depends(get_db)):
+    """Get up to BATCH_MAX_IDS authors by id in one request; unknown ids are listed in `missing`"""
+    ids = unique_ids(batch.ids)
+    authors, missing = in_request_order(ids, db.query(Author).filter(Author.id.in_(ids)).all())
+    return render(AuthorBatchResponse, {"items": authors, "missing": missing})
 
 
 @router.get("/{author_id}", response_model=AuthorResponse)
+@cached("authors", "author_followers")
 def get_author(author_id: int, db: Session = Depends(get_db)):
     """Get a specific author by ID"""
     author = db.query(Author).filter(Author.id == author_id).first()
@@ -37,22 +58,18 @@ def get_author(author_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("", response_model=AuthorResponse, status_code=status.HTTP_201_CREATED)
+@invalidates("authors")
 def create_author(author_data: AuthorCreate, db: Session = Depends(get_db)):
-    """Create a new author"""
-    # Check if author already exists
-    existing = db.query(Author).filter(Author.name == author_data.name).first()
-    if existing:
-        return existing
-    
-    author_dict = author_data.model_dump()
-    db_author = Author(**author_dict)
-    db.add(db_author)
+    """Create a new author, or return the existing one with the same normalized name"""
+    # INSERT ... ON CONFLICT (name_key): an toàn khi hai request tạo cùng tác giả
+    db_author = get_or_create_author(db, **author_data.model_dump())
     db.commit()
     db.refresh(db_author)
     return db_author
 
 
 @router.post("/{author_id}/follow", response_model=AuthorResponse)
+@invalidates("author_followers")
 def follow_author(
     author_id: int,
     current_user: User = Depends(get_current_active_user),
@@ -63,19 +80,18 @@ def follow_author(
     if not author:
         raise HTTPException(status_code=404, detail="Author not found")
     
-    # Check if already following
-    if current_user in author.followers:
+    # Add user to followers (INSERT ... ON CONFLICT DO NOTHING - the follower list is never loaded)
+    if not author_followers.add(db, current_user.id, author_id):
         raise HTTPException(status_code=400, detail="Already following this author")
     
-    # Add user to followers
-    author.followers.append(current_user)
-    author.followers_count += 1
+    # followers_count đã được tăng bằng UPDATE ... SET followers_count = followers_count + 1
     db.commit()
     db.refresh(author)
     return author
 
 
 @router.post("/{author_id}/unfollow", response_model=AuthorResponse)
+@invalidates("author_followers")
 def unfollow_author(
     author_id: int,
     current_user: User = Depends(get_current_active_user),
@@ -86,13 +102,12 @@ def unfollow_author(
     if not author:
         raise HTTPException(status_code=404, detail="Author not found")
     
-    # Check if user is following
-    if current_user not in author.followers:
+    # Remove user from followers (DELETE on the association row)
+    if not author_followers.remove(db, current_user.id, author_id):
         raise HTTPException(status_code=400, detail="Not following this author")
+    # Thông báo của tác giả này rời khỏi inbox (và bộ đếm chưa đọc) của người dùng
+    forget_author(db, current_user.id, author_id)
     
-    # Remove user from followers
-    author.followers.remove(current_user)
-    author.followers_count = max(0, author.followers_count - 1)
     db.commit()
     db.refresh(author)
     return author
@@ -109,10 +124,13 @@ def get_followed_authors(
 
 
 @router.get("/{author_id}/books", response_model=List[BookResponse])
+@cached("authors", "books")
 def get_author_books(
     author_id: int,
-    skip: int = Query(0, ge=0),
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """Get all books by a specific author"""
@@ -120,12 +138,14 @@ def get_author_books(
     if not author:
         raise HTTPException(status_code=404, detail="Author not found")
     
-    books = db.query(Book)\
-        .join(book_author_association, Book.id == book_author_association.c.book_id)\
-        .filter(book_author_association.c.author_id == author_id)\
-        .offset(skip).limit(limit).all()
+    pager = Pager(db, Keyset(Book.id), cursor, skip, limit)
+    books = pager.apply(
+        db.query(Book)
+        .join(book_author_association, Book.id == book_author_association.c.book_id)
+        .filter(book_author_association.c.author_id == author_id)
+    ).all()
     
-    return books
+    return render(List[BookResponse], pager.finish(books, response), response)
 
 
 @router.get("/{author_id}/statistics", response_model=AuthorStatistics)
@@ -146,49 +166,73 @@ def get_author_statistics(author_id: int, db: Session = Depends(get_db)):
     )
 
 
-@router.get("/notifications/my-notifications", response_model=List[AuthorNotificationResponse])
+@router.get("/notifications/my-notifications", response_model=List[InboxNotificationResponse])
 def get_my_author_notifications(
-    skip: int = Query(0, ge=0),
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get notifications for authors that the current user is following"""
+    """Get notifications for authors that the current user is following, newest first"""
     from sqlalchemy.orm import joinedload
     
-    # Get list of author IDs that user is following
-    followed_author_ids = db.query(user_author_follow_association.c.author_id)\
-        .filter(user_author_follow_association.c.user_id == current_user.id)\
-        .all()
-    
-    followed_ids = [row[0] for row in followed_author_ids]
-    
-    if not followed_ids:
+    # Inbox (fan-out lúc tạo) + thông báo kéo của tác giả rất nhiều người theo dõi
+    entries = inbox_entries(current_user.id)
+    pager = Pager(db, Keyset(entries.c.created_at, entries.c.id, descending=True), cursor, skip, limit)
+    rows = pager.finish(db.execute(pager.apply(select(entries))).all(), response)
+    if not rows:
         return []
     
-    # Get active notifications for followed authors with eager loading
-    notifications = db.query(AuthorNotification)\
+    notifications = {
+        notification.id: notification
+        for notification in db.query(AuthorNotification)
         .options(
             joinedload(AuthorNotification.author),
             joinedload(AuthorNotification.book)
-        )\
-        .filter(
-            AuthorNotification.author_id.in_(followed_ids),
-            AuthorNotification.is_active == True
-        )\
-        .order_by(desc(AuthorNotification.created_at))\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
-    
-    return notifications
+        )
+        .filter(AuthorNotification.id.in_([row.id for row in rows]))
+    }
+    return [
+        InboxNotificationResponse.model_validate(notifications[row.id]).model_copy(update={"is_read": bool(row.is_read)})
+        for row in rows if row.id in notifications
+    ]
+
+
+@router.get("/notifications/unread-count", response_model=UnreadCountResponse)
+def get_unread_notification_count(
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Get how many followed-author notifications the current user has not read"""
+    return UnreadCountResponse(unread=unread_count(db, current_user.id))
+
+
+@router.post("/notifications/mark-read", response_model=UnreadCountResponse)
+def mark_notifications_read(
+    request: MarkReadRequest,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """Mark notifications read - the given ids, or all of them with all=true"""
+    if request.all:
+        mark_all_read(db, current_user.id)
+    elif request.notification_ids:
+        mark_read(db, current_user.id, unique_ids(request.notification_ids))
+    else:
+        raise HTTPException(status_code=400, detail="Pass notification_ids or all=true")
+    db.commit()
+    return UnreadCountResponse(unread=unread_count(db, current_user.id))
 
 
 @router.get("/{author_id}/notifications", response_model=List[AuthorNotificationResponse])
 def get_author_notifications(
     author_id: int,
-    skip: int = Query(0, ge=0),
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """Get notifications for a specific author (public)"""
@@ -198,19 +242,18 @@ def get_author_notifications(
     if not author:
         raise HTTPException(status_code=404, detail="Author not found")
     
-    notifications = db.query(AuthorNotification)\
+    pager = Pager(db, Keyset(AuthorNotification.created_at, AuthorNotification.id, descending=True), cursor, skip, limit)
+    notifications = pager.apply(
+        db.query(AuthorNotification)
         .options(
             joinedload(AuthorNotification.author),
             joinedload(AuthorNotification.book)
-        )\
+        )
         .filter(
             AuthorNotification.author_id == author_id,
             AuthorNotification.is_active == True
-        )\
-        .order_by(desc(AuthorNotification.created_at))\
-        .offset(skip)\
-        .limit(limit)\
-        .all()
+        )
+    ).all()
     
-    return notifications
+    return pager.finish(notifications, response)
 
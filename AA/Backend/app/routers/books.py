@@ -1,75 +1,64 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_, func, desc
-from app.database import get_db
-from app.models import Book, Author, UserBook, User, Review, user_book_follow_association
-from app.schemas import BookCreate, BookUpdate, BookResponse, UserBookCreate, UserBookResponse, UserBookUpdate, BookStatistics, ReviewResponse
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import select
+from app.database import get_db, get_async_db
+from app.models import Book, BookRanking, UserBook, User, Review, user_book_follow_association
+from app.schemas import (
+    BookCreate, BookUpdate, BookResponse, UserBookCreate, UserBookResponse, UserBookUpdate, BookStatistics, ReviewResponse,
+    BatchRequest, BookBatchResponse
+)
 from app.auth import get_current_active_user
+from app.batch import unique_ids, in_request_order
+from app.book_stats import apply_reader_delta
+from app.catalog import authors_for
+from app.membership import book_followers
+from app.pagination import Keyset, Pager
+from app.search import ranked_search, substring_filter, use_fulltext
+from app.serialization import render
+from app.response_cache import CachedRoute, cached, invalidates
 
-router = APIRouter(prefix="/api/books", tags=["books"])
+router = APIRouter(prefix="/api/books", tags=["books"], route_class=CachedRoute)
 
 
 @router.get("", response_model=List[BookResponse])
-def get_books(
-    skip: int = Query(0, ge=0),
+@cached("books", "authors")
+async def get_books(
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
     search: Optional[str] = None,
-    db: Session = Depends(get_db)
+    search_mode: str = Query("auto", pattern="^(auto|fulltext|substring)$"),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all books with optional search and average ratings"""
-    from sqlalchemy.orm import joinedload
+    """Get all books with optional search and average ratings.
     
+    On PostgreSQL searches are relevance-ranked full-text/trigram matches
+    (author names included); search_mode=substring or SQLite uses ILIKE.
+    """
     try:
-        query = db.query(Book)
+        query = select(Book)
+        keyset = Keyset(Book.id)
         
         if search:
-            query = query.filter(
-                or_(
-                    Book.title.ilike(f"%{search}%"),
-                    Book.description.ilike(f"%{search}%")
-                )
-            )
-        
-        # Eager load authors to avoid N+1 queries
-        books = query.options(joinedload(Book.authors)).offset(skip).limit(limit).all()
+            ranked = ranked_search(query, search) if use_fulltext(search_mode, db.bind.dialect.name) else None
+            if ranked is not None:
+                query = ranked
+                keyset = None  # ranked by relevance -> offset cursor
+            else:
+                query = query.where(substring_filter(search))
         
-        # Calculate average rating for each book
-        book_ids = [book.id for book in books]
-        rating_map = {}
-        if book_ids:
-            # Get average ratings and review counts for all books in one query
-            rating_stats = db.query(
-                Review.book_id,
-                func.avg(Review.rating).label('avg_rating'),
-                func.count(Review.id).label('review_count')
-            ).filter(Review.book_id.in_(book_ids)).group_by(Review.book_id).all()
-            
-            # Create a map for quick lookup
-            rating_map = {stat.book_id: (float(stat.avg_rating), stat.review_count) for stat in rating_stats}
+        pager = Pager(db, keyset, cursor, skip, limit)
+        # Eager load authors to avoid N+1 queries (lazy load is not allowed on AsyncSession)
+        result = await db.execute(pager.apply(query.options(selectinload(Book.authors))))
+        books = pager.finish(result.scalars().all(), response)
         
-        # Convert to response with ratings
-        result = []
-        for book in books:
-            avg_rating, total_reviews = rating_map.get(book.id, (None, 0))
-            book_dict = {
-                "id": book.id,
-                "title": book.title,
-                "isbn": book.isbn,
-                "cover_url": book.cover_url,
-                "file_url": book.file_url,
-                "description": book.description,
-                "published_date": book.published_date,
-                "page_count": book.page_count,
-                "google_books_id": book.google_books_id,
-                "authors": book.authors,
-                "average_rating": round(avg_rating, 1) if avg_rating else None,
-                "total_reviews": total_reviews,
-                "created_at": book.created_at
-            }
-            result.append(book_dict)
-        
-        return result
+        # Ratings come from the denormalized columns - no per-page GROUP BY over reviews
+        return render(List[BookResponse], books, response)
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         print(f"Error in get_books: {str(e)}")
@@ -77,45 +66,35 @@ def get_books(
         raise HTTPException(status_code=500, detail=f"Lỗi khi lấy danh sách sách: {str(e)}")
 
 
+@router.post("/batch", response_model=BookBatchResponse)
+async def get_books_batch(batch: BatchRequest, db: AsyncSession = Depends(get_async_db)):
+    """Get up to BATCH_MAX_IDS books by id in one request.
+    
+    Books come back in request order with their authors and ratings; unknown
+    ids are listed in `missing` instead of failing the call.
+    """
+    ids = unique_ids(batch.ids)
+    result = await db.execute(select(Book).options(selectinload(Book.authors)).where(Book.id.in_(ids)))
+    books, missing = in_request_order(ids, result.scalars().all())
+    return render(BookBatchResponse, {"items": books, "missing": missing})
+
+
 @router.get("/{book_id}", response_model=BookResponse)
-def get_book(book_id: int, db: Session = Depends(get_db)):
+@cached("books", "authors")
+async def get_book(book_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get a specific book by ID with average rating"""
-    from sqlalchemy.orm import joinedload
-    book = db.query(Book).options(joinedload(Book.authors)).filter(Book.id == book_id).first()
+    result = await db.execute(
+        select(Book).options(selectinload(Book.authors)).where(Book.id == book_id)
+    )
+    book = result.scalars().first()
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
     
-    # Calculate average rating
-    rating_stat = db.query(
-        func.avg(Review.rating).label('avg_rating'),
-        func.count(Review.id).label('review_count')
-    ).filter(Review.book_id == book_id).first()
-    
-    avg_rating = None
-    total_reviews = 0
-    if rating_stat and rating_stat.avg_rating:
-        avg_rating = round(float(rating_stat.avg_rating), 1)
-        total_reviews = rating_stat.review_count
-    
-    # Return as dict to include computed fields
-    return {
-        "id": book.id,
-        "title": book.title,
-        "isbn": book.isbn,
-        "cover_url": book.cover_url,
-        "file_url": book.file_url,
-        "description": book.description,
-        "published_date": book.published_date,
-        "page_count": book.page_count,
-        "google_books_id": book.google_books_id,
-        "authors": book.authors,
-        "average_rating": avg_rating,
-        "total_reviews": total_reviews,
-        "created_at": book.created_at
-    }
+    return book
 
 
 @router.patch("/{book_id}", response_model=BookResponse)
+@invalidates("books", "authors", "groups")
 def update_book(
     book_id: int,
     book_data: BookUpdate,
@@ -132,19 +111,9 @@ def update_book(
     for field, value in update_data.items():
         setattr(book, field, value)
     
-    # Update authors if provided
+    # Update authors if provided (resolved in one SELECT + one INSERT ... ON CONFLICT)
     if book_data.author_names is not None:
-        # Clear existing authors
-        book.authors.clear()
-        # Add new authors
-        for author_name in book_data.author_names:
-            if author_name.strip():
-                author = db.query(Author).filter(Author.name == author_name.strip()).first()
-                if not author:
-                    author = Author(name=author_name.strip())
-                    db.add(author)
-                    db.flush()
-                book.authors.append(author)
+        book.authors = authors_for(db, book_data.author_names)
     
     db.commit()
     db.refresh(book)
@@ -152,6 +121,7 @@ def update_book(
 
 
 @router.post("", response_model=BookResponse, status_code=status.HTTP_201_CREATED)
+@invalidates("books", "authors")
 def create_book(book_data: BookCreate, db: Session = Depends(get_db)):
     """Create a new book"""
     # Check if book already exists by ISBN or Google Books ID
@@ -170,15 +140,9 @@ def create_book(book_data: BookCreate, db: Session = Depends(get_db)):
     db_book = Book(**book_dict)
     db.add(db_book)
     
-    # Add authors
+    # Add authors (resolved in one SELECT + one INSERT ... ON CONFLICT)
     if book_data.author_names:
-        for author_name in book_data.author_names:
-            author = db.query(Author).filter(Author.name == author_name).first()
-            if not author:
-                author = Author(name=author_name)
-                db.add(author)
-                db.flush()
-            db_book.authors.append(author)
+        db_book.authors = authors_for(db, book_data.author_names)
     
     db.commit()
     db.refresh(db_book)
@@ -186,21 +150,20 @@ def create_book(book_data: BookCreate, db: Session = Depends(get_db)):
 
 
 @router.get("/user/my-books", response_model=List[UserBookResponse])
-def get_my_books(
+async def get_my_books(
     status_filter: Optional[str] = Query(None, alias="status"),
     current_user: User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get current user's books"""
-    query = db.query(UserBook).filter(UserBook.user_id == current_user.id)
+    query = select(UserBook).where(UserBook.user_id == current_user.id)
     
     if status_filter:
-        query = query.filter(UserBook.status == status_filter)
+        query = query.where(UserBook.status == status_filter)
     
     # Eager load book and authors to avoid N+1 queries
-    from sqlalchemy.orm import joinedload
-    user_books = query.options(joinedload(UserBook.book).joinedload(Book.authors)).all()
-    return user_books
+    result = await db.execute(query.options(selectinload(UserBook.book).selectinload(Book.authors)))
+    return render(List[UserBookResponse], result.scalars().all())
 
 
 @router.post("/user/add", response_model=UserBookResponse, status_code=status.HTTP_201_CREATED)
@@ -232,6 +195,7 @@ def add_book_to_my_list(
         **user_book_dict
     )
     db.add(db_user_book)
+    apply_reader_delta(db, book_data.book_id, 1)
     db.commit()
     db.refresh(db_user_book)
     return db_user_book
@@ -287,6 +251,7 @@ def remove_book_from_my_list(
     if not user_book:
         raise HTTPException(status_code=404, detail="Book not found in your list")
     
+    apply_reader_delta(db, user_book.book_id, -1)
     db.delete(user_book)
     db.commit()
     return None
@@ -295,8 +260,10 @@ def remove_book_from_my_list(
 @router.get("/{book_id}/reviews", response_model=List[ReviewResponse])
 def get_book_reviews(
     book_id: int,
-    skip: int = Query(0, ge=0),
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """Get reviews for a specific book"""
@@ -304,10 +271,10 @@ def get_book_reviews(
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
     
-    reviews = db.query(Review).filter(Review.book_id == book_id)\
-        .offset(skip).limit(limit).all()
+    pager = Pager(db, Keyset(Review.id), cursor, skip, limit)
+    reviews = pager.apply(db.query(Review).filter(Review.book_id == book_id)).all()
     
-    return reviews
+    return render(List[ReviewResponse], pager.finish(reviews, response), response)
 
 
 @router.get("/{book_id}/statistics", response_model=BookStatistics)
@@ -317,44 +284,35 @@ def get_book_statistics(book_id: int, db: Session = Depends(get_db)):
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
     
-    # Get review statistics
-    review_stats = db.query(
-        func.count(Review.id).label('total_reviews'),
-        func.avg(Review.rating).label('average_rating')
-    ).filter(Review.book_id == book_id).first()
-    
-    # Get total readers
-    total_readers = db.query(func.count(UserBook.id)).filter(
-        UserBook.book_id == book_id
-    ).scalar() or 0
-    
     return BookStatistics(
         total_books=1,
-        total_reviews=review_stats.total_reviews or 0,
-        average_rating=float(review_stats.average_rating) if review_stats.average_rating else None,
-        total_readers=total_readers
+        total_reviews=book.review_count or 0,
+        average_rating=book.average_rating,
+        total_readers=book.reader_count or 0
     )
 
 
 @router.get("/popular/list", response_model=List[BookResponse])
 def get_popular_books(
-    skip: int = Query(0, ge=0),
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    sort: str = Query("popular", pattern="^(popular|trending)$"),
     db: Session = Depends(get_db)
 ):
-    """Get popular books based on number of readers and reviews"""
-    # Get books ordered by number of user_books and reviews
-    popular_books = db.query(Book)\
-        .outerjoin(UserBook)\
-        .outerjoin(Review)\
-        .group_by(Book.id)\
-        .order_by(
-            desc(func.count(UserBook.id)),
-            desc(func.count(Review.id))
-        )\
-        .offset(skip).limit(limit).all()
-    
-    return popular_books
+    """Get popular (readers, then reviews) or trending books from the precomputed book_rankings table"""
+    if sort == "trending":
+        keyset = Keyset(BookRanking.trending_score, BookRanking.book_id, descending=True)
+    else:
+        keyset = Keyset(BookRanking.reader_count, BookRanking.review_count, BookRanking.book_id, descending=True)
+    
+    pager = Pager(db, keyset, cursor, skip, limit)
+    rankings = pager.apply(
+        db.query(BookRanking).options(joinedload(BookRanking.book).selectinload(Book.authors))
+    ).all()
+    
+    return render(List[BookResponse], [ranking.book for ranking in pager.finish(rankings, response)], response)
 
 
 @router.post("/{book_id}/follow", response_model=BookResponse)
@@ -368,12 +326,10 @@ def follow_book(
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
     
-    # Check if already following
-    if current_user in book.followers:
+    # Add user to followers (INSERT ... ON CONFLICT DO NOTHING - the follower list is never loaded)
+    if not book_followers.add(db, current_user.id, book_id):
         raise HTTPException(status_code=400, detail="Already following this book")
     
-    # Add user to followers
-    book.followers.append(current_user)
     db.commit()
     db.refresh(book)
     return book
@@ -390,12 +346,10 @@ def unfollow_book(
     if not book:
         raise HTTPException(status_code=404, detail="Book not found")
     
-    # Check if user is following
-    if current_user not in book.followers:
+    # Remove user from followers (DELETE on the association row)
+    if not book_followers.remove(db, current_user.id, book_id):
         raise HTTPException(status_code=400, detail="Not following this book")
     
-    # Remove user from followers
-    book.followers.remove(current_user)
     db.commit()
     db.refresh(book)
     return book
@@ -1,20 +1,26 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, select, insert, update, delete, cast, Integer
+from sqlalchemy import or_, select, update, cast, Integer
 from app.database import get_db
 from app.models import Challenge, User, user_challenge_association
 from app.schemas import ChallengeCreate, ChallengeResponse, UserChallengeResponse, ChallengeProgressUpdate, ChallengeStatistics
 from sqlalchemy import func
 from app.auth import get_current_active_user
+from app.membership import challenge_participants
+from app.pagination import Keyset, Pager
+from app.response_cache import CachedRoute, cached, invalidates
 
-router = APIRouter(prefix="/api/challenges", tags=["challenges"])
+router = APIRouter(prefix="/api/challenges", tags=["challenges"], route_class=CachedRoute)
 
 
 @router.get("", response_model=List[ChallengeResponse])
+@cached("challenges")
 def get_challenges(
-    skip: int = Query(0, ge=0),
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
     search: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
@@ -29,8 +35,8 @@ def get_challenges(
             )
         )
     
-    challenges = query.offset(skip).limit(limit).all()
-    return challenges
+    pager = Pager(db, Keyset(Challenge.id), cursor, skip, limit)
+    return pager.finish(pager.apply(query).all(), response)
 
 
 @router.get("/{challenge_id}", response_model=ChallengeResponse)
@@ -43,6 +49,7 @@ def get_challenge(challenge_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("", response_model=ChallengeResponse, status_code=status.HTTP_201_CREATED)
+@invalidates("challenges")
 def create_challenge(
     challenge_data: ChallengeCreate,
     current_user: User = Depends(get_current_active_user),
@@ -68,21 +75,10 @@ def join_challenge(
     if not challenge:
         raise HTTPException(status_code=404, detail="Challenge not found")
     
-    # Check if already participating
-    if current_user in challenge.participants:
+    # Add user to challenge with initial progress (a no-op insert means already participating)
+    if not challenge_participants.add(db, current_user.id, challenge_id, progress=0, completed=False):
         raise HTTPException(status_code=400, detail="Already participating in this challenge")
     
-    # Add user to challenge with initial progress
-    db.execute(
-        insert(user_challenge_association).values(
-            user_id=current_user.id,
-            challenge_id=challenge_id,
-            progress=0,
-            completed=False
-        )
-    )
-    
-    challenge.participants.append(current_user)
     db.commit()
     db.refresh(challenge)
     
@@ -139,8 +135,8 @@ def update_challenge_progress(
     if not challenge:
         raise HTTPException(status_code=404, detail="Challenge not found")
     
-    # Check if user is participating
-    if current_user not in challenge.participants:
+    # Check if user is participating (indexed EXISTS, cached)
+    if not challenge_participants.exists(db, current_user.id, challenge_id):
         raise HTTPException(
             status_code=400,
             detail="You are not participating in this challenge"
@@ -197,28 +193,13 @@ def leave_challenge(
     if not challenge:
         raise HTTPException(status_code=404, detail="Challenge not found")
     
-    # Check if user is participating by checking association table directly
-    existing = db.execute(
-        select(user_challenge_association).where(
-            user_challenge_association.c.user_id == current_user.id,
-            user_challenge_association.c.challenge_id == challenge_id
-        )
-    ).first()
-    
-    if not existing:
+    # Remove user from challenge by deleting from association table
+    if not challenge_participants.remove(db, current_user.id, challenge_id):
         raise HTTPException(
             status_code=400,
             detail="You are not participating in this challenge"
         )
     
-    # Remove user from challenge by deleting from association table
-    db.execute(
-        delete(user_challenge_association).where(
-            user_challenge_association.c.user_id == current_user.id,
-            user_challenge_association.c.challenge_id == challenge_id
-        )
-    )
-    
     db.commit()
     
     return {"message": "Successfully left the challenge"}
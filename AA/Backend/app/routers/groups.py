@@ -1,8 +1,11 @@
+import asyncio
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session
-from sqlalchemy import or_
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Header, Request, Response, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, selectinload
+from sqlalchemy import or_, select
+from app.database import get_db, get_async_db
 from app.models import Group, User, Book, GroupDiscussion, GroupSchedule, GroupEvent
 from app.schemas import (
     GroupCreate, GroupResponse, GroupUpdate, MemberResponse, GroupDetailResponse,
@@ -11,14 +14,25 @@ from app.schemas import (
     GroupEventCreate, GroupEventUpdate, GroupEventResponse
 )
 from app.auth import get_current_active_user
+from app.discussion_hub import (
+    RESYNC, authenticate_connection, discussion_created, discussion_deleted, group_events, group_exists
+)
+from app.membership import MEMBER_SORTS, group_members, group_members_statement
+from app.pagination import Keyset, Pager
+from app.rate_limit import rate_limit_by_user
+from app.response_cache import CachedRoute, cached, invalidates
+from app.serialization import render
 
-router = APIRouter(prefix="/api/groups", tags=["groups"])
+router = APIRouter(prefix="/api/groups", tags=["groups"], route_class=CachedRoute)
 
 
 @router.get("", response_model=List[GroupResponse])
+@cached("groups", "books", "authors")
 def get_groups(
-    skip: int = Query(0, ge=0),
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(100, ge=1, le=100),
+    cursor: Optional[str] = None,
     search: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
@@ -35,8 +49,10 @@ def get_groups(
                 )
             )
         
-        groups = query.offset(skip).limit(limit).all()
-        return groups
+        pager = Pager(db, Keyset(Group.id), cursor, skip, limit)
+        return pager.finish(pager.apply(query).all(), response)
+    except HTTPException:
+        raise
     except Exception as e:
         import traceback
         print(f"Error in get_groups: {str(e)}")
@@ -54,6 +70,7 @@ def get_group(group_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("", response_model=GroupResponse, status_code=status.HTTP_201_CREATED)
+@invalidates("groups")
 def create_group(
     group_data: GroupCreate,
     current_user: User = Depends(get_current_active_user),
@@ -73,10 +90,10 @@ def create_group(
         **group_dict
     )
     db.add(db_group)
+    db.flush()
     
-    # Add creator as member
-    db_group.members.append(current_user)
-    db_group.members_count = 1
+    # Add creator as member (members_count 0 -> 1 in the same UPDATE path as join)
+    group_members.add(db, current_user.id, db_group.id)
     
     db.commit()
     db.refresh(db_group)
@@ -84,6 +101,7 @@ def create_group(
 
 
 @router.post("/{group_id}/join", response_model=GroupResponse)
+@invalidates("groups")
 def join_group(
     group_id: int,
     current_user: User = Depends(get_current_active_user),
@@ -94,19 +112,18 @@ def join_group(
     if not group:
         raise HTTPException(status_code=404, detail="Group not found")
     
-    # Check if already a member
-    if current_user in group.members:
+    # Add user to group (INSERT ... ON CONFLICT DO NOTHING - no need to load the member list)
+    if not group_members.add(db, current_user.id, group_id):
         raise HTTPException(status_code=400, detail="Already a member of this group")
     
-    # Add user to group
-    group.members.append(current_user)
-    group.members_count += 1
+    # members_count đã được tăng bằng UPDATE ... SET members_count = members_count + 1
     db.commit()
     db.refresh(group)
     return group
 
 
 @router.post("/{group_id}/leave", response_model=GroupResponse)
+@invalidates("groups")
 def leave_group(
     group_id: int,
     current_user: User = Depends(get_current_active_user),
@@ -117,13 +134,10 @@ def leave_group(
     if not group:
         raise HTTPException(status_code=404, detail="Group not found")
     
-    # Check if user is a member
-    if current_user not in group.members:
+    # Remove user from group (DELETE on the association row)
+    if not group_members.remove(db, current_user.id, group_id):
         raise HTTPException(status_code=400, detail="Not a member of this group")
     
-    # Remove user from group
-    group.members.remove(current_user)
-    group.members_count = max(0, group.members_count - 1)
     db.commit()
     db.refresh(group)
     return group
@@ -140,6 +154,7 @@ def get_my_groups(
 
 
 @router.patch("/{group_id}", response_model=GroupResponse)
+@invalidates("groups")
 def update_group(
     group_id: int,
     group_update: GroupUpdate,
@@ -175,19 +190,29 @@ def update_group(
 
 
 @router.get("/{group_id}/members", response_model=List[MemberResponse])
-def get_group_members(
+async def get_group_members(
     group_id: int,
-    db: Session = Depends(get_db)
+    response: Response,
+    sort: str = Query("joined_at", pattern="^(joined_at|name)$"),
+    order: str = Query("asc", pattern="^(asc|desc)$"),
+    name_prefix: Optional[str] = Query(None, min_length=1, max_length=100),
+    limit: int = Query(50, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get all members of a group"""
-    group = db.query(Group).filter(Group.id == group_id).first()
-    if not group:
+    """Get the members of a group, one page at a time (next page in X-Next-Cursor)"""
+    group_exists = await db.scalar(select(Group.id).where(Group.id == group_id))
+    if not group_exists:
         raise HTTPException(status_code=404, detail="Group not found")
     
-    return group.members
+    # joined_at -> ix_user_group_group_id_joined_at; name sorts only this group's rows
+    pager = Pager(db, Keyset(*MEMBER_SORTS[sort], descending=order == "desc"), cursor, 0, limit)
+    result = await db.execute(pager.apply(group_members_statement(group_id, name_prefix)))
+    return render(List[MemberResponse], pager.finish(result.all(), response), response)
 
 
 @router.post("/{group_id}/set-current-book", response_model=GroupResponse)
+@invalidates("groups")
 def set_current_book(
     group_id: int,
     book_id: int = Query(...),
@@ -222,25 +247,37 @@ def set_current_book(
 # ============================================
 
 @router.get("/{group_id}/discussions", response_model=List[GroupDiscussionResponse])
-def get_group_discussions(
+async def get_group_discussions(
     group_id: int,
-    skip: int = Query(0, ge=0),
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(50, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all discussions for a group"""
-    group = db.query(Group).filter(Group.id == group_id).first()
-    if not group:
+    group_exists = await db.scalar(select(Group.id).where(Group.id == group_id))
+    if not group_exists:
         raise HTTPException(status_code=404, detail="Group not found")
     
-    discussions = db.query(GroupDiscussion).filter(
-        GroupDiscussion.group_id == group_id
-    ).order_by(GroupDiscussion.created_at.desc()).offset(skip).limit(limit).all()
-    
-    return discussions
+    # Newest first, keyed on (created_at, id) -> ix_group_discussions_group_id_created_at
+    pager = Pager(db, Keyset(GroupDiscussion.created_at, GroupDiscussion.id, descending=True), cursor, skip, limit)
+    result = await db.execute(
+        pager.apply(
+            select(GroupDiscussion)
+            .options(selectinload(GroupDiscussion.user))
+            .where(GroupDiscussion.group_id == group_id)
+        )
+    )
+    return pager.finish(result.scalars().all(), response)
 
 
-@router.post("/{group_id}/discussions", response_model=GroupDiscussionResponse, status_code=status.HTTP_201_CREATED)
+@router.post(
+    "/{group_id}/discussions",
+    response_model=GroupDiscussionResponse,
+    status_code=status.HTTP_201_CREATED,
+    dependencies=[Depends(rate_limit_by_user("discussion"))]
+)
 def create_discussion(
     group_id: int,
     discussion_data: GroupDiscussionCreate,
@@ -252,8 +289,8 @@ def create_discussion(
     if not group:
         raise HTTPException(status_code=404, detail="Group not found")
     
-    # Check if user is a member
-    if current_user not in group.members:
+    # Check if user is a member (indexed EXISTS, cached)
+    if not group_members.exists(db, current_user.id, group_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Bạn phải là thành viên của nhóm để bình luận"
@@ -267,6 +304,8 @@ def create_discussion(
     db.add(discussion)
     db.commit()
     db.refresh(discussion)
+    # Đẩy tới các client đang mở WebSocket / SSE (sau commit)
+    discussion_created(discussion)
     return discussion
 
 
@@ -297,9 +336,92 @@ def delete_discussion(
     
     db.delete(discussion)
     db.commit()
+    discussion_deleted(group_id, discussion_id)
     return None
 
 
+async def _send_events(websocket: WebSocket, group_id: int, since_id: Optional[int]) -> None:
+    events = group_events(group_id, since_id)
+    try:
+        async for event in events:
+            # send chờ client nhận -> client chậm làm đầy hàng đợi của nó và nhận "resync"
+            await websocket.send_text(event.data)
+            if event.type == RESYNC:
+                await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+                return
+    finally:
+        await events.aclose()
+
+
+async def _wait_for_disconnect(websocket: WebSocket) -> None:
+    # Client không cần gửi gì; đọc chỉ để biết khi nào kết nối đóng
+    try:
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+
+
+@router.websocket("/{group_id}/discussions/ws")
+async def discussion_socket(
+    websocket: WebSocket,
+    group_id: int,
+    since_id: Optional[int] = Query(None, ge=0)
+):
+    """Push new/deleted discussions of a group instead of polling.
+
+    Authenticate with `Authorization: Bearer` or `?token=`. Pass the last
+    discussion id seen as `since_id` on reconnect to receive what was missed.
+    """
+    if await authenticate_connection(websocket) is None:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    if not await group_exists(group_id):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Group not found")
+        return
+    
+    await websocket.accept()
+    sender = asyncio.create_task(_send_events(websocket, group_id, since_id))
+    receiver = asyncio.create_task(_wait_for_disconnect(websocket))
+    done, pending = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+
+@router.get("/{group_id}/discussions/stream", response_class=StreamingResponse)
+async def stream_group_discussions(
+    group_id: int,
+    request: Request,
+    since_id: Optional[int] = Query(None, ge=0),
+    last_event_id: Optional[int] = Header(None, ge=0)
+):
+    """Server-Sent Events fallback of /discussions/ws (EventSource resumes via Last-Event-ID)"""
+    if await authenticate_connection(request) is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    if not await group_exists(group_id):
+        raise HTTPException(status_code=404, detail="Group not found")
+    
+    async def body():
+        events = group_events(group_id, since_id if since_id is not None else last_event_id)
+        try:
+            async for event in events:
+                yield event.sse()
+        finally:
+            await events.aclose()
+    
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        # Không cache / không buffer ở reverse proxy (nginx)
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # ============================================
 # SCHEDULE ENDPOINTS
 # ============================================
@@ -1,33 +1,46 @@
 from typing import List, Optional
-from fastapi import APIRouter, Depends, HTTPException, status, Query
-from sqlalchemy.orm import Session, joinedload
-from app.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, selectinload
+from app.database import get_db, get_async_db
 from app.models import Review, Book, User, UserBook
 from app.schemas import ReviewCreate, ReviewResponse, ReviewUpdate
 from app.auth import get_current_active_user
+from app.book_stats import review_added, review_removed, review_rating_changed, apply_reader_delta
+from app.pagination import Keyset, Pager
+from app.serialization import render
+from app.response_cache import CachedRoute, invalidates
 
-router = APIRouter(prefix="/api/reviews", tags=["reviews"])
+router = APIRouter(prefix="/api/reviews", tags=["reviews"], route_class=CachedRoute)
 
 
 @router.get("", response_model=List[ReviewResponse])
-def get_reviews(
+async def get_reviews(
+    response: Response,
     book_id: Optional[int] = Query(None),
     user_id: Optional[int] = Query(None),
-    skip: int = Query(0, ge=0),
+    skip: int = Query(0, ge=0, deprecated=True),
     limit: int = Query(100, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get reviews with optional filters"""
-    query = db.query(Review).options(joinedload(Review.user), joinedload(Review.book))
+    # Book.authors is serialized too, so it must be eager loaded on an AsyncSession
+    query = select(Review).options(
+        selectinload(Review.user),
+        selectinload(Review.book).selectinload(Book.authors)
+    )
     
     if book_id:
-        query = query.filter(Review.book_id == book_id)
+        query = query.where(Review.book_id == book_id)
     
     if user_id:
-        query = query.filter(Review.user_id == user_id)
+        query = query.where(Review.user_id == user_id)
     
-    reviews = query.offset(skip).limit(limit).all()
-    return reviews
+    pager = Pager(db, Keyset(Review.id), cursor, skip, limit)
+    result = await db.execute(pager.apply(query))
+    return render(List[ReviewResponse], pager.finish(result.scalars().all(), response), response)
 
 
 @router.get("/{review_id}", response_model=ReviewResponse)
@@ -41,6 +54,7 @@ def get_review(review_id: int, db: Session = Depends(get_db)):
 
 
 @router.post("", response_model=ReviewResponse, status_code=status.HTTP_201_CREATED)
+@invalidates("books")
 def create_review(
     review_data: ReviewCreate,
     current_user: User = Depends(get_current_active_user),
@@ -61,6 +75,7 @@ def create_review(
         **review_dict
     )
     db.add(db_review)
+    review_added(db, review_data.book_id, review_data.rating)
     
     # Update rating in user_books if the book is in user's list
     # If book is not in user's list, add it first
@@ -83,6 +98,7 @@ def create_review(
             progress=0
         )
         db.add(user_book)
+        apply_reader_delta(db, review_data.book_id, 1)
     
     db.commit()
     db.refresh(db_review)
@@ -93,6 +109,7 @@ def create_review(
 
 
 @router.patch("/{review_id}", response_model=ReviewResponse)
+@invalidates("books")
 def update_review(
     review_id: int,
     review_update: ReviewUpdate,
@@ -109,12 +126,14 @@ def update_review(
         raise HTTPException(status_code=404, detail="Review not found")
     
     # Update fields
+    old_rating = review.rating
     update_data = review_update.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(review, field, value)
     
     # Update rating in user_books if rating was updated
     if "rating" in update_data:
+        review_rating_changed(db, review.book_id, old_rating, update_data["rating"])
         user_book = db.query(UserBook).filter(
             UserBook.user_id == current_user.id,
             UserBook.book_id == review.book_id
@@ -133,6 +152,7 @@ def update_review(
 
 
 @router.delete("/{review_id}", status_code=status.HTTP_204_NO_CONTENT)
+@invalidates("books")
 def delete_review(
     review_id: int,
     current_user: User = Depends(get_current_active_user),
@@ -147,6 +167,7 @@ def delete_review(
     if not review:
         raise HTTPException(status_code=404, detail="Review not found")
     
+    review_removed(db, review.book_id, review.rating)
     db.delete(review)
     db.commit()
     return None
@@ -6,21 +6,27 @@ import os
 import shutil
 from pathlib import Path
 from typing import Optional
+from functools import lru_cache
 
 router = APIRouter(prefix="/api/upload", tags=["upload"])
 
-# Tạo thư mục static/images/books nếu chưa có
+# Thư mục static/images/books (tạo khi upload lần đầu, không tạo lúc import)
 UPLOAD_DIR = Path(__file__).parent.parent.parent / "static" / "images" / "books"
-UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
-# Tạo thư mục static/files/books nếu chưa có
+# Thư mục static/files/books (tạo khi upload lần đầu, không tạo lúc import)
 FILES_DIR = Path(__file__).parent.parent.parent / "static" / "files" / "books"
-FILES_DIR.mkdir(parents=True, exist_ok=True)
 
 # Base URL cho ảnh và file
 BASE_URL = "http://localhost:8000"
 
 
+@lru_cache(maxsize=None)
+def ensure_dir(directory: Path) -> Path:
+    """Create an upload directory on first use (cached so it is a no-op afterwards)"""
+    directory.mkdir(parents=True, exist_ok=True)
+    return directory
+
+
 @router.post("/book-cover")
 async def upload_book_cover(
     file: UploadFile = File(...),
@@ -54,7 +60,7 @@ async def upload_book_cover(
     import uuid
     file_id = str(uuid.uuid4())
     file_name = f"{file_id}{file_ext}"
-    file_path = UPLOAD_DIR / file_name
+    file_path = ensure_dir(UPLOAD_DIR) / file_name
     
     # Lưu file
     try:
@@ -112,7 +118,7 @@ async def upload_book_file(
     import uuid
     file_id = str(uuid.uuid4())
     file_name = f"{file_id}{file_ext}"
-    file_path = FILES_DIR / file_name
+    file_path = ensure_dir(FILES_DIR) / file_name
     
     # Lưu file
     try:
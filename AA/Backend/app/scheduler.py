@@ -0,0 +1,75 @@
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, List, Optional, Tuple
+from sqlalchemy import update, or_
+from sqlalchemy.orm import Session
+from app.config import settings
+from app.database import dialect_insert
+from app.models import ScheduledJob
+
+
+def claim_job(db: Session, name: str, min_interval_seconds: float, now: Optional[datetime] = None) -> bool:
+    """Record a run of `name` unless one started less than min_interval_seconds ago (caller commits).
+
+    The conditional UPDATE takes the row lock until commit: a second process
+    claiming at the same time waits, then sees the new last_run_at and gets
+    False - on PostgreSQL and SQLite alike.
+    """
+    now = now or datetime.now(timezone.utc)
+    db.execute(
+        dialect_insert(db, ScheduledJob.__table__)
+        .values(name=name, last_run_at=None)
+        .on_conflict_do_nothing(index_elements=["name"])
+    )
+    result = db.execute(
+        update(ScheduledJob)
+        .where(
+            ScheduledJob.name == name,
+            or_(
+                ScheduledJob.last_run_at.is_(None),
+                ScheduledJob.last_run_at <= now - timedelta(seconds=min_interval_seconds)
+            )
+        )
+        .values(last_run_at=now)
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def scheduled_jobs() -> List[Tuple[str, int, Callable]]:
+    """(name, interval seconds, job) for every enabled periodic job; a job takes its min interval"""
+    from app.membership import run_reconcile
+    from app.rankings import run_refresh
+
+    jobs = []
+    if settings.RANKING_REFRESH_SECONDS > 0:
+        jobs.append(("rankings", settings.RANKING_REFRESH_SECONDS, run_refresh))
+    if settings.MEMBERSHIP_RECONCILE_SECONDS > 0:
+        jobs.append(("membership_reconcile", settings.MEMBERSHIP_RECONCILE_SECONDS, run_reconcile))
+    return jobs
+
+
+def run_forever() -> None:
+    """Run the periodic jobs in this one process - never from the API workers"""
+    jobs = scheduled_jobs()
+    if not jobs:
+        print("No periodic jobs enabled")
+        return
+    next_run = {name: 0.0 for name, _, _ in jobs}
+    while True:
+        for name, interval, job in jobs:
+            if time.monotonic() < next_run[name]:
+                continue
+            try:
+                result = job(interval)
+                print(f"{name}: {'skipped (ran recently)' if result is None else result}")
+            except Exception as e:
+                print(f"Scheduled job {name} failed: {str(e)}")
+            next_run[name] = time.monotonic() + interval
+        time.sleep(max(0.0, min(next_run.values()) - time.monotonic()))
+
+
+if __name__ == "__main__":
+    # Một process duy nhất cho mỗi môi trường (worker riêng, không chạy trong uvicorn):
+    #   python -m app.scheduler
+    run_forever()
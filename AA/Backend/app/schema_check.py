@@ -0,0 +1,43 @@
+from functools import lru_cache
+from typing import Optional
+from app.config import BACKEND_DIR
+
+
+@lru_cache(maxsize=1)
+def expected_revision() -> Optional[str]:
+    """Head revision of the alembic scripts shipped with this build (read once)"""
+    # Import alembic lazily - it is only needed at startup, not on every import of app
+    from alembic.config import Config
+    from alembic.script import ScriptDirectory
+    
+    config = Config(str(BACKEND_DIR / "alembic.ini"))
+    config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+    return ScriptDirectory.from_config(config).get_current_head()
+
+
+def current_revision(engine) -> Optional[str]:
+    """Revision recorded in the database's alembic_version table"""
+    from alembic.runtime.migration import MigrationContext
+    
+    with engine.connect() as connection:
+        return MigrationContext.configure(connection).get_current_revision()
+
+
+def check_schema_revision(engine) -> bool:
+    """Compare the database revision with the alembic head - a single cheap query.
+    
+    Replaces create_all() at import time; schema changes go through
+    `alembic upgrade head`. Returns False (and logs) when they differ or the
+    database is unreachable, without stopping the worker.
+    """
+    try:
+        expected = expected_revision()
+        current = current_revision(engine)
+    except Exception as e:
+        print(f"Schema check skipped: {str(e)}")
+        return False
+    
+    if current != expected:
+        print(f"Database schema is at revision {current}, expected {expected}. Run 'alembic upgrade head'.")
+        return False
+    return True
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, EmailStr, Field
+from pydantic import AliasChoices, BaseModel, EmailStr, Field, field_validator
 from typing import Optional, List
 from datetime import datetime
 
@@ -30,6 +30,8 @@ class PasswordChange(BaseModel):
 
 class UserResponse(UserBase):
     id: int
+    # Đã validate lúc đăng ký; EmailStr (idna) trên mỗi response chiếm phần lớn CPU của list reviews
+    email: str
     avatar_url: Optional[str] = None
     role: str = "user"
     is_active: bool = True
@@ -43,10 +45,23 @@ class UserResponse(UserBase):
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
+
+
+class PasswordChangeResponse(Token):
+    message: str
+
+
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
 
 
 class TokenData(BaseModel):
     email: Optional[str] = None
+    user_id: Optional[int] = None
+    role: Optional[str] = None
+    token_version: Optional[int] = None
+    token_type: Optional[str] = None
 
 
 # Author Schemas
@@ -100,9 +115,20 @@ class BookResponse(BookBase):
     id: int
     authors: List[AuthorResponse] = []
     average_rating: Optional[float] = None
-    total_reviews: int = 0
+    # Đọc từ cột denormalized Book.review_count khi dựng từ ORM
+    total_reviews: int = Field(0, validation_alias=AliasChoices("total_reviews", "review_count"))
     created_at: datetime
     
+    @field_validator("average_rating")
+    @classmethod
+    def round_average_rating(cls, value: Optional[float]) -> Optional[float]:
+        return round(value, 1) if value is not None else None
+    
+    @field_validator("total_reviews", mode="before")
+    @classmethod
+    def default_total_reviews(cls, value: Optional[int]) -> int:
+        return value or 0
+    
     class Config:
         from_attributes = True
 
@@ -188,7 +214,7 @@ class GroupResponse(GroupBase):
 
 
 class MemberResponse(UserResponse):
-    pass
+    joined_at: Optional[datetime] = None
 
 
 # Challenge Schemas
@@ -269,6 +295,16 @@ class GroupDiscussionResponse(GroupDiscussionBase):
         from_attributes = True
 
 
+class DiscussionEvent(BaseModel):
+    """Message pushed on /api/groups/{id}/discussions/ws and /stream"""
+    # discussion.created | discussion.deleted | ping | resync (reload, then reconnect with since_id)
+    type: str
+    group_id: int
+    discussion_id: Optional[int] = None
+    discussion: Optional[GroupDiscussionResponse] = None
+    since_id: Optional[int] = None
+
+
 # Group Schedule Schemas
 class GroupScheduleBase(BaseModel):
     title: str
@@ -365,4 +401,51 @@ class AuthorNotificationResponse(AuthorNotificationBase):
     is_active: bool
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+
+class InboxNotificationResponse(AuthorNotificationResponse):
+    is_read: bool = False
+
+
+class UnreadCountResponse(BaseModel):
+    unread: int
+
+# Batch Schemas - lấy nhiều bản ghi theo id trong một request
+BATCH_MAX_IDS = 500
+
+
+class BatchRequest(BaseModel):
+    ids: List[int] = Field(..., min_length=1, max_length=BATCH_MAX_IDS)
+
+
+class MarkReadRequest(BaseModel):
+    """notification_ids to mark read, or all=true for every notification"""
+    notification_ids: List[int] = Field(default_factory=list, max_length=BATCH_MAX_IDS)
+    all: bool = False
+
+
+class PublicUserResponse(BaseModel):
+    """Public profile - no email or role"""
+    id: int
+    name: str
+    avatar_url: Optional[str] = None
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+
+class BookBatchResponse(BaseModel):
+    items: List[BookResponse]
+    missing: List[int] = []
+
+
+class AuthorBatchResponse(BaseModel):
+    items: List[AuthorResponse]
+    missing: List[int] = []
+
+
+class PublicUserBatchResponse(BaseModel):
+    items: List[PublicUserResponse]
+    missing: List[int] = []
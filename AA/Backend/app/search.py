@@ -0,0 +1,105 @@
+import re
+from typing import Optional
+from sqlalchemy import func, or_, select, literal, literal_column, type_coerce, union
+from sqlalchemy.dialects.postgresql import TSVECTOR
+from app.models import Book, Author, book_author_association
+
+# Text search config: "simple" does no stemming, which suits Vietnamese titles
+SEARCH_CONFIG = "simple"
+
+SEARCH_MODES = ("auto", "fulltext", "substring")
+
+# Author matches count a bit less than a match on the book itself
+AUTHOR_WEIGHT = 0.5
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+# Generated column + GIN index created by the add_book_search migration (PostgreSQL only)
+book_search_vector = type_coerce(literal_column("books.search_vector"), TSVECTOR)
+
+
+def prefix_tsquery(search: str) -> Optional[str]:
+    """'harry pot' -> 'harry:* & pot:*' so results follow each keystroke"""
+    tokens = _TOKEN.findall(search.lower())
+    if not tokens:
+        return None
+    return " & ".join(f"{token}:*" for token in tokens)
+
+
+def use_fulltext(mode: str, dialect_name: str) -> bool:
+    if mode == "substring":
+        return False
+    # tsvector / pg_trgm only exist on PostgreSQL; "auto" falls back to ILIKE elsewhere
+    return dialect_name == "postgresql"
+
+
+def substring_filter(search: str):
+    """Old behaviour: case-insensitive substring on title or description"""
+    return or_(
+        Book.title.ilike(f"%{search}%"),
+        Book.description.ilike(f"%{search}%")
+    )
+
+
+def fulltext_candidates(search: str):
+    """CTE of ids of books matching the search, or None when it has no word characters.
+
+    A UNION of three probes, each served by its own index, so PostgreSQL
+    never has to fall back to a scan of books to evaluate an OR:
+      - the weighted title/description tsvector (ix_books_search_vector)
+      - pg_trgm word similarity on the title (ix_books_title_trgm)
+      - pg_trgm word similarity on an author name (ix_authors_name_trgm),
+        mapped to books through book_author
+    """
+    tsquery_text = prefix_tsquery(search)
+    if tsquery_text is None:
+        return None
+
+    tsquery = func.to_tsquery(SEARCH_CONFIG, tsquery_text)
+    term = literal(search)
+    # "<%" = word similarity above pg_trgm.word_similarity_threshold
+    by_text = select(Book.id.label("book_id")).where(book_search_vector.op("@@")(tsquery))
+    by_title = select(Book.id).where(term.op("<%")(Book.title))
+    by_author = (
+        select(book_author_association.c.book_id)
+        .join(Author, Author.id == book_author_association.c.author_id)
+        .where(term.op("<%")(Author.name))
+    )
+    return union(by_text, by_title, by_author).cte("candidates")
+
+
+def ranked_search(query, search: str):
+    """Restrict a select(Book) to PostgreSQL search matches, most relevant first.
+
+    Only the candidate books are ranked: the author part of the score is a
+    per-book max(word_similarity) over those candidates, joined once rather
+    than computed by a subquery per row. Returns None when the search has
+    no word characters.
+    """
+    candidates = fulltext_candidates(search)
+    if candidates is None:
+        return None
+
+    tsquery = func.to_tsquery(SEARCH_CONFIG, prefix_tsquery(search))
+    term = literal(search)
+    author_scores = (
+        select(
+            book_author_association.c.book_id,
+            func.max(func.word_similarity(term, Author.name)).label("score")
+        )
+        .join(Author, Author.id == book_author_association.c.author_id)
+        .where(book_author_association.c.book_id.in_(select(candidates.c.book_id)))
+        .group_by(book_author_association.c.book_id)
+        .subquery("author_scores")
+    )
+    relevance = (
+        func.ts_rank_cd(book_search_vector, tsquery)
+        + func.word_similarity(term, Book.title)
+        + AUTHOR_WEIGHT * func.coalesce(author_scores.c.score, 0)
+    )
+    return (
+        query
+        .join(candidates, candidates.c.book_id == Book.id)
+        .outerjoin(author_scores, author_scores.c.book_id == Book.id)
+        .order_by(relevance.desc(), Book.id)
+    )
@@ -0,0 +1,49 @@
+from functools import lru_cache
+from typing import Any, Optional
+from fastapi import Response
+from fastapi.responses import JSONResponse
+from pydantic import TypeAdapter
+
+try:
+    import orjson
+except ImportError:  # orjson là tùy chọn - thiếu thì dùng json của stdlib
+    orjson = None
+
+if orjson is not None:
+    from fastapi.responses import ORJSONResponse as DefaultJSONResponse
+else:
+    DefaultJSONResponse = JSONResponse
+
+
+@lru_cache(maxsize=None)
+def adapter_for(response_type: Any) -> TypeAdapter:
+    """Validator + serializer for a response type, built once per type"""
+    return TypeAdapter(response_type)
+
+
+def ndjson_lines(item_type: Any, items) -> bytes:
+    """Serialize a batch of ORM objects / rows as newline-delimited JSON (one object per line)"""
+    adapter = adapter_for(item_type)
+    return b"".join(adapter.dump_json(adapter.validate_python(item, from_attributes=True)) + b"\n" for item in items)
+
+
+def render(response_type: Any, content: Any, response: Optional[Response] = None, status_code: int = 200) -> Response:
+    """Serialize ORM objects / dicts straight to JSON bytes.
+
+    Fast path for large lists: one validation (from attributes) and one
+    serialization, both in pydantic-core, instead of FastAPI's validate ->
+    dump to Python -> json.dumps. The route keeps response_model=... for the
+    OpenAPI schema. Headers set on the injected `response` (e.g.
+    X-Next-Cursor) are carried over, since FastAPI drops them when the
+    endpoint returns its own Response.
+
+        return render(List[BookResponse], books, response)
+    """
+    adapter = adapter_for(response_type)
+    body = adapter.dump_json(adapter.validate_python(content, from_attributes=True))
+    rendered = Response(content=body, status_code=status_code, media_type="application/json")
+    if response is not None:
+        for name, value in response.headers.items():
+            if name not in ("content-length", "content-type"):
+                rendered.headers.append(name, value)
+    return rendered
@@ -0,0 +1,109 @@
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Placeholders of every DB-API paramstyle we use: ?, %(name)s, %s, $1
+_PARAM = r"(?:\?|%\(\w+\)s|%s|\$\d+)"
+_IN_LIST = re.compile(r"\(\s*" + _PARAM + r"(?:\s*,\s*" + _PARAM + r")*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def statement_shape(statement: str) -> str:
+    """Normalize a statement so the same query with different IN-list sizes compares equal"""
+    return _IN_LIST.sub("(?)", _WHITESPACE.sub(" ", statement).strip())
+
+
+class QueryStats:
+    """Statements executed while handling one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.total_time = 0.0
+        self.shapes: Counter = Counter()
+
+    def record(self, statement: str, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        self.shapes[statement_shape(statement)] += 1
+
+    def repeated_shapes(self, threshold: int) -> List[Tuple[str, int]]:
+        """Statement shapes run at least `threshold` times - the N+1 signature"""
+        return [(shape, n) for shape, n in self.shapes.most_common() if n >= threshold]
+
+
+_current_stats: ContextVar[Optional[QueryStats]] = ContextVar("sql_query_stats", default=None)
+
+
+def start_request_stats() -> QueryStats:
+    """Begin collecting for the current context (call before the endpoint runs)"""
+    stats = QueryStats()
+    _current_stats.set(stats)
+    return stats
+
+
+# Lắng nghe trên class Engine -> áp dụng cho mọi engine (sync, async, replica)
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    start = conn.info["query_start_time"].pop()
+    stats = _current_stats.get()
+    if stats is not None:
+        stats.record(statement, time.perf_counter() - start)
+
+
+def apply_headers(response, stats: QueryStats, n_plus_one_threshold: int) -> None:
+    """Expose the request's query count/time and flag repeated statement shapes"""
+    response.headers["X-DB-Query-Count"] = str(stats.count)
+    response.headers["Server-Timing"] = f'db;dur={stats.total_time * 1000:.1f};desc="{stats.count} queries"'
+    repeated = stats.repeated_shapes(n_plus_one_threshold)
+    if repeated:
+        shape, times = repeated[0]
+        response.headers["X-DB-N-Plus-One"] = str(times)
+        print(f"Possible N+1: {times}x {shape[:200]}")
+
+
+@contextmanager
+def capture_queries():
+    """Collect statements run inside the block (direct calls, same thread/task)"""
+    stats = QueryStats()
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+
+@contextmanager
+def query_budget(max_queries: int):
+    """Fail if the block runs more than `max_queries` statements.
+
+        with query_budget(3):
+            get_my_challenges(current_user=user, db=db)
+    """
+    with capture_queries() as stats:
+        yield stats
+    if stats.count > max_queries:
+        details = "\n".join(f"  {n}x {shape}" for shape, n in stats.shapes.most_common())
+        raise AssertionError(f"Expected at most {max_queries} queries, got {stats.count}:\n{details}")
+
+
+def assert_query_budget(response, max_queries: int) -> None:
+    """Check the X-DB-Query-Count header of a TestClient response against a budget.
+
+    The app runs in its own thread under TestClient, so the budget is read
+    from the header instead of a context variable.
+    """
+    count = int(response.headers["X-DB-Query-Count"])
+    assert count <= max_queries, (
+        f"{response.request.method} {response.request.url.path} ran {count} queries "
+        f"(budget {max_queries})"
+    )
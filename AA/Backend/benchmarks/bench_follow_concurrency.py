@@ -0,0 +1,137 @@
+"""Concurrent follow/unfollow and join/leave against the counter columns.
+
+Creates throwaway readers, one author and one group in the configured
+database, then runs --threads workers that keep following/unfollowing the
+author and joining/leaving the group through app.membership (the same calls
+the routes make, one transaction each). At the end the stored
+followers_count / members_count must equal COUNT(*) on the association
+tables - any lost or doubled increment is drift. The budget is zero drift.
+
+Run it against PostgreSQL to exercise real row-level concurrency; SQLite
+serializes writers, so it only checks the bookkeeping.
+
+Usage:
+    DATABASE_URL=postgresql://... SECRET_KEY=bench python benchmarks/bench_follow_concurrency.py \
+        --threads 32 --seconds 10
+"""
+import argparse
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from sqlalchemy import delete, func, select  # noqa: E402
+from sqlalchemy.exc import OperationalError  # noqa: E402
+
+from app.database import SessionLocal  # noqa: E402
+from app.membership import author_followers, group_members  # noqa: E402
+from app.models import Author, Group, User  # noqa: E402
+
+BUDGET_DRIFT = 0
+
+
+def seed(readers):
+    tag = uuid.uuid4().hex[:8]
+    db = SessionLocal()
+    try:
+        users = [
+            User(email=f"bench-{tag}-{i}@example.com", name=f"Bench {i}", hashed_password="x")
+            for i in range(readers)
+        ]
+        author = Author(name=f"Bench author {tag}", followers_count=0)
+        db.add_all(users + [author])
+        db.flush()
+        group = Group(name=f"Bench group {tag}", created_by=users[0].id, members_count=0)
+        db.add(group)
+        db.commit()
+        return [user.id for user in users], author.id, group.id
+    finally:
+        db.close()
+
+
+def worker(user_ids, author_id, group_id, deadline, counts, lock):
+    db = SessionLocal()
+    done = errors = 0
+    try:
+        while time.perf_counter() < deadline:
+            user_id = random.choice(user_ids)
+            membership, target_id = random.choice(((author_followers, author_id), (group_members, group_id)))
+            try:
+                # Như route: thử thêm, nếu đã có thì bỏ - mỗi thao tác một transaction
+                if not membership.add(db, user_id, target_id):
+                    membership.remove(db, user_id, target_id)
+                db.commit()
+                done += 1
+            except OperationalError:
+                # SQLite: database is locked / PostgreSQL: deadlock, serialization failure
+                db.rollback()
+                errors += 1
+    finally:
+        db.close()
+    with lock:
+        counts[0] += done
+        counts[1] += errors
+
+
+def drift(db, membership, model, target_id):
+    stored = db.execute(select(membership.counter).where(model.id == target_id)).scalar()
+    actual = db.execute(
+        select(func.count()).select_from(membership.table).where(membership.target_column == target_id)
+    ).scalar()
+    return stored, actual
+
+
+def cleanup(user_ids, author_id, group_id):
+    db = SessionLocal()
+    try:
+        for membership in (author_followers, group_members):
+            db.execute(delete(membership.table).where(membership.table.c.user_id.in_(user_ids)))
+        db.execute(delete(Group).where(Group.id == group_id))
+        db.execute(delete(Author).where(Author.id == author_id))
+        db.execute(delete(User).where(User.id.in_(user_ids)))
+        db.commit()
+    finally:
+        db.close()
+
+
+def run(args):
+    user_ids, author_id, group_id = seed(args.readers)
+    counts, lock = [0, 0], threading.Lock()
+    deadline = time.perf_counter() + args.seconds
+    try:
+        with ThreadPoolExecutor(max_workers=args.threads) as pool:
+            for _ in range(args.threads):
+                pool.submit(worker, user_ids, author_id, group_id, deadline, counts, lock)
+
+        db = SessionLocal()
+        try:
+            followers = drift(db, author_followers, Author, author_id)
+            members = drift(db, group_members, Group, group_id)
+        finally:
+            db.close()
+    finally:
+        cleanup(user_ids, author_id, group_id)
+
+    print(f"{args.threads} threads, {args.readers} readers, {args.seconds:.0f}s")
+    print(f"{counts[0]} operations ({counts[0] / args.seconds:.0f}/s), {counts[1]} retried errors")
+    print(f"{'counter':>16} {'stored':>8} {'actual':>8}")
+    print(f"{'followers_count':>16} {followers[0]:8d} {followers[1]:8d}")
+    print(f"{'members_count':>16} {members[0]:8d} {members[1]:8d}")
+
+    total_drift = abs(followers[0] - followers[1]) + abs(members[0] - members[1])
+    ok = total_drift <= BUDGET_DRIFT
+    print("OK" if ok else f"OVER BUDGET: drift {total_drift}")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--readers", type=int, default=50)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    sys.exit(0 if run(parser.parse_args()) else 1)
@@ -0,0 +1,66 @@
+"""Cold-start budget for importing the application.
+
+Runs `python -X importtime -c "import app.main"` in a fresh interpreter and
+reports the cumulative import time plus the slowest modules. Importing the app
+must not touch the database or the filesystem, so this works without a live DB.
+
+Usage:
+    DATABASE_URL=sqlite:// SECRET_KEY=bench python benchmarks/bench_import_time.py --budget-ms 2000
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[1]
+
+
+def parse_importtime(stderr: str):
+    """(module, self_us, cumulative_us) for each line of -X importtime output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+def measure(module: str):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=BACKEND_DIR,
+        env=os.environ.copy(),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        print(result.stderr[-2000:])
+        raise SystemExit(f"import {module} failed")
+    return parse_importtime(result.stderr)
+
+
+def run(args):
+    samples = [measure(args.module) for _ in range(args.runs)]
+    # Module nằm ở cấp ngoài cùng -> cumulative của nó là tổng thời gian import
+    totals = [next(cum for name, _, cum in rows if name == args.module) / 1000 for rows in samples]
+    best = min(totals)
+    
+    print(f"import {args.module}: best {best:.0f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+    print(f"{'self ms':>9} {'cum ms':>9}  module")
+    for name, self_us, cumulative_us in sorted(samples[0], key=lambda row: row[1], reverse=True)[:args.top]:
+        print(f"{self_us / 1000:9.1f} {cumulative_us / 1000:9.1f}  {name}")
+    
+    ok = best <= args.budget_ms
+    print("OK" if ok else "OVER BUDGET")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget-ms", type=float, default=2000.0)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    sys.exit(0 if run(parser.parse_args()) else 1)
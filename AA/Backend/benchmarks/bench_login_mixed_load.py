@@ -0,0 +1,96 @@
+"""Mixed-load benchmark: login burst vs. catalog reads.
+
+Runs N login clients against /api/auth/login while M reader clients hit
+/api/books, then prints p50/p99 latency for both paths. Compare a run with
+bcrypt inline (previous behaviour) against the process-pool hasher to see
+that a login burst no longer starves unrelated reads.
+
+Usage (against a running server with an existing account):
+    python benchmarks/bench_login_mixed_load.py --base-url http://localhost:8000 \
+        --email bench@example.com --password secret123 --login-clients 16 --read-clients 8
+"""
+import argparse
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def worker(request_factory, deadline, latencies, errors, lock):
+    while time.perf_counter() < deadline:
+        request = request_factory()
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=30) as response:
+                response.read()
+        except urllib.error.HTTPError as exc:
+            with lock:
+                errors[exc.code] = errors.get(exc.code, 0) + 1
+            continue
+        except Exception:
+            with lock:
+                errors["conn"] = errors.get("conn", 0) + 1
+            continue
+        elapsed = (time.perf_counter() - start) * 1000
+        with lock:
+            latencies.append(elapsed)
+
+
+def run(args):
+    login_body = urllib.parse.urlencode({"username": args.email, "password": args.password}).encode()
+
+    def login_request():
+        return urllib.request.Request(
+            f"{args.base_url}/api/auth/login",
+            data=login_body,
+            headers={"Content-Type": "application/x-www-form-urlencoded"},
+            method="POST",
+        )
+
+    def read_request():
+        return urllib.request.Request(f"{args.base_url}/api/books?limit=20")
+
+    lock = threading.Lock()
+    results = {"login": ([], {}), "read": ([], {})}
+    deadline = time.perf_counter() + args.duration
+    threads = []
+    for _ in range(args.login_clients):
+        latencies, errors = results["login"]
+        threads.append(threading.Thread(target=worker, args=(login_request, deadline, latencies, errors, lock)))
+    for _ in range(args.read_clients):
+        latencies, errors = results["read"]
+        threads.append(threading.Thread(target=worker, args=(read_request, deadline, latencies, errors, lock)))
+
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for name, (latencies, errors) in results.items():
+        print(
+            f"{name:>5}: n={len(latencies):6d} "
+            f"p50={statistics.median(latencies) if latencies else 0:8.1f}ms "
+            f"p99={percentile(latencies, 99):8.1f}ms "
+            f"rps={len(latencies) / args.duration:8.1f} errors={errors}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--login-clients", type=int, default=16)
+    parser.add_argument("--read-clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=20.0)
+    run(parser.parse_args())
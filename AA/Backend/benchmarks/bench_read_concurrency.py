@@ -0,0 +1,69 @@
+"""Concurrency scaling benchmark for the hot read routes.
+
+Steps the number of concurrent clients past the default AnyIO threadpool size
+(40) and reports throughput and p99 per step. Sync routes plateau once every
+thread is waiting on Postgres; the async routes keep scaling until the DB pool
+or the database itself is the limit.
+
+Usage (against a running server):
+    python benchmarks/bench_read_concurrency.py --base-url http://localhost:8000 \
+        --path "/api/books?limit=20" --levels 10,40,80,160,320
+"""
+import argparse
+import statistics
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def client(url, deadline, latencies, errors, lock):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=30) as response:
+                response.read()
+        except Exception:
+            with lock:
+                errors[0] += 1
+            continue
+        with lock:
+            latencies.append((time.perf_counter() - start) * 1000)
+
+
+def run_level(url, concurrency, duration):
+    latencies, errors, lock = [], [0], threading.Lock()
+    deadline = time.perf_counter() + duration
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for _ in range(concurrency):
+            pool.submit(client, url, deadline, latencies, errors, lock)
+    return latencies, errors[0]
+
+
+def main(args):
+    url = f"{args.base_url}{args.path}"
+    print(f"{url}  ({args.duration:.0f}s per level)")
+    print(f"{'clients':>8} {'rps':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for concurrency in [int(level) for level in args.levels.split(",")]:
+        latencies, errors = run_level(url, concurrency, args.duration)
+        print(
+            f"{concurrency:8d} {len(latencies) / args.duration:9.1f} "
+            f"{statistics.median(latencies) if latencies else 0:9.1f} "
+            f"{percentile(latencies, 99):9.1f} {errors:7d}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--path", default="/api/books?limit=20")
+    parser.add_argument("--levels", default="10,40,80,160,320")
+    parser.add_argument("--duration", type=float, default=15.0)
+    main(parser.parse_args())
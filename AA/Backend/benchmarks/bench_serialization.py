@@ -0,0 +1,135 @@
+"""Requests per second for large list responses, default vs fast serialization.
+
+Seeds an in-memory SQLite database with books (authors, reviews, reading
+lists), loads one page of 100 rows per response type, then serves the same
+rows through two routes on a throwaway app:
+
+  default: return the objects and let FastAPI validate them against
+           response_model, dump to Python and json.dumps (the old path)
+  fast:    app.serialization.render - one pydantic-core validation and
+           serialization straight to bytes
+
+Only serialization differs, so the ratio is the CPU saved per request. The
+budget is that the fast path is at least as fast as the default one.
+
+Usage:
+    DATABASE_URL=sqlite:// SECRET_KEY=bench python benchmarks/bench_serialization.py --seconds 3
+"""
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi import FastAPI  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker, selectinload  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from app.database import Base  # noqa: E402
+from app.models import Author, Book, Review, User, UserBook  # noqa: E402
+from app.routers.books import _book_response  # noqa: E402
+from app.schemas import BookResponse, ReviewResponse, UserBookResponse  # noqa: E402
+from app.serialization import render  # noqa: E402
+
+BUDGET_SPEEDUP = 1.0
+PAGE = 100
+
+
+def seed(db):
+    authors = [Author(name=f"Author {i}", bio="Bio " * 20) for i in range(20)]
+    users = [User(email=f"reader{i}@example.com", name=f"Reader {i}", hashed_password="x") for i in range(PAGE)]
+    db.add_all(authors + users)
+    for i in range(PAGE):
+        book = Book(
+            title=f"Book {i}",
+            isbn=f"978{i:010d}",
+            description="Description " * 30,
+            published_date="2020-01-01",
+            page_count=300,
+            authors=[authors[i % 20], authors[(i + 7) % 20]],
+            review_count=1,
+            rating_sum=4.0,
+            average_rating=4.0,
+        )
+        db.add(book)
+        db.add(Review(user=users[i], book=book, rating=4.0, review_text="Great read " * 10))
+        db.add(UserBook(user=users[i], book=book, status="reading", progress=40))
+    db.commit()
+
+
+def load_pages(db):
+    books = db.query(Book).options(selectinload(Book.authors)).limit(PAGE).all()
+    reviews = db.query(Review).options(
+        selectinload(Review.user), selectinload(Review.book).selectinload(Book.authors)
+    ).limit(PAGE).all()
+    user_books = db.query(UserBook).options(selectinload(UserBook.book).selectinload(Book.authors)).limit(PAGE).all()
+    return {
+        "books": (List[BookResponse], [_book_response(book) for book in books]),
+        "reviews": (List[ReviewResponse], reviews),
+        "user-books": (List[UserBookResponse], user_books),
+    }
+
+
+def endpoints(response_type, content):
+    # Closures, not default arguments - FastAPI would treat those as query parameters
+    def default():
+        return content
+
+    def fast():
+        return render(response_type, content)
+
+    return default, fast
+
+
+def build_app(pages):
+    app = FastAPI()
+    for name, (response_type, content) in pages.items():
+        default, fast = endpoints(response_type, content)
+        app.get(f"/default/{name}", response_model=response_type)(default)
+        app.get(f"/fast/{name}", response_model=response_type)(fast)
+    return app
+
+
+def requests_per_second(client, path, seconds):
+    client.get(path)  # warm up (adapter build, first validation)
+    count = 0
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        response = client.get(path)
+        assert response.status_code == 200
+        count += 1
+    return count / seconds
+
+
+def run(args):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    seed(db)
+    pages = load_pages(db)
+    client = TestClient(build_app(pages))
+
+    ok = True
+    print(f"{PAGE} rows per response, {args.seconds:.0f}s per route")
+    print(f"{'response':>12} {'default rps':>12} {'fast rps':>10} {'speedup':>8} {'same JSON':>10}")
+    for name in pages:
+        same = client.get(f"/default/{name}").json() == client.get(f"/fast/{name}").json()
+        before = requests_per_second(client, f"/default/{name}", args.seconds)
+        after = requests_per_second(client, f"/fast/{name}", args.seconds)
+        speedup = after / before
+        ok = ok and same and speedup >= BUDGET_SPEEDUP
+        print(f"{name:>12} {before:12.1f} {after:10.1f} {speedup:7.2f}x {str(same):>10}")
+    db.close()
+
+    print("OK" if ok else "OVER BUDGET")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seconds", type=float, default=3.0)
+    sys.exit(0 if run(parser.parse_args()) else 1)
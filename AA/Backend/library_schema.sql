@@ -1,3 +1,6 @@
+-- Tìm kiếm mờ theo tiêu đề / tên tác giả (trigram)
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
 CREATE TABLE IF NOT EXISTS users (
     id SERIAL PRIMARY KEY,
     name VARCHAR(100) NOT NULL,
@@ -6,6 +9,9 @@ CREATE TABLE IF NOT EXISTS users (
     avatar_url VARCHAR(500),
     role VARCHAR(20) DEFAULT 'user' NOT NULL,
     is_active BOOLEAN DEFAULT TRUE NOT NULL,
+    token_version INTEGER DEFAULT 0 NOT NULL,
+    unread_notifications INTEGER DEFAULT 0 NOT NULL,
+    notifications_read_at TIMESTAMP WITH TIME ZONE,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP WITH TIME ZONE
 );
@@ -19,14 +25,18 @@ CREATE INDEX IF NOT EXISTS ix_users_email ON users(email);
 CREATE TABLE IF NOT EXISTS authors (
     id SERIAL PRIMARY KEY,
     name VARCHAR(255) NOT NULL,
+    name_key VARCHAR(255) NOT NULL,
     bio TEXT,
     avatar_url VARCHAR(500),
     followers_count INTEGER DEFAULT 0,
+    pull_notifications BOOLEAN DEFAULT FALSE NOT NULL,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
 );
 
 CREATE INDEX IF NOT EXISTS ix_authors_id ON authors(id);
 CREATE INDEX IF NOT EXISTS ix_authors_name ON authors(name);
+CREATE UNIQUE INDEX IF NOT EXISTS ix_authors_name_key ON authors(name_key);
+CREATE INDEX IF NOT EXISTS ix_authors_name_trgm ON authors USING gin (name gin_trgm_ops);
 
 -- ============================================
 -- BẢNG BOOKS (Sách)
@@ -41,13 +51,48 @@ CREATE TABLE IF NOT EXISTS books (
     published_date VARCHAR(50),
     page_count INTEGER,
     google_books_id VARCHAR(100),
-    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    -- Số liệu tổng hợp từ reviews / user_books
+    average_rating FLOAT,
+    review_count INTEGER DEFAULT 0 NOT NULL,
+    rating_sum FLOAT DEFAULT 0 NOT NULL,
+    reader_count INTEGER DEFAULT 0 NOT NULL,
+    -- Tìm kiếm toàn văn: tiêu đề (A) nặng hơn mô tả (C)
+    search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(description, '')), 'C')
+    ) STORED
 );
 
 CREATE INDEX IF NOT EXISTS ix_books_id ON books(id);
 CREATE INDEX IF NOT EXISTS ix_books_title ON books(title);
 CREATE INDEX IF NOT EXISTS ix_books_isbn ON books(isbn);
 CREATE INDEX IF NOT EXISTS ix_books_google_books_id ON books(google_books_id);
+CREATE INDEX IF NOT EXISTS ix_books_search_vector ON books USING gin (search_vector);
+CREATE INDEX IF NOT EXISTS ix_books_title_trgm ON books USING gin (title gin_trgm_ops);
+
+-- ============================================
+-- BẢNG BOOK_RANKINGS (Xếp hạng sách, làm mới định kỳ bởi app/rankings.py)
+-- ============================================
+CREATE TABLE IF NOT EXISTS book_rankings (
+    book_id INTEGER PRIMARY KEY,
+    reader_count INTEGER NOT NULL,
+    review_count INTEGER NOT NULL,
+    trending_score FLOAT NOT NULL,
+    refreshed_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (book_id) REFERENCES books(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS ix_book_rankings_popularity ON book_rankings(reader_count, review_count, book_id);
+CREATE INDEX IF NOT EXISTS ix_book_rankings_trending ON book_rankings(trending_score, book_id);
+
+-- ============================================
+-- BẢNG SCHEDULED_JOBS (Lần chạy gần nhất của job định kỳ - app/scheduler.py)
+-- ============================================
+CREATE TABLE IF NOT EXISTS scheduled_jobs (
+    name VARCHAR(100) PRIMARY KEY,
+    last_run_at TIMESTAMP WITH TIME ZONE
+);
 
 -- ============================================
 -- BẢNG BOOK_AUTHOR (Liên kết Sách - Tác giả)
@@ -60,6 +105,8 @@ CREATE TABLE IF NOT EXISTS book_author (
     FOREIGN KEY (author_id) REFERENCES authors(id) ON DELETE CASCADE
 );
 
+CREATE INDEX IF NOT EXISTS ix_book_author_author_id ON book_author(author_id);
+
 -- ============================================
 -- BẢNG USER_BOOKS (Sách của người dùng)
 -- ============================================
@@ -81,6 +128,8 @@ CREATE TABLE IF NOT EXISTS user_books (
 CREATE INDEX IF NOT EXISTS ix_user_books_id ON user_books(id);
 CREATE INDEX IF NOT EXISTS ix_user_books_user_id ON user_books(user_id);
 CREATE INDEX IF NOT EXISTS ix_user_books_book_id ON user_books(book_id);
+CREATE INDEX IF NOT EXISTS ix_user_books_user_id_book_id ON user_books(user_id, book_id);
+CREATE INDEX IF NOT EXISTS ix_user_books_created_at ON user_books(created_at, book_id);
 
 -- ============================================
 -- BẢNG REVIEWS (Đánh giá)
@@ -100,6 +149,7 @@ CREATE TABLE IF NOT EXISTS reviews (
 CREATE INDEX IF NOT EXISTS ix_reviews_id ON reviews(id);
 CREATE INDEX IF NOT EXISTS ix_reviews_user_id ON reviews(user_id);
 CREATE INDEX IF NOT EXISTS ix_reviews_book_id ON reviews(book_id);
+CREATE INDEX IF NOT EXISTS ix_reviews_created_at ON reviews(created_at, book_id);
 
 -- ============================================
 -- BẢNG GROUPS (Câu lạc bộ đọc sách)
@@ -126,11 +176,15 @@ CREATE INDEX IF NOT EXISTS ix_groups_id ON groups(id);
 CREATE TABLE IF NOT EXISTS user_group (
     user_id INTEGER NOT NULL,
     group_id INTEGER NOT NULL,
+    joined_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP,
     PRIMARY KEY (user_id, group_id),
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
     FOREIGN KEY (group_id) REFERENCES groups(id) ON DELETE CASCADE
 );
 
+CREATE INDEX IF NOT EXISTS ix_user_group_group_id ON user_group(group_id);
+CREATE INDEX IF NOT EXISTS ix_user_group_group_id_joined_at ON user_group(group_id, joined_at, user_id);
+
 -- ============================================
 -- BẢNG CHALLENGES (Thử thách đọc sách)
 -- ============================================
@@ -163,6 +217,8 @@ CREATE TABLE IF NOT EXISTS user_challenge (
     FOREIGN KEY (challenge_id) REFERENCES challenges(id) ON DELETE CASCADE
 );
 
+CREATE INDEX IF NOT EXISTS ix_user_challenge_challenge_id ON user_challenge(challenge_id);
+
 -- ============================================
 -- BẢNG USER_AUTHOR_FOLLOW (Theo dõi tác giả)
 -- ============================================
@@ -174,6 +230,8 @@ CREATE TABLE IF NOT EXISTS user_author_follow (
     FOREIGN KEY (author_id) REFERENCES authors(id) ON DELETE CASCADE
 );
 
+CREATE INDEX IF NOT EXISTS ix_user_author_follow_author_id ON user_author_follow(author_id);
+
 -- ============================================
 -- BẢNG USER_BOOK_FOLLOW (Theo dõi sách)
 -- ============================================
@@ -204,6 +262,7 @@ CREATE TABLE IF NOT EXISTS group_discussions (
 );
 
 CREATE INDEX IF NOT EXISTS ix_group_discussions_id ON group_discussions(id);
+CREATE INDEX IF NOT EXISTS ix_group_discussions_group_id_created_at ON group_discussions(group_id, created_at, id);
 
 -- ============================================
 -- BẢNG GROUP_SCHEDULES (Lịch trình group)
@@ -221,6 +280,7 @@ CREATE TABLE IF NOT EXISTS group_schedules (
 );
 
 CREATE INDEX IF NOT EXISTS ix_group_schedules_id ON group_schedules(id);
+CREATE INDEX IF NOT EXISTS ix_group_schedules_group_id_scheduled_date ON group_schedules(group_id, scheduled_date);
 
 -- ============================================
 -- BẢNG GROUP_EVENTS (Sự kiện group)
@@ -239,6 +299,7 @@ CREATE TABLE IF NOT EXISTS group_events (
 );
 
 CREATE INDEX IF NOT EXISTS ix_group_events_id ON group_events(id);
+CREATE INDEX IF NOT EXISTS ix_group_events_group_id_event_date ON group_events(group_id, event_date);
 
 -- ============================================
 -- BẢNG AUTHOR_NOTIFICATIONS (Thông báo tác giả)
@@ -254,12 +315,30 @@ CREATE TABLE IF NOT EXISTS author_notifications (
     created_by INTEGER NOT NULL,
     created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
     is_active BOOLEAN DEFAULT TRUE,
+    delivery VARCHAR(10) DEFAULT 'inbox' NOT NULL,
     FOREIGN KEY (author_id) REFERENCES authors(id) ON DELETE CASCADE,
     FOREIGN KEY (book_id) REFERENCES books(id),
     FOREIGN KEY (created_by) REFERENCES users(id)
 );
 
 CREATE INDEX IF NOT EXISTS ix_author_notifications_id ON author_notifications(id);
+CREATE INDEX IF NOT EXISTS ix_author_notifications_author_active_created ON author_notifications(author_id, is_active, created_at, id);
+
+-- ============================================
+-- BẢNG NOTIFICATION_INBOX (Hộp thư thông báo của người dùng)
+-- ============================================
+CREATE TABLE IF NOT EXISTS notification_inbox (
+    user_id INTEGER NOT NULL,
+    notification_id INTEGER NOT NULL,
+    created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    read_at TIMESTAMP WITH TIME ZONE,
+    PRIMARY KEY (user_id, notification_id),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (notification_id) REFERENCES author_notifications(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS ix_notification_inbox_user_created ON notification_inbox(user_id, created_at, notification_id);
+CREATE INDEX IF NOT EXISTS ix_notification_inbox_notification_id ON notification_inbox(notification_id);
 
 -- ============================================
 -- KẾT THÚC SCHEMA
@@ -185,6 +185,10 @@ export async function changePassword(currentPassword: string, newPassword: strin
     const error = await response.json();
     throw new Error(error.detail || "Không thể đổi mật khẩu");
   }
+
+  // Token cũ bị thu hồi khi đổi mật khẩu - lưu token mới để giữ phiên đăng nhập
+  const data = await response.json();
+  setToken(data.access_token);
 }
 
 // ============================================